@@ -0,0 +1,138 @@
+import os
+import time
+import unicodedata
+from collections import OrderedDict
+import asyncpg
+
+from api.db import acquire_connection
+
+# Configurações do cache de resultados
+SEARCH_CACHE_MAX_SIZE = int(os.getenv("SEARCH_CACHE_MAX_SIZE", "1024"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "300"))
+# Intervalo mínimo entre consultas à tabela de versões
+VERSION_CHECK_INTERVAL = float(os.getenv("VERSION_CHECK_INTERVAL", "5"))
+
+
+def normalize_term(termo):
+    """
+    Normaliza o termo de busca para uso como chave de cache: minúsculas, sem acentos
+    e com espaços colapsados, espelhando a normalização da coluna 'busca'.
+
+    :param termo: Termo de busca textual.
+    """
+    termo = unicodedata.normalize("NFKD", termo.lower())
+    termo = "".join(c for c in termo if not unicodedata.combining(c))
+    return " ".join(termo.split())
+
+
+async def fetch_data_version(conn, tables):
+    """
+    Retorna a versão das tabelas em dados_versao, incrementada a cada carga.
+
+    :param conn: Conexão do pool.
+    :param tables: Nomes das tabelas.
+    :return: Dicionário {tabela: versão}, ou None se não houver versão registrada.
+    """
+    try:
+        rows = await conn.fetch("SELECT tabela, versao FROM dados_versao WHERE tabela = ANY($1::text[]);", tables)
+    except asyncpg.exceptions.UndefinedTableError:
+        return None
+    return {row["tabela"]: row["versao"] for row in rows} or None
+
+
+class TTLCache:
+    """
+    Cache LRU limitado em tamanho, com expiração por tempo e invalidação por versão dos dados.
+    """
+
+    def __init__(self, maxsize, ttl, version_tables=()):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_tables = list(version_tables)
+        self.version = None
+        self._version_checked_at = 0.0
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """
+        Retorna o valor armazenado para a chave, ou None se ausente ou expirado.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """
+        Armazena o valor, removendo a entrada menos usada recentemente se o cache estiver cheio.
+        """
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.invalidations += 1
+
+    async def ensure_fresh(self):
+        """
+        Consulta a versão das tabelas monitoradas (no máximo uma vez a cada VERSION_CHECK_INTERVAL
+        segundos) e limpa o cache se uma nova carga foi importada.
+        """
+        if not self.version_tables:
+            return
+
+        now = time.monotonic()
+        if now - self._version_checked_at < VERSION_CHECK_INTERVAL:
+            return
+        self._version_checked_at = now
+
+        async with acquire_connection() as conn:
+            version = await fetch_data_version(conn, self.version_tables)
+
+        if version != self.version:
+            if self.version is not None or self._entries:
+                self.clear()
+            self.version = version
+
+    def stats(self):
+        """
+        Retorna os contadores de uso do cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "data_version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+search_cache = TTLCache(SEARCH_CACHE_MAX_SIZE, SEARCH_CACHE_TTL, version_tables=("operadoras",))
+ranking_cache = TTLCache(
+    SEARCH_CACHE_MAX_SIZE, SEARCH_CACHE_TTL, version_tables=("demonstracoes_contabeis", "operadoras")
+)
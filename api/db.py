@@ -0,0 +1,157 @@
+import os
+import time
+import asyncio
+from contextvars import ContextVar
+from contextlib import asynccontextmanager
+import asyncpg
+
+# Configurações do banco de dados
+DB_HOST = "localhost"
+DB_PORT = "5432"
+DB_NAME = "ans_database"
+DB_USER = "postgres"
+DB_PASSWORD = "password"
+
+# Configurações do pool de conexões
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
+
+# Pool compartilhado, criado no startup da aplicação
+pool = None
+
+# Tempos de banco da requisição em andamento (preenchido pelo middleware de métricas)
+request_stats = ContextVar("request_stats", default=None)
+
+
+class PoolExhaustedError(Exception):
+    """
+    Nenhuma conexão do pool foi liberada dentro do tempo limite de espera (pool saturado).
+    """
+
+
+class QueryTimeoutError(Exception):
+    """
+    Uma consulta excedeu o tempo limite de execução (DB_COMMAND_TIMEOUT).
+    """
+
+
+class PoolMetrics:
+    """
+    Acumula métricas de espera e saturação do pool de conexões.
+    """
+
+    def __init__(self):
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.query_timeouts = 0
+        self.waiting = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.in_use_peak = 0
+
+    def record_acquire(self, wait_seconds, in_use):
+        self.acquisitions += 1
+        self.wait_total += wait_seconds
+        self.wait_max = max(self.wait_max, wait_seconds)
+        self.in_use_peak = max(self.in_use_peak, in_use)
+
+    def snapshot(self):
+        """
+        Retorna o estado atual do pool e as métricas acumuladas.
+        """
+        size = pool.get_size() if pool else 0
+        idle = pool.get_idle_size() if pool else 0
+        in_use = size - idle
+        max_size = pool.get_max_size() if pool else DB_POOL_MAX_SIZE
+        return {
+            "min_size": pool.get_min_size() if pool else DB_POOL_MIN_SIZE,
+            "max_size": max_size,
+            "size": size,
+            "idle": idle,
+            "in_use": in_use,
+            "in_use_peak": self.in_use_peak,
+            "saturation": in_use / max_size if max_size else 0.0,
+            "waiting": self.waiting,
+            "acquisitions": self.acquisitions,
+            "acquire_timeouts": self.timeouts,
+            "query_timeouts": self.query_timeouts,
+            "acquire_wait_avg_ms": (self.wait_total / self.acquisitions * 1000) if self.acquisitions else 0.0,
+            "acquire_wait_max_ms": self.wait_max * 1000,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+async def create_pool(init=None):
+    """
+    Cria o pool de conexões assíncronas com o banco de dados PostgreSQL.
+
+    :param init: Corrotina chamada com cada nova conexão (por exemplo, para instrumentá-la).
+    """
+    global pool
+    pool = await asyncpg.create_pool(
+        host=DB_HOST,
+        port=DB_PORT,
+        database=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        command_timeout=DB_COMMAND_TIMEOUT,
+        init=init,
+    )
+    return pool
+
+
+async def close_pool():
+    """
+    Fecha o pool de conexões, aguardando as conexões em uso serem liberadas.
+    """
+    global pool
+    if pool:
+        await pool.close()
+        pool = None
+
+
+@asynccontextmanager
+async def acquire_connection(timeout=None):
+    """
+    Obtém uma conexão do pool, registrando o tempo de espera. O asyncpg usa o mesmo
+    asyncio.TimeoutError para a espera pelo pool e para consultas lentas (command_timeout),
+    então os dois casos são separados aqui.
+
+    :param timeout: Tempo máximo de espera em segundos (padrão: DB_POOL_ACQUIRE_TIMEOUT).
+    :raises PoolExhaustedError: Se nenhuma conexão for liberada dentro do tempo limite.
+    :raises QueryTimeoutError: Se uma consulta feita com a conexão exceder DB_COMMAND_TIMEOUT.
+    """
+    if pool is None:
+        raise RuntimeError("O pool de conexões não foi inicializado.")
+
+    start = time.perf_counter()
+    pool_metrics.waiting += 1
+    timeout = timeout or DB_POOL_ACQUIRE_TIMEOUT
+    try:
+        conn = await pool.acquire(timeout=timeout)
+    except asyncio.TimeoutError:
+        pool_metrics.timeouts += 1
+        raise PoolExhaustedError(f"Nenhuma conexão do pool disponível em {timeout:g}s.") from None
+    finally:
+        pool_metrics.waiting -= 1
+
+    wait = time.perf_counter() - start
+    pool_metrics.record_acquire(wait, pool.get_size() - pool.get_idle_size())
+    stats = request_stats.get()
+    if stats is not None:
+        stats["pool_wait"] += wait
+    try:
+        yield conn
+    except asyncio.TimeoutError as e:
+        pool_metrics.query_timeouts += 1
+        raise QueryTimeoutError(f"A consulta excedeu o tempo limite de {DB_COMMAND_TIMEOUT:g}s.") from e
+    finally:
+        await pool.release(conn)
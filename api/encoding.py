@@ -0,0 +1,11 @@
+from decimal import Decimal
+
+
+def json_default(value):
+    """
+    Serializa no orjson os tipos que ele não conhece: os NUMERIC (Decimal) viram texto, sem
+    arredondamento para float.
+    """
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
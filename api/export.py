@@ -0,0 +1,120 @@
+import io
+import csv
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+import orjson
+
+from api.db import acquire_connection
+from api.encoding import json_default
+
+# Linhas buscadas do cursor do servidor a cada ida ao banco
+EXPORT_PREFETCH = 5000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+router = APIRouter(prefix="/exportar")
+
+
+async def stream_query(query, params, formato):
+    """
+    Executa a query em um cursor do servidor e gera o resultado em blocos de NDJSON ou CSV,
+    mantendo em memória apenas um bloco de EXPORT_PREFETCH linhas.
+
+    :param query: Query SQL a ser exportada.
+    :param params: Parâmetros posicionais da query.
+    :param formato: 'ndjson' ou 'csv'.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+
+    async with acquire_connection() as conn:
+        # Cursores do servidor só existem dentro de uma transação
+        async with conn.transaction(readonly=True):
+            async for row in conn.cursor(query, *params, prefetch=EXPORT_PREFETCH):
+                if formato == "csv":
+                    if not header_written:
+                        writer.writerow(row.keys())
+                        header_written = True
+                    writer.writerow(row.values())
+                else:
+                    # Mesmo codificador das demais rotas (NUMERIC como texto, datas em ISO 8601)
+                    buffer.write(orjson.dumps(dict(row), default=json_default).decode())
+                    buffer.write("\n")
+
+                if buffer.tell() >= 1 << 16:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def export_response(query, params, formato, filename):
+    return StreamingResponse(
+        stream_query(query, params, formato),
+        media_type=MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{formato}"'},
+    )
+
+
+@router.get("/operadoras")
+async def exportar_operadoras(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Formato de saída: ndjson ou csv"),
+    uf: Optional[str] = Query(None, min_length=2, max_length=2, description="Filtra as operadoras por UF")
+):
+    """
+    Exporta o cadastro completo de operadoras em fluxo, a partir de um cursor do servidor.
+
+    :param formato: Formato de saída (ndjson ou csv).
+    :param uf: Filtra as operadoras por UF.
+    """
+    query = """
+    SELECT 
+        id, registro_ans, cnpj, razao_social, nome_fantasia, modalidade, logradouro, numero,
+        complemento, bairro, cidade, uf, cep, ddd, telefone, fax, endereco_eletronico,
+        representante, cargo_representante, regiao_comercializacao, data_registro_ans
+    FROM 
+        operadoras
+    WHERE 
+        $1::text IS NULL OR uf = $1
+    ORDER BY 
+        id;
+    """
+    return export_response(query, [uf.upper() if uf else None], formato, "operadoras")
+
+
+@router.get("/demonstracoes")
+async def exportar_demonstracoes(
+    inicio: date = Query(..., description="Primeiro dia do período (inclusivo)"),
+    fim: date = Query(..., description="Último dia do período (inclusivo)"),
+    reg_ans: Optional[str] = Query(None, description="Filtra por registro ANS da operadora"),
+    conta: Optional[str] = Query(None, description="Filtra por código da conta contábil"),
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Formato de saída: ndjson ou csv")
+):
+    """
+    Exporta em fluxo um recorte do razão contábil; o filtro por período restringe a
+    leitura às partições trimestrais correspondentes.
+
+    :param inicio: Primeiro dia do período.
+    :param fim: Último dia do período.
+    :param reg_ans: Filtra por registro ANS da operadora.
+    :param conta: Filtra por código da conta contábil.
+    :param formato: Formato de saída (ndjson ou csv).
+    """
+    query = """
+    SELECT 
+        data, reg_ans, cd_conta_contabil, descricao, vl_saldo_inicial, vl_saldo_final
+    FROM 
+        demonstracoes_contabeis
+    WHERE 
+        data BETWEEN $1 AND $2
+        AND ($3::text IS NULL OR reg_ans = $3)
+        AND ($4::text IS NULL OR cd_conta_contabil = $4);
+    """
+    return export_response(query, [inicio, fim, reg_ans, conta], formato, "demonstracoes_contabeis")
@@ -1,17 +1,45 @@
+import os
+import json
+import base64
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from pydantic import BaseModel
 import asyncpg
+import orjson
 
-# Configurações do banco de dados
-DB_HOST = "localhost"
-DB_PORT = "5432"
-DB_NAME = "ans_database"
-DB_USER = "postgres"
-DB_PASSWORD = "password"
+from api.db import create_pool, close_pool, acquire_connection, pool_metrics, PoolExhaustedError, QueryTimeoutError
+from api.cache import search_cache, ranking_cache, normalize_term
+from api.search_index import SEARCH_INDEX_ENABLED, operadoras_index
+from api.export import router as export_router
+from api.encoding import json_default
+from api.metrics import MetricsMiddleware, instrument_connection, metrics_response, record_http_exception
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Cria o pool de conexões e carrega o índice de busca no startup, e fecha o pool no shutdown.
+    """
+    await create_pool(init=instrument_connection)
+    if SEARCH_INDEX_ENABLED:
+        # Sem o índice (por exemplo, tabela ainda não carregada), a busca consulta o PostgreSQL
+        await operadoras_index.ensure_fresh()
+    try:
+        yield
+    finally:
+        await close_pool()
+
+# Monta o JSON da busca no próprio PostgreSQL (json_agg) e o repassa como bytes
+SEARCH_JSON_FROM_DB = os.getenv("SEARCH_JSON_FROM_DB", "0") == "1"
 
 # Inicializa o FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,70 +48,314 @@ app.add_middleware(
     allow_methods=["*"],  # Permite todos os métodos (GET, POST, etc.)
     allow_headers=["*"],  # Permite todos os cabeçalhos
 )
+# Adicionado por último para envolver os demais middlewares e medir a requisição inteira
+app.add_middleware(MetricsMiddleware)
+app.add_exception_handler(StarletteHTTPException, record_http_exception)
+
+app.include_router(export_router)
+
+# Modelos de resposta para os dados
+class Operadora(BaseModel):
+    id: int
+    registro_ans: Optional[str] = None
+    cnpj: Optional[str] = None
+    razao_social: Optional[str] = None
+    nome_fantasia: Optional[str] = None
+    modalidade: Optional[str] = None
+    cidade: Optional[str] = None
+    uf: Optional[str] = None
+
+
+class OperadoraData(BaseModel):
+    data: List[Operadora]
+    next_cursor: Optional[str] = None
+
+
+class RankingOperadora(BaseModel):
+    operadora: Optional[str] = None
+    cnpj: Optional[str] = None
+    uf: Optional[str] = None
+    reg_ans: str
+    # NUMERIC do PostgreSQL, serializado como texto para não perder precisão
+    total_despesas: Decimal
+
+
+class RankingData(BaseModel):
+    data: List[RankingOperadora]
+
+
+# Query para buscar registros que correspondam ao termo, ordenados por relevância
+SEARCH_QUERY = """
+SELECT 
+    o.id,
+    o.registro_ans,
+    o.cnpj,
+    o.razao_social,
+    o.nome_fantasia,
+    o.modalidade,
+    o.cidade,
+    o.uf,
+    word_similarity(t.q, o.busca) AS score
+FROM 
+    operadoras o,
+    (SELECT f_unaccent(lower($1)) AS q) t
+WHERE 
+    (o.busca LIKE '%' || f_unaccent(lower($2)) || '%'
+     OR t.q <% o.busca)
+    AND (
+        $4::real IS NULL
+        OR word_similarity(t.q, o.busca) < $4::real
+        OR (word_similarity(t.q, o.busca) = $4::real AND o.id > $5::int)
+    )
+ORDER BY 
+    score DESC,
+    o.id
+LIMIT $3
+"""
+
+# Mesma busca, com a resposta completa (dados e cursor) serializada pelo PostgreSQL.
+# $3 é o limite + 1; a linha extra só indica que há próxima página.
+SEARCH_JSON_QUERY = f"""
+WITH pagina AS ({SEARCH_QUERY}),
+numerada AS (
+    SELECT pagina.*, row_number() OVER (ORDER BY score DESC, id) AS n FROM pagina
+)
+SELECT convert_to(json_build_object(
+    'data', coalesce(
+        json_agg(json_build_object(
+            'id', id, 'registro_ans', registro_ans, 'cnpj', cnpj, 'razao_social', razao_social,
+            'nome_fantasia', nome_fantasia, 'modalidade', modalidade, 'cidade', cidade, 'uf', uf
+        ) ORDER BY n) FILTER (WHERE n < $3),
+        '[]'::json
+    ),
+    'next_cursor', CASE WHEN count(*) >= $3 THEN (
+        SELECT translate(encode(convert_to(json_build_array(score, id)::text, 'UTF8'), 'base64'), E'+/\\n', '-_')
+        FROM numerada WHERE n = $3 - 1
+    ) END
+)::text, 'UTF8')
+FROM numerada;
+"""
+
 
-# Conexão com o banco de dados
-async def connect_to_db():
+def encode_cursor(*values):
     """
-    Cria uma conexão assíncrona com o banco de dados PostgreSQL.
+    Codifica a chave da última linha de uma página como cursor opaco para a próxima.
     """
-    return await asyncpg.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        database=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD
-    )
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
 
-# Modelo de resposta para os dados
-class OperadoraData(BaseModel):
-    data: list
+
+def decode_cursor(cursor):
+    """
+    Decodifica um cursor gerado por encode_cursor.
+
+    :raises HTTPException: Se o cursor for inválido.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != 2:
+        raise HTTPException(status_code=422, detail="Cursor de paginação inválido.")
+    return values
 
 @app.get("/operadoras/busca", response_model=OperadoraData)
 async def buscar_operadoras(
-    termo: str = Query(..., min_length=3, description="Termo de busca textual (mínimo 3 caracteres)")
+    termo: str = Query(..., min_length=3, description="Termo de busca textual (mínimo 3 caracteres)"),
+    limite: int = Query(10, ge=1, le=100, description="Quantidade máxima de registros retornados"),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página ('next_cursor' da resposta anterior)")
 ):
     """
     Realiza uma busca textual na tabela 'operadoras' e retorna os registros mais relevantes.
 
+    Por padrão, a busca é respondida pelo índice em memória (api/search_index.py), sem acessar
+    o banco: termos sem acentos, prefixos e pequenos erros de digitação são aceitos, e a razão
+    social, o nome fantasia, o CNPJ e o registro ANS são pesquisados. Sem o índice, a busca usa
+    o índice trigram sobre a coluna normalizada 'busca' (sem acentos e em
+    minúsculas), combinando correspondência por substring e similaridade de palavras,
+    e ordena os resultados pela similaridade com o termo. A paginação é por keyset
+    (similaridade, id): cada página continua a partir da última linha da anterior, sem OFFSET.
+
     :param termo: Termo de busca textual.
+    :param limite: Quantidade máxima de registros retornados.
+    :param cursor: Cursor da próxima página.
     """
-    conn = None
+    after = decode_cursor(cursor) if cursor else None
     try:
-        # Conecta ao banco de dados
-        conn = await connect_to_db()
+        index = await operadoras_index.ensure_fresh() if SEARCH_INDEX_ENABLED else None
+        if index is not None:
+            data, last_key = index.search(termo, limite, after)
+            body = orjson.dumps({"data": data, "next_cursor": encode_cursor(*last_key) if last_key else None})
+            return Response(content=body, media_type="application/json")
+
+        # Resultados em cache são válidos enquanto a tabela não for recarregada
+        await search_cache.ensure_fresh()
+        cache_key = (normalize_term(termo), limite, cursor)
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+
+        # Escapa os curingas do LIKE para que o termo seja tratado literalmente
+        like_termo = termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        # Busca uma linha a mais para saber se há próxima página
+        params = (termo, like_termo, limite + 1, *(after if after else (None, None)))
+
+        # Executa a query com uma conexão do pool
+        async with acquire_connection() as conn:
+            if SEARCH_JSON_FROM_DB:
+                body = await conn.fetchval(SEARCH_JSON_QUERY, *params)
+            else:
+                rows = await conn.fetch(SEARCH_QUERY, *params)
+
+        if not SEARCH_JSON_FROM_DB:
+            next_cursor = None
+            if len(rows) > limite:
+                rows = rows[:limite]
+                next_cursor = encode_cursor(rows[-1]["score"], rows[-1]["id"])
 
-        # Query para buscar registros que correspondam ao termo
-        query = """
+            # Serializa direto das linhas, sem passar pela validação do response_model
+            data = [
+                {key: value for key, value in row.items() if key != "score"}
+                for row in rows
+            ]
+            body = orjson.dumps({"data": data, "next_cursor": next_cursor})
+
+        # A resposta já serializada fica em cache
+        search_cache.set(cache_key, body)
+        return Response(content=body, media_type="application/json")
+
+    except PoolExhaustedError:
+        raise HTTPException(status_code=503, detail="Banco de dados sobrecarregado, tente novamente.")
+    except QueryTimeoutError:
+        raise HTTPException(status_code=504, detail="A consulta excedeu o tempo limite.")
+    except asyncpg.exceptions.UndefinedTableError:
+        raise HTTPException(status_code=404, detail="Tabela 'operadoras' não encontrada.")
+    except (asyncpg.exceptions.UndefinedColumnError, asyncpg.exceptions.UndefinedFunctionError):
+        raise HTTPException(status_code=503, detail="Índice de busca não encontrado. Execute database/main.py.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao realizar a busca: {str(e)}")
+
+
+def quarter_start(day):
+    """
+    Retorna o primeiro dia do trimestre que contém a data.
+    """
+    return date(day.year, (day.month - 1) // 3 * 3 + 1, 1)
+
+
+@app.get("/despesas/ranking", response_model=RankingData)
+async def ranking_despesas(
+    inicio: date = Query(..., description="Início do período; inclui o trimestre inteiro que contém a data"),
+    fim: date = Query(..., description="Fim do período; inclui o trimestre inteiro que contém a data"),
+    descricao: Optional[str] = Query(None, min_length=3, description="Descrição da conta contábil"),
+    conta: Optional[str] = Query(None, description="Código da conta contábil (CD_CONTA_CONTABIL)"),
+    uf: Optional[str] = Query(None, min_length=2, max_length=2, description="UF da operadora"),
+    n: int = Query(10, ge=1, le=100, description="Quantidade de operadoras no ranking")
+):
+    """
+    Retorna as N operadoras com maiores saldos finais em uma conta contábil no período,
+    a partir do agregado trimestral despesas_trimestrais. O agregado é por trimestre, então
+    o período é ampliado para trimestres inteiros.
+
+    :param inicio: Início do período; o trimestre que contém a data é incluído inteiro.
+    :param fim: Fim do período; o trimestre que contém a data é incluído inteiro.
+    :param descricao: Descrição da conta (espaços extras são ignorados).
+    :param conta: Código da conta contábil.
+    :param uf: Filtra as operadoras por UF.
+    :param n: Quantidade de operadoras no ranking.
+    """
+    if descricao is None and conta is None:
+        raise HTTPException(status_code=422, detail="Informe 'descricao' ou 'conta'.")
+    if inicio > fim:
+        raise HTTPException(status_code=422, detail="'inicio' deve ser anterior a 'fim'.")
+
+    # Mesma normalização aplicada às descrições no agregado
+    descricao = " ".join(descricao.split()) if descricao else None
+    uf = uf.upper() if uf else None
+    inicio = quarter_start(inicio)
+
+    try:
+        await ranking_cache.ensure_fresh()
+        cache_key = (descricao, conta, inicio, fim, uf, n)
+        cached = ranking_cache.get(cache_key)
+        if cached is not None:
+            return Response(content=cached, media_type="application/json")
+
+        # Monta apenas os filtros informados, para que o planejador use o índice adequado
+        params = [inicio, fim]
+        conditions = ["d.trimestre >= $1", "d.trimestre <= $2"]
+        for column, value in (("d.descricao", descricao), ("d.cd_conta_contabil", conta), ("o.uf", uf)):
+            if value is not None:
+                params.append(value)
+                conditions.append(f"{column} = ${len(params)}")
+        params.append(n)
+
+        query = f"""
         SELECT 
-            id,
-            registro_ans,
-            cnpj,
-            razao_social,
-            nome_fantasia,
-            modalidade,
-            cidade,
-            uf
+            o.razao_social AS operadora,
+            o.cnpj,
+            o.uf,
+            d.reg_ans,
+            SUM(d.vl_saldo_final) AS total_despesas
         FROM 
-            operadoras
+            despesas_trimestrais d
+        JOIN 
+            operadoras o
+        ON 
+            d.reg_ans = o.registro_ans
         WHERE 
-            razao_social ILIKE $1
-            OR nome_fantasia ILIKE $1
-        LIMIT 10;
+            {" AND ".join(conditions)}
+        GROUP BY 
+            o.razao_social, o.cnpj, o.uf, d.reg_ans
+        ORDER BY 
+            total_despesas DESC
+        LIMIT ${len(params)};
         """
-        # Executa a query com o termo de busca
-        rows = await conn.fetch(query, f"%{termo}%")
+        async with acquire_connection() as conn:
+            rows = await conn.fetch(query, *params)
 
-        # Converte os resultados para uma lista de dicionários
-        data = [dict(row) for row in rows]
-
-        # Retorna os dados
-        return {"data": data}
+        body = orjson.dumps({"data": [dict(row) for row in rows]}, default=json_default)
+        ranking_cache.set(cache_key, body)
+        return Response(content=body, media_type="application/json")
 
+    except PoolExhaustedError:
+        raise HTTPException(status_code=503, detail="Banco de dados sobrecarregado, tente novamente.")
+    except QueryTimeoutError:
+        raise HTTPException(status_code=504, detail="A consulta excedeu o tempo limite.")
     except asyncpg.exceptions.UndefinedTableError:
-        raise HTTPException(status_code=404, detail="Tabela 'operadoras' não encontrada.")
+        raise HTTPException(status_code=404, detail="Tabela 'despesas_trimestrais' não encontrada.")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao realizar a busca: {str(e)}")
-    finally:
-        # Fecha a conexão com o banco de dados
-        if conn:
-            await conn.close()
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro ao consultar o ranking: {str(e)}")
+
+
+@app.get("/metricas/pool")
+async def metricas_pool():
+    """
+    Retorna a saturação do pool de conexões e o tempo de espera para obter conexões.
+    """
+    return pool_metrics.snapshot()
+
+
+@app.get("/metricas/cache")
+async def metricas_cache():
+    """
+    Retorna os contadores de acertos, falhas e remoções dos caches de busca e de ranking.
+    """
+    return {"busca": search_cache.stats(), "ranking": ranking_cache.stats()}
+
+
+@app.get("/metricas/indice")
+async def metricas_indice():
+    """
+    Retorna o tamanho do índice de busca em memória, a versão dos dados e o tempo da última carga.
+    """
+    return operadoras_index.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Expõe as métricas da API (latência por rota, tempo de banco, erros, pool e caches)
+    no formato texto do Prometheus.
+    """
+    content, media_type = metrics_response()
+    return Response(content=content, media_type=media_type)
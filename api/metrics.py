@@ -0,0 +1,235 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from fastapi import Request
+from fastapi.exception_handlers import http_exception_handler
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, ProcessCollector, disable_created_metrics, generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from api.db import acquire_connection, pool_metrics, request_stats
+from api.cache import search_cache, ranking_cache
+from api.search_index import operadoras_index
+
+# Consultas acima deste tempo são registradas no log como lentas
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+# Fração das consultas lentas registradas com o plano de execução (EXPLAIN)
+SLOW_QUERY_EXPLAIN_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0.1"))
+# Máximo de EXPLAINs simultâneos, para que o diagnóstico não dispute o pool com as requisições
+SLOW_QUERY_MAX_EXPLAINS = 2
+
+# Limites dos histogramas de latência, em segundos
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+logger = logging.getLogger("api.metrics")
+
+# Registro próprio: as métricas da API não se misturam às de outras bibliotecas do processo
+registry = CollectorRegistry()
+# Omite as séries *_created, que só aumentam o volume da coleta
+disable_created_metrics()
+ProcessCollector(registry=registry)
+
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds", "Tempo total da requisição, até o último byte da resposta.",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS, registry=registry,
+)
+REQUEST_DB_TIME = Histogram(
+    "api_request_db_seconds", "Tempo gasto em consultas ao banco por requisição.",
+    ["route"], buckets=LATENCY_BUCKETS, registry=registry,
+)
+REQUEST_POOL_WAIT = Histogram(
+    "api_request_pool_wait_seconds", "Espera por conexões do pool por requisição.",
+    ["route"], buckets=LATENCY_BUCKETS, registry=registry,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "api_requests_in_progress", "Requisições em andamento.", ["method"], registry=registry,
+)
+REQUEST_ERRORS = Counter(
+    "api_request_errors_total", "Requisições com erro, por rota e tipo de erro.",
+    ["route", "type"], registry=registry,
+)
+DB_QUERY_LATENCY = Histogram(
+    "api_db_query_duration_seconds", "Tempo de cada consulta ao banco.",
+    buckets=LATENCY_BUCKETS, registry=registry,
+)
+SLOW_QUERIES = Counter(
+    "api_db_slow_queries_total", "Consultas acima de SLOW_QUERY_THRESHOLD_MS.", registry=registry,
+)
+
+# Referências aos EXPLAINs em andamento (tarefas sem referência podem ser coletadas)
+_explain_tasks = set()
+
+
+class StatsCollector:
+    """
+    Expõe as métricas já acumuladas pelo pool de conexões e pelos caches no formato do Prometheus.
+    """
+
+    def collect(self):
+        pool = pool_metrics.snapshot()
+        connections = GaugeMetricFamily("api_db_pool_connections", "Conexões do pool por estado.", labels=["state"])
+        connections.add_metric(["idle"], pool["idle"])
+        connections.add_metric(["in_use"], pool["in_use"])
+        connections.add_metric(["waiting"], pool["waiting"])
+        yield connections
+        yield GaugeMetricFamily("api_db_pool_max_size", "Tamanho máximo do pool.", value=pool["max_size"])
+        yield CounterMetricFamily("api_db_pool_acquisitions", "Conexões obtidas do pool.", value=pool["acquisitions"])
+        yield CounterMetricFamily(
+            "api_db_pool_acquire_timeouts", "Esperas por conexão que excederam o tempo limite.",
+            value=pool["acquire_timeouts"],
+        )
+        yield CounterMetricFamily(
+            "api_db_query_timeouts", "Consultas que excederam o tempo limite de execução.",
+            value=pool["query_timeouts"],
+        )
+
+        counters = {
+            name: CounterMetricFamily(f"api_cache_{name}", f"Contador de {name} dos caches.", labels=["cache"])
+            for name in ("hits", "misses", "evictions", "expirations", "invalidations")
+        }
+        size = GaugeMetricFamily("api_cache_entries", "Entradas armazenadas nos caches.", labels=["cache"])
+        for cache_name, cache in (("busca", search_cache), ("ranking", ranking_cache)):
+            stats = cache.stats()
+            for name, metric in counters.items():
+                metric.add_metric([cache_name], stats[name])
+            size.add_metric([cache_name], stats["size"])
+        yield from counters.values()
+        yield size
+
+        index = operadoras_index.stats()
+        yield GaugeMetricFamily(
+            "api_search_index_documents", "Operadoras no índice de busca em memória.", value=index.get("documents", 0)
+        )
+        yield CounterMetricFamily("api_search_index_builds", "Cargas do índice de busca.", value=index["builds"])
+        yield GaugeMetricFamily(
+            "api_search_index_build_seconds", "Duração da última carga do índice de busca.",
+            value=index["build_seconds"] or 0.0,
+        )
+
+
+registry.register(StatsCollector())
+
+
+async def log_slow_query(record):
+    """
+    Registra uma consulta lenta no log junto do seu plano de execução. O EXPLAIN (sem ANALYZE)
+    não executa a consulta novamente; ele usa uma conexão própria do pool.
+
+    :param record: Registro da consulta (asyncpg.LoggedQuery).
+    """
+    # O tempo do EXPLAIN não é contabilizado na requisição que originou a consulta
+    request_stats.set(None)
+    try:
+        async with acquire_connection(timeout=1) as conn:
+            plan = await conn.fetch(f"EXPLAIN {record.query.strip().rstrip(';')}", *(record.args or ()))
+        plan = "\n".join(row[0] for row in plan)
+    except Exception as e:
+        plan = f"(plano indisponível: {e})"
+    logger.warning("Consulta lenta (%.1f ms):\n%s\nPlano:\n%s", record.elapsed * 1000, record.query.strip(), plan)
+
+
+def record_query(record):
+    """
+    Contabiliza o tempo de uma consulta na requisição em andamento e registra as consultas lentas.
+    Chamado pelo asyncpg após cada consulta (ver instrument_connection).
+
+    :param record: Registro da consulta (asyncpg.LoggedQuery).
+    """
+    stats = request_stats.get()
+    if stats is not None:
+        stats["db"] += record.elapsed
+        stats["queries"] += 1
+    DB_QUERY_LATENCY.observe(record.elapsed)
+
+    statement = record.query.lstrip()[:7].upper()
+    if record.elapsed * 1000 < SLOW_QUERY_THRESHOLD_MS or statement.startswith("EXPLAIN"):
+        return
+    SLOW_QUERIES.inc()
+    # Só consultas de leitura com um único comando têm o plano registrado (o reset das
+    # conexões feito pelo pool, por exemplo, tem vários)
+    explainable = statement.startswith(("SELECT", "WITH")) and ";" not in record.query.strip().rstrip(";")
+    if explainable and len(_explain_tasks) < SLOW_QUERY_MAX_EXPLAINS and random.random() < SLOW_QUERY_EXPLAIN_RATE:
+        task = asyncio.get_running_loop().create_task(log_slow_query(record))
+        _explain_tasks.add(task)
+        task.add_done_callback(_explain_tasks.discard)
+    else:
+        logger.warning("Consulta lenta (%.1f ms): %s", record.elapsed * 1000, record.query.strip())
+
+
+async def instrument_connection(conn):
+    """
+    Registra o tempo das consultas de cada nova conexão do pool (parâmetro 'init' de create_pool).
+    """
+    conn.add_query_logger(record_query)
+
+
+async def record_http_exception(request: Request, exc):
+    """
+    Anota o tipo da exceção que originou o HTTPException (por exemplo, PoolExhaustedError ou
+    UndefinedTableError) e delega a resposta ao tratador padrão do FastAPI.
+    """
+    stats = request_stats.get()
+    if stats is not None and exc.__context__ is not None:
+        stats["error"] = type(exc.__context__).__name__
+    return await http_exception_handler(request, exc)
+
+
+def metrics_response():
+    """
+    Retorna o conteúdo e o tipo de mídia de todas as métricas no formato texto do Prometheus.
+    """
+    return generate_latest(registry), "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede cada requisição: latência por rota até o último byte enviado
+    (inclusive nas respostas em fluxo), requisições em andamento, tempo de banco e de espera
+    pelo pool, e erros por tipo. O restante do tempo total é processamento e serialização.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        stats = {"db": 0.0, "pool_wait": 0.0, "queries": 0, "error": None}
+        token = request_stats.set(stats)
+        REQUESTS_IN_PROGRESS.labels(method).inc()
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as e:
+            stats["error"] = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_PROGRESS.labels(method).dec()
+            request_stats.reset(token)
+            # O asyncpg agenda o registro das consultas no laço de eventos: cede a vez uma vez
+            # para que as consultas recém-concluídas entrem no tempo de banco desta requisição
+            await asyncio.sleep(0)
+
+            # Rotas pelo padrão do caminho (ex.: /exportar/operadoras), sem os valores dos parâmetros
+            route = scope.get("route")
+            route = route.path if route is not None else "nao_encontrada"
+            REQUEST_LATENCY.labels(method, route, str(status)).observe(elapsed)
+            REQUEST_DB_TIME.labels(route).observe(stats["db"])
+            REQUEST_POOL_WAIT.labels(route).observe(stats["pool_wait"])
+            if status >= 400 or stats["error"]:
+                REQUEST_ERRORS.labels(route, stats["error"] or f"http_{status}").inc()
@@ -0,0 +1,288 @@
+import os
+import re
+import time
+import heapq
+import asyncio
+import logging
+from array import array
+from bisect import bisect_left
+
+from api.db import acquire_connection
+from api.cache import VERSION_CHECK_INTERVAL, fetch_data_version, normalize_term
+
+# Busca pelo índice em memória (0 volta a consultar o PostgreSQL a cada busca)
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX", "1") == "1"
+# Relevância mínima (0 a 1) para um registro entrar no resultado
+SEARCH_MIN_SCORE = float(os.getenv("SEARCH_MIN_SCORE", "0.5"))
+
+NGRAM_SIZE = 3
+# Campos indexados e campos devolvidos na resposta da busca
+SEARCH_FIELDS = ("razao_social", "nome_fantasia", "cnpj", "registro_ans")
+RESPONSE_FIELDS = ("id", "registro_ans", "cnpj", "razao_social", "nome_fantasia", "modalidade", "cidade", "uf")
+
+logger = logging.getLogger("api.search_index")
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text, digits=False):
+    """
+    Separa um texto em termos normalizados (minúsculas, sem acentos). Com digits=True, os
+    dígitos do texto também formam um termo único, para que CNPJs e registros sejam encontrados
+    com ou sem pontuação.
+
+    :param text: Texto a separar.
+    :param digits: Acrescenta o termo formado apenas pelos dígitos.
+    """
+    if not text:
+        return []
+    tokens = _TOKEN_PATTERN.findall(normalize_term(text))
+    if digits:
+        only_digits = "".join(re.findall(r"\d", text))
+        if only_digits and only_digits not in tokens:
+            tokens.append(only_digits)
+    return tokens
+
+
+def ngrams(token):
+    """
+    Retorna os n-gramas do termo, com as bordas marcadas por espaços (' sa', 'sao', 'ao ').
+    """
+    padded = f" {token} "
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+def max_edits(token):
+    """
+    Quantidade de erros de digitação tolerados para o tamanho do termo.
+    """
+    if len(token) < 4:
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+def edit_distance(a, b, limit):
+    """
+    Distância de edição entre dois termos (inserção, remoção, substituição e transposição de
+    letras vizinhas), interrompida assim que ultrapassa o limite.
+
+    :return: A distância, ou limit + 1 se ela for maior que o limite.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before_previous[j - 2] + 1)
+            current[j] = value
+        if min(current) > limit:
+            return limit + 1
+        before_previous, previous = previous, current
+    return previous[-1]
+
+
+class SearchIndex:
+    """
+    Índice de busca imutável sobre as operadoras. O vocabulário (termos distintos dos campos
+    indexados) fica ordenado para a busca por prefixo, com listas de n-gramas apontando para
+    os termos (tolerância a erros de digitação) e listas de registros por termo.
+    """
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        self.documents = [{field: row[field] for field in RESPONSE_FIELDS} for row in rows]
+        self.ids = array("I", (row["id"] for row in rows))
+
+        postings = {}
+        for position, row in enumerate(rows):
+            for field in SEARCH_FIELDS:
+                for token in tokenize(row[field], digits=field in ("cnpj", "registro_ans")):
+                    documents = postings.setdefault(token, array("I"))
+                    if not documents or documents[-1] != position:
+                        documents.append(position)
+
+        self.vocabulary = sorted(postings)
+        self.postings = [postings[token] for token in self.vocabulary]
+        self.token_ids = {token: i for i, token in enumerate(self.vocabulary)}
+
+        ngram_postings = {}
+        for i, token in enumerate(self.vocabulary):
+            for gram in ngrams(token):
+                ngram_postings.setdefault(gram, array("I")).append(i)
+        self.ngram_postings = ngram_postings
+
+    def match_token(self, query):
+        """
+        Retorna os termos do vocabulário compatíveis com um termo da busca e a similaridade de
+        cada um: 1 para o termo exato, entre 0.75 e 1 para prefixos (maior quanto mais do termo
+        foi digitado) e até 0.9 para termos a poucos erros de digitação.
+
+        :return: Dicionário {índice do termo no vocabulário: similaridade}.
+        """
+        matches = {}
+        exact = self.token_ids.get(query)
+        if exact is not None:
+            matches[exact] = 1.0
+
+        # Prefixos: termos consecutivos no vocabulário ordenado
+        if len(query) >= 2:
+            i = bisect_left(self.vocabulary, query)
+            while i < len(self.vocabulary) and self.vocabulary[i].startswith(query):
+                token = self.vocabulary[i]
+                if i != exact:
+                    matches[i] = 0.75 + 0.25 * len(query) / len(token)
+                i += 1
+
+        # Erros de digitação: só os termos que compartilham n-gramas suficientes são comparados.
+        # Números (CNPJ, registro) não têm tolerância: um dígito diferente é outra operadora
+        limit = 0 if query.isdigit() else max_edits(query)
+        if limit:
+            grams = ngrams(query)
+            shared = {}
+            for gram in grams:
+                for i in self.ngram_postings.get(gram, ()):
+                    shared[i] = shared.get(i, 0) + 1
+            # Cada erro altera no máximo NGRAM_SIZE n-gramas
+            minimum = max(1, len(grams) - NGRAM_SIZE * limit)
+            for i, count in shared.items():
+                if count < minimum or i in matches:
+                    continue
+                token = self.vocabulary[i]
+                distance = edit_distance(query, token, limit)
+                if distance <= limit:
+                    matches[i] = 0.9 * (1 - distance / max(len(query), len(token)))
+        return matches
+
+    def search(self, termo, limite=10, after=None):
+        """
+        Busca as operadoras mais relevantes para o termo. A relevância de cada registro é a média,
+        entre os termos da busca, da melhor similaridade com os termos do registro.
+
+        :param termo: Termo de busca textual.
+        :param limite: Quantidade máxima de registros retornados.
+        :param after: Chave (relevância, id) da última linha da página anterior.
+        :return: Tupla (registros da página, chave da última linha se houver próxima página).
+        """
+        # Termos sem letras (CNPJ ou registro com pontuação) são buscados pelos dígitos
+        query_tokens = tokenize(termo)
+        if query_tokens and not any(c.isalpha() for c in termo):
+            query_tokens = ["".join(query_tokens)]
+        query_tokens = list(dict.fromkeys(query_tokens))
+        if not query_tokens:
+            return [], None
+
+        totals = {}
+        for query in query_tokens:
+            best = {}
+            for token_id, similarity in self.match_token(query).items():
+                for position in self.postings[token_id]:
+                    if similarity > best.get(position, 0.0):
+                        best[position] = similarity
+            for position, similarity in best.items():
+                totals[position] = totals.get(position, 0.0) + similarity
+
+        results = []
+        for position, total in totals.items():
+            score = round(total / len(query_tokens), 4)
+            if score < SEARCH_MIN_SCORE:
+                continue
+            if after and (score > after[0] or (score == after[0] and self.ids[position] <= after[1])):
+                continue
+            results.append((-score, self.ids[position], position))
+
+        # Uma linha a mais indica que há próxima página
+        page = heapq.nsmallest(limite + 1, results)
+        next_key = (-page[limite - 1][0], page[limite - 1][1]) if len(page) > limite else None
+        return [self.documents[position] for _, _, position in page[:limite]], next_key
+
+    def stats(self):
+        return {
+            "documents": len(self.documents),
+            "vocabulary": len(self.vocabulary),
+            "ngrams": len(self.ngram_postings),
+            "postings": sum(len(documents) for documents in self.postings),
+            "data_version": self.version,
+        }
+
+
+class OperadorasIndex:
+    """
+    Mantém o índice de busca das operadoras em memória e o reconstrói quando a versão da
+    tabela muda. O novo índice é montado por completo e só então substitui o anterior, que
+    continua atendendo as buscas durante a reconstrução.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.builds = 0
+        self.build_seconds = None
+        self._version_checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def load(self):
+        """
+        Lê as operadoras e a versão da tabela em uma mesma transação e troca o índice.
+        """
+        async with self._lock:
+            start = time.perf_counter()
+            async with acquire_connection() as conn:
+                # Versão e dados lidos do mesmo snapshot, para que correspondam entre si
+                async with conn.transaction(isolation="repeatable_read", readonly=True):
+                    version = await fetch_data_version(conn, ["operadoras"])
+                    rows = await conn.fetch(f"SELECT {', '.join(RESPONSE_FIELDS)} FROM operadoras ORDER BY id;")
+            # Montado fora do laço de eventos, para não atrasar as requisições em andamento
+            index = await asyncio.to_thread(SearchIndex, [dict(row) for row in rows], version)
+            self.index = index
+            self.builds += 1
+            self.build_seconds = time.perf_counter() - start
+            self._version_checked_at = time.monotonic()
+            logger.info("Índice de busca carregado: %d operadoras em %.3fs.", len(rows), self.build_seconds)
+            return index
+
+    async def ensure_fresh(self):
+        """
+        Retorna o índice atual, reconstruindo-o se a versão da tabela mudou (a versão é consultada
+        no máximo uma vez a cada VERSION_CHECK_INTERVAL segundos).
+
+        :return: O índice, ou None se ele não pôde ser carregado (a busca usa o PostgreSQL).
+        """
+        if self._lock.locked():
+            # Reconstrução em andamento: o índice anterior continua atendendo; sem índice, aguarda
+            if self.index is None:
+                async with self._lock:
+                    pass
+            return self.index
+
+        now = time.monotonic()
+        if now - self._version_checked_at < VERSION_CHECK_INTERVAL:
+            return self.index
+        self._version_checked_at = now
+
+        try:
+            if self.index is not None:
+                async with acquire_connection() as conn:
+                    version = await fetch_data_version(conn, ["operadoras"])
+                if version == self.index.version:
+                    return self.index
+            return await self.load()
+        except Exception as e:
+            logger.warning("Não foi possível carregar o índice de busca: %s", e)
+            return self.index
+
+    def stats(self):
+        """
+        Retorna o tamanho do índice atual e as métricas de reconstrução.
+        """
+        return {
+            **(self.index.stats() if self.index else {}),
+            "loaded": self.index is not None,
+            "builds": self.builds,
+            "build_seconds": self.build_seconds,
+        }
+
+
+operadoras_index = OperadorasIndex()
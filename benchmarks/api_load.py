@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import unicodedata
+from urllib.parse import urlsplit, parse_qsl
+import httpx
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.generators import NAME_WORDS  # noqa: E402
+
+
+def synthetic_traffic(count, seed=42):
+    """
+    Gera requisições de busca com o perfil de uso da interface: palavras inteiras, prefixos,
+    termos sem acento e em minúsculas, com alguns termos muito mais frequentes que outros.
+
+    :param count: Quantidade de requisições.
+    :param seed: Semente do gerador aleatório.
+    :return: Lista de tuplas (caminho, parâmetros).
+    """
+    rng = random.Random(seed)
+    # Distribuição de Zipf: poucos termos concentram a maior parte das buscas
+    weights = [1 / (rank + 1) for rank in range(len(NAME_WORDS))]
+    traffic = []
+    for _ in range(count):
+        word = rng.choices(NAME_WORDS, weights)[0]
+        variant = rng.random()
+        if variant < 0.3:
+            word = word[:max(3, len(word) // 2)]
+        elif variant < 0.6:
+            word = "".join(c for c in unicodedata.normalize("NFKD", word.lower()) if not unicodedata.combining(c))
+        elif variant < 0.7:
+            word = f"{word} {rng.choice(NAME_WORDS)}"
+        traffic.append(("/operadoras/busca", {"termo": word, "limite": rng.choice([10, 10, 10, 20, 50])}))
+    return traffic
+
+
+def load_traffic(path):
+    """
+    Lê requisições gravadas para reprodução: um arquivo JSONL com um objeto
+    {"path": ..., "params": {...}} por linha, ou uma coleção do Postman.
+
+    :param path: Caminho do arquivo.
+    :return: Lista de tuplas (caminho, parâmetros).
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        if path.endswith(".jsonl"):
+            return [(item["path"], item.get("params", {})) for item in map(json.loads, file) if item]
+
+        collection = json.load(file)
+    traffic = []
+    for item in collection.get("item", []):
+        url = urlsplit(item["request"]["url"]["raw"])
+        traffic.append((url.path, dict(parse_qsl(url.query))))
+    return traffic
+
+
+def percentile(values, fraction):
+    """
+    Retorna o percentil (0 a 1) de uma lista ordenada, pelo método do vizinho mais próximo.
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+async def run_level(base_url, traffic, concurrency, requests):
+    """
+    Dispara 'requests' requisições com 'concurrency' clientes simultâneos, percorrendo o tráfego
+    em ciclo, e mede a latência de cada uma.
+
+    :param base_url: URL base da API.
+    :param traffic: Lista de tuplas (caminho, parâmetros).
+    :param concurrency: Quantidade de requisições simultâneas.
+    :param requests: Quantidade total de requisições.
+    """
+    latencies = []
+    errors = 0
+    queue = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            for i in queue:
+                path, params = traffic[i % len(traffic)]
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path, params=params)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+def benchmark(base_url, concurrency_levels=(1, 10, 50), requests=1000, traffic=None, warmup=50):
+    """
+    Executa o teste de carga em cada nível de concorrência.
+
+    :param base_url: URL base da API (ex.: http://127.0.0.1:8000).
+    :param concurrency_levels: Níveis de concorrência a medir.
+    :param requests: Requisições por nível.
+    :param traffic: Lista de tuplas (caminho, parâmetros); padrão: tráfego sintético de busca.
+    :param warmup: Requisições de aquecimento (não medidas) antes de cada nível.
+    """
+    traffic = traffic or synthetic_traffic(max(requests, 1000))
+    results = []
+    for concurrency in concurrency_levels:
+        if warmup:
+            asyncio.run(run_level(base_url, traffic, concurrency, warmup))
+        results.append(asyncio.run(run_level(base_url, traffic, concurrency, requests)))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga da API (latência p50/p95/p99 e RPS).")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL base da API.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50], help="Níveis de concorrência.")
+    parser.add_argument("--requests", type=int, default=1000, help="Requisições por nível.")
+    parser.add_argument("--traffic", help="Tráfego a reproduzir (JSONL ou coleção do Postman).")
+    parser.add_argument("--json", action="store_true", help="Imprime os resultados em JSON.")
+    args = parser.parse_args()
+
+    traffic = load_traffic(args.traffic) if args.traffic else None
+    results = benchmark(args.url, args.concurrency, args.requests, traffic)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(tabulate(results, headers="keys"))
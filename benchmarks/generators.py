@@ -0,0 +1,133 @@
+import os
+import random
+import argparse
+from datetime import date
+
+# Tamanho aproximado dos dados atuais da ANS: operadoras ativas no Relatorio_cadop.csv
+# e linhas por trimestre nos arquivos de demonstrações contábeis
+BASE_OPERADORAS = 1_100
+BASE_LEDGER_ROWS_PER_QUARTER = 700_000
+DEFAULT_QUARTERS = [date(2023, month, 1) for month in (1, 4, 7, 10)] + [date(2024, month, 1) for month in (1, 4, 7, 10)]
+
+REGISTRY_HEADER = [
+    "Registro_ANS", "CNPJ", "Razao_Social", "Nome_Fantasia", "Modalidade", "Logradouro", "Numero",
+    "Complemento", "Bairro", "Cidade", "UF", "CEP", "DDD", "Telefone", "Fax", "Endereco_eletronico",
+    "Representante", "Cargo_Representante", "Regiao_de_Comercializacao", "Data_Registro_ANS",
+]
+
+# Vocabulário usado nos nomes das operadoras (e, nos testes de carga, nos termos de busca)
+NAME_WORDS = [
+    "UNIMED", "SAÚDE", "ODONTO", "ASSISTÊNCIA", "MÉDICA", "BRASIL", "PLANO", "HOSPITALAR", "CLÍNICA",
+    "VIDA", "SÃO", "PAULO", "BRADESCO", "AMIL", "SUL", "AMÉRICA", "CENTRAL", "NACIONAL", "COOPERATIVA",
+    "SERVIÇOS", "ADMINISTRADORA", "BENEFÍCIOS", "NORDESTE", "MINAS", "GERAIS", "PARANÁ", "ODONTOPREV",
+]
+MODALIDADES = ["Medicina de Grupo", "Cooperativa Médica", "Odontologia de Grupo", "Autogestão", "Seguradora"]
+UFS = ["SP", "RJ", "MG", "PR", "RS", "SC", "BA", "PE", "CE", "GO", "DF", "ES", "PA", "AM", "MT"]
+CONTAS = [
+    ("411", "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS DE ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR"),
+    ("4111", "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS DE ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR "),
+    ("311", "CONTRAPRESTAÇÕES EFETIVAS DE PLANO DE ASSISTÊNCIA À SAÚDE"),
+    ("46", "DESPESAS ADMINISTRATIVAS"),
+    ("1", "ATIVO"),
+    ("2", "PASSIVO"),
+]
+
+
+def registry_values(rows):
+    """
+    Retorna os registros ANS usados pelo cadastro sintético com a quantidade de linhas informada.
+    """
+    return [str(300000 + i) for i in range(rows)]
+
+
+def generate_registry_csv(path, rows=BASE_OPERADORAS, seed=42):
+    """
+    Gera um CSV sintético no formato do cadastro de operadoras ativas (Relatorio_cadop.csv).
+
+    :param path: Caminho do arquivo gerado.
+    :param rows: Quantidade de operadoras.
+    :param seed: Semente do gerador aleatório.
+    """
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(";".join(f'"{column}"' for column in REGISTRY_HEADER) + "\n")
+        for i, registro in enumerate(registry_values(rows)):
+            razao_social = " ".join(rng.sample(NAME_WORDS, rng.randint(2, 4))) + f" {i} LTDA"
+            values = [
+                registro, f"{rng.randint(0, 10**14 - 1):014d}", razao_social,
+                razao_social.split(" ")[0], rng.choice(MODALIDADES), "RUA EXEMPLO", str(rng.randint(1, 9999)),
+                "", "CENTRO", "SÃO PAULO", rng.choice(UFS), f"{rng.randint(10**7, 10**8 - 1)}",
+                str(rng.randint(11, 99)), f"{rng.randint(10**7, 10**9 - 1)}", "",
+                f"contato{i}@exemplo.com.br", "REPRESENTANTE", "DIRETOR", str(rng.randint(1, 6)),
+                f"{rng.randint(1995, 2023)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            ]
+            file.write(";".join(f'"{value}"' for value in values) + "\n")
+
+
+def generate_ledger_csv(path, rows, seed=42, reg_ans_values=None, quarter=date(2024, 1, 1)):
+    """
+    Gera um CSV sintético no formato das demonstrações contábeis da ANS.
+
+    :param path: Caminho do arquivo gerado.
+    :param rows: Quantidade de linhas.
+    :param seed: Semente do gerador aleatório.
+    :param reg_ans_values: Registros ANS a usar (padrão: aleatórios, sem correspondência no cadastro).
+    :param quarter: Primeiro dia do trimestre das linhas.
+    """
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write('"DATA";"REG_ANS";"CD_CONTA_CONTABIL";"DESCRICAO";"VL_SALDO_INICIAL";"VL_SALDO_FINAL"\n')
+        for _ in range(rows):
+            saldo_inicial = f"{rng.uniform(0, 1e7):.2f}".replace(".", ",")
+            saldo_final = f"{rng.uniform(0, 1e7):.2f}".replace(".", ",") if rng.random() > 0.01 else ""
+            if reg_ans_values:
+                reg_ans = rng.choice(reg_ans_values)
+                conta, descricao = rng.choice(CONTAS)
+            else:
+                reg_ans = rng.randint(300000, 420000)
+                conta, descricao = rng.randint(1, 499999999), "EVENTOS/ SINISTROS CONHECIDOS"
+            file.write(
+                f'"{quarter.isoformat()}";"{reg_ans}";"{conta}";'
+                f'"{descricao}";"{saldo_inicial}";"{saldo_final}"\n'
+            )
+
+
+def generate_dataset(output_dir, scale=1.0, quarters=None, seed=42):
+    """
+    Gera o cadastro de operadoras (OPSA.csv) e um arquivo de demonstrações contábeis por
+    trimestre, com os nomes de arquivo esperados por database/main.py.
+
+    :param output_dir: Diretório de saída (por exemplo, benchmarks/data).
+    :param scale: Multiplicador do tamanho atual dos dados (1, 10, 100...).
+    :param quarters: Trimestres gerados (padrão: DEFAULT_QUARTERS).
+    :param seed: Semente do gerador aleatório.
+    :return: Dicionário com a quantidade de linhas geradas por arquivo.
+    """
+    quarters = quarters or DEFAULT_QUARTERS
+    os.makedirs(output_dir, exist_ok=True)
+
+    operadoras = max(1, int(BASE_OPERADORAS * scale))
+    ledger_rows = max(1, int(BASE_LEDGER_ROWS_PER_QUARTER * scale))
+    generate_registry_csv(os.path.join(output_dir, "OPSA.csv"), operadoras, seed)
+
+    files = {"OPSA.csv": operadoras}
+    reg_ans_values = registry_values(operadoras)
+    for i, quarter in enumerate(quarters):
+        filename = f"{(quarter.month - 1) // 3 + 1}T{quarter.year}.csv"
+        generate_ledger_csv(os.path.join(output_dir, filename), ledger_rows, seed + i, reg_ans_values, quarter)
+        files[filename] = ledger_rows
+    return files
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos da ANS em escala (cadastro e demonstrações).")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplicador do tamanho atual (ex.: 10, 100).")
+    parser.add_argument("--quarters", type=int, default=len(DEFAULT_QUARTERS), help="Quantidade de trimestres.")
+    # Fora de downloads/DemCon, para não sobrescrever as demonstrações baixadas da ANS
+    parser.add_argument("--output-dir", default="benchmarks/data", help="Diretório de saída (padrão: benchmarks/data).")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador aleatório.")
+    args = parser.parse_args()
+
+    files = generate_dataset(args.output_dir, args.scale, DEFAULT_QUARTERS[:args.quarters], args.seed)
+    for filename, rows in files.items():
+        print(f"{os.path.join(args.output_dir, filename)}: {rows} linhas")
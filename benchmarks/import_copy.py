@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import psycopg2
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database.main as database_main  # noqa: E402
+from benchmarks.generators import DEFAULT_QUARTERS, generate_dataset  # noqa: E402
+
+# Banco dedicado aos benchmarks: as tabelas são esvaziadas antes de cada medição
+BENCH_DB_NAME = os.getenv("BENCH_DB_NAME", "ans_benchmark")
+
+
+def _truncate_tables():
+    conn = psycopg2.connect(
+        host=database_main.DB_HOST,
+        port=database_main.DB_PORT,
+        database=database_main.DB_NAME,
+        user=database_main.DB_USER,
+        password=database_main.DB_PASSWORD
+    )
+    try:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(
+                "TRUNCATE demonstracoes_contabeis, operadoras, despesas_trimestrais, carga_manifesto;"
+            )
+    finally:
+        conn.close()
+
+
+def benchmark(scale=0.1, quarters=1, database=BENCH_DB_NAME):
+    """
+    Mede import_csv_with_copy (linhas/s) sobre dados sintéticos já preparados.
+    As tabelas do banco de benchmark são esvaziadas antes da carga.
+
+    :param scale: Multiplicador do tamanho atual dos dados.
+    :param quarters: Quantidade de trimestres de demonstrações contábeis.
+    :param database: Banco usado na medição (nunca o banco da aplicação).
+    """
+    # As funções de database/main.py usam o banco configurado no módulo: o banco de benchmark
+    # só vale durante a medição, e o da aplicação é restaurado ao fim
+    app_db_name = database_main.DB_NAME
+    database_main.DB_NAME = database
+    work_dir = tempfile.mkdtemp(prefix="bench_import_")
+    cwd = os.getcwd()
+    try:
+        csv_dir = os.path.join(work_dir, "downloads", "DemCon")
+        files = generate_dataset(csv_dir, scale, DEFAULT_QUARTERS[:quarters])
+        # A preparação não faz parte da medição (ver prepare_csv.py)
+        database_main.prepare_csv_files(csv_dir, chunksize=200_000)
+        size = sum(os.path.getsize(os.path.join(csv_dir, filename)) for filename in files)
+
+        database_main.create_tables()
+        _truncate_tables()
+
+        # import_csv_with_copy lê os arquivos de downloads/DemCon, relativo ao diretório atual
+        os.chdir(work_dir)
+        start = time.perf_counter()
+        database_main.import_csv_with_copy(list(files))
+        elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir)
+        database_main.DB_NAME = app_db_name
+
+    rows = sum(files.values())
+    return [{
+        "scale": scale,
+        "files": len(files),
+        "rows": rows,
+        "mb": round(size / 1024 / 1024, 1),
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed),
+    }]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de import_csv_with_copy (linhas/s).")
+    parser.add_argument("--scale", type=float, default=0.1, help="Multiplicador do tamanho atual dos dados.")
+    parser.add_argument("--quarters", type=int, default=1, help="Trimestres de demonstrações contábeis.")
+    parser.add_argument("--database", default=BENCH_DB_NAME, help="Banco de benchmark (será esvaziado).")
+    parser.add_argument("--json", action="store_true", help="Imprime os resultados em JSON.")
+    args = parser.parse_args()
+
+    results = benchmark(args.scale, args.quarters, args.database)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(tabulate(results, headers="keys"))
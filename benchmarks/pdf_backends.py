@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.main import PDF_BACKENDS, count_pages, iter_page_tables, iter_table_rows  # noqa: E402
+
+FIXTURE_COLUMNS = [
+    "PROCEDIMENTO", "RN (alteração)", "VIGÊNCIA", "OD", "AMB", "HCO", "HSO",
+    "REF", "PAC", "DUT", "SUBGRUPO", "GRUPO", "CAPÍTULO",
+]
+FIXTURE_WIDTHS = [140, 40, 40, 25, 25, 25, 25, 25, 25, 25, 60, 60, 60]
+
+
+def generate_fixture_pdf(path, pages=40, rows_per_page=25, seed=42):
+    """
+    Gera um PDF sintético com uma tabela por página no layout do Anexo I
+    (cabeçalho com VIGÊNCIA repetido em todas as páginas).
+
+    :param path: Caminho do PDF gerado.
+    :param pages: Quantidade de páginas.
+    :param rows_per_page: Linhas de dados por página.
+    :param seed: Semente do gerador aleatório.
+    """
+    import pymupdf
+
+    rng = random.Random(seed)
+    doc = pymupdf.open()
+    for p in range(pages):
+        page = doc.new_page(width=700, height=900)
+        y = 40
+        for r in range(rows_per_page + 1):
+            if r == 0:
+                values = FIXTURE_COLUMNS
+            else:
+                values = [
+                    f"PROCEDIMENTO {p}-{r} {'X' * rng.randint(1, 8)}", str(rng.randint(1, 500)), "01/04/2021",
+                    rng.choice(["OD", ""]), rng.choice(["AMB", ""]), "", "", "", "", "",
+                    "SUBGRUPO", "GRUPO", "CAPÍTULO",
+                ]
+            x = 20
+            for width, value in zip(FIXTURE_WIDTHS, values):
+                rect = pymupdf.Rect(x, y, x + width, y + 30)
+                page.draw_rect(rect, color=(0, 0, 0), width=0.5)
+                page.insert_textbox(rect + (2, 2, -2, -2), value, fontsize=5)
+                x += width
+            y += 30
+    doc.save(path)
+
+
+def benchmark(pdf_path, backends):
+    """
+    Extrai o PDF com cada backend, medindo páginas/s e verificando se as linhas são idênticas.
+
+    :param pdf_path: Caminho do PDF.
+    :param backends: Lista de backends a comparar (o primeiro é a referência de paridade).
+    """
+    pages = count_pages(pdf_path)
+    results = []
+    reference = None
+    for backend in backends:
+        start = time.perf_counter()
+        rows = list(iter_table_rows(iter_page_tables(pdf_path, backend=backend)))
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = rows
+        results.append({
+            "backend": backend,
+            "pages": pages,
+            "rows": len(rows),
+            "seconds": round(elapsed, 3),
+            "pages_per_sec": round(pages / elapsed, 2),
+            "parity": rows == reference,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paridade e páginas/s dos backends de extração de PDF.")
+    parser.add_argument("--pdf", help="PDF a usar (padrão: fixture sintética gerada).")
+    parser.add_argument("--pages", type=int, default=40, help="Páginas da fixture sintética.")
+    parser.add_argument("--json", action="store_true", help="Imprime os resultados em JSON.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf
+        if pdf_path is None:
+            pdf_path = os.path.join(tmp, "anexo_fixture.pdf")
+            generate_fixture_pdf(pdf_path, pages=args.pages)
+        results = benchmark(pdf_path, list(PDF_BACKENDS))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(tabulate(results, headers="keys"))
+
+    # Falha se os backends divergirem, para uso como verificação de paridade
+    sys.exit(0 if all(result["parity"] for result in results) else 1)
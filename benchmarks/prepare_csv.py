@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.main import prepare_csv_files  # noqa: E402
+from benchmarks.generators import generate_ledger_csv  # noqa: E402
+
+
+def _run(csv_dir, chunksize, queue):
+    start = time.perf_counter()
+    prepare_csv_files(csv_dir, chunksize=chunksize)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss é reportado em KiB no Linux
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+
+def benchmark(rows, chunksizes):
+    """
+    Executa prepare_csv_files em um processo separado para cada modo, medindo linhas/s e pico de RSS.
+
+    :param rows: Quantidade de linhas do CSV sintético.
+    :param chunksizes: Lista de tamanhos de bloco (None = implementação original, arquivo inteiro).
+    """
+    work_dir = tempfile.mkdtemp(prefix="bench_prepare_")
+    source = os.path.join(work_dir, "source.csv")
+    generate_ledger_csv(source, rows)
+
+    results = []
+    try:
+        for chunksize in chunksizes:
+            csv_dir = os.path.join(work_dir, f"run_{chunksize}")
+            os.makedirs(csv_dir)
+            shutil.copy(source, os.path.join(csv_dir, "1T2024.csv"))
+
+            queue = multiprocessing.Queue()
+            process = multiprocessing.Process(target=_run, args=(csv_dir, chunksize, queue))
+            process.start()
+            elapsed, peak_rss_mb = queue.get()
+            process.join()
+
+            results.append({
+                "mode": "original" if chunksize is None else f"chunked({chunksize})",
+                "rows": rows,
+                "seconds": round(elapsed, 3),
+                "rows_per_sec": round(rows / elapsed),
+                "peak_rss_mb": round(peak_rss_mb, 1),
+            })
+    finally:
+        shutil.rmtree(work_dir)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de prepare_csv_files (linhas/s e pico de RSS).")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Linhas do CSV sintético.")
+    parser.add_argument("--chunksize", type=int, action="append", help="Tamanho(s) de bloco a comparar.")
+    parser.add_argument("--json", action="store_true", help="Imprime os resultados em JSON.")
+    args = parser.parse_args()
+
+    results = benchmark(args.rows, [None] + (args.chunksize or [100_000]))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(tabulate(results, headers="keys"))
@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SUITES = ["prepare", "import", "pdf", "api"]
+
+# Métricas comparadas com o baseline e se valores maiores são melhores
+METRICS = {
+    "rows_per_sec": True,
+    "pages_per_sec": True,
+    "rps": True,
+    "seconds": False,
+    "peak_rss_mb": False,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+}
+# Campos que identificam cada linha de resultado entre execuções
+KEY_FIELDS = ["mode", "backend", "concurrency", "scale"]
+
+
+def run_suite(name, args):
+    """
+    Executa um grupo de benchmarks e retorna a lista de resultados.
+    """
+    if name == "prepare":
+        from benchmarks.prepare_csv import benchmark
+        return benchmark(args.rows, [None, 100_000])
+    if name == "import":
+        from benchmarks.import_copy import benchmark
+        return benchmark(args.scale, args.quarters, args.database)
+    if name == "pdf":
+        from benchmarks.pdf_backends import benchmark, generate_fixture_pdf
+        from data_processing.main import PDF_BACKENDS
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = args.pdf or os.path.join(tmp, "anexo_fixture.pdf")
+            if not args.pdf:
+                generate_fixture_pdf(pdf_path, pages=args.pages)
+            return benchmark(pdf_path, list(PDF_BACKENDS))
+    if name == "api":
+        from benchmarks.api_load import benchmark, load_traffic
+        traffic = load_traffic(args.traffic) if args.traffic else None
+        return benchmark(args.api_url, args.concurrency, args.requests, traffic)
+    raise ValueError(f"Benchmark desconhecido: {name}")
+
+
+def metadata(args):
+    """
+    Retorna as informações do ambiente e da versão do código, gravadas junto dos resultados.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "arguments": vars(args),
+    }
+
+
+def _row_key(suite, row):
+    return (suite,) + tuple(str(row.get(field)) for field in KEY_FIELDS if field in row)
+
+
+def compare(results, baseline):
+    """
+    Compara os resultados com um baseline, retornando a variação percentual de cada métrica.
+    Variações positivas indicam melhora, independentemente da direção da métrica.
+    """
+    baseline_rows = {
+        _row_key(suite, row): row for suite, rows in baseline["results"].items() for row in rows
+    }
+    comparison = []
+    for suite, rows in results["results"].items():
+        for row in rows:
+            previous = baseline_rows.get(_row_key(suite, row))
+            if not previous:
+                continue
+            for metric, higher_is_better in METRICS.items():
+                if metric in row and previous.get(metric):
+                    change = (row[metric] - previous[metric]) / previous[metric] * 100
+                    comparison.append({
+                        "suite": suite,
+                        "case": " ".join(_row_key(suite, row)[1:]),
+                        "metric": metric,
+                        "baseline": previous[metric],
+                        "current": row[metric],
+                        "improvement_pct": round(change if higher_is_better else -change, 1),
+                    })
+    return comparison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa os benchmarks e grava os resultados em JSON.")
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=["prepare", "import", "pdf"],
+                        help="Benchmarks a executar ('api' exige a API em execução).")
+    parser.add_argument("--output", help="Arquivo de resultados (padrão: benchmarks/results/<data>.json).")
+    parser.add_argument("--baseline", help="Resultados anteriores para comparação.")
+    # prepare
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Linhas do CSV de prepare_csv_files.")
+    # import
+    parser.add_argument("--scale", type=float, default=1.0, help="Escala dos dados sintéticos (1, 10, 100).")
+    parser.add_argument("--quarters", type=int, default=1, help="Trimestres de demonstrações na carga.")
+    parser.add_argument("--database", default=os.getenv("BENCH_DB_NAME", "ans_benchmark"),
+                        help="Banco de benchmark (será esvaziado).")
+    # pdf
+    parser.add_argument("--pdf", help="PDF para o benchmark de extração (padrão: fixture sintética).")
+    parser.add_argument("--pages", type=int, default=40, help="Páginas da fixture sintética.")
+    # api
+    parser.add_argument("--api-url", default="http://127.0.0.1:8000", help="URL base da API.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50], help="Níveis de concorrência.")
+    parser.add_argument("--requests", type=int, default=1000, help="Requisições por nível.")
+    parser.add_argument("--traffic", help="Tráfego a reproduzir (JSONL ou coleção do Postman).")
+    args = parser.parse_args()
+
+    results = {"meta": metadata(args), "results": {}}
+    for suite in args.suite:
+        print(f"\n[benchmark] {suite}")
+        results["results"][suite] = run_suite(suite, args)
+        print(tabulate(results["results"][suite], headers="keys"))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2, default=str)
+    print(f"\nResultados salvos em: {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            comparison = compare(results, json.load(file))
+        print("\nComparação com o baseline (positivo = melhor):")
+        print(tabulate(comparison, headers="keys"))
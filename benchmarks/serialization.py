@@ -0,0 +1,113 @@
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Optional
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from tabulate import tabulate
+import orjson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from api.main import OperadoraData  # noqa: E402
+
+
+# Modelo de resposta anterior, com a lista não tipada
+class OperadoraDataOriginal(BaseModel):
+    data: list
+    next_cursor: Optional[str] = None
+
+
+def make_rows(n):
+    """
+    Gera linhas no formato retornado pela busca de operadoras.
+    """
+    return [
+        {
+            "id": i,
+            "registro_ans": str(300000 + i),
+            "cnpj": f"{i:014d}",
+            "razao_social": f"OPERADORA DE SAÚDE EXEMPLO {i} LTDA",
+            "nome_fantasia": f"SAÚDE EXEMPLO {i}",
+            "modalidade": "Medicina de Grupo",
+            "cidade": "São Paulo",
+            "uf": "SP",
+        }
+        for i in range(n)
+    ]
+
+
+def serialize_original(rows):
+    """
+    Caminho anterior: dict(row) por linha, validação pelo response_model não tipado,
+    jsonable_encoder e json.dumps (como o JSONResponse padrão).
+    """
+    content = {"data": [dict(row) for row in rows]}
+    validated = OperadoraDataOriginal.model_validate(content)
+    return json.dumps(
+        jsonable_encoder(validated), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def serialize_typed(rows):
+    """
+    Validação pelo modelo tipado seguida de orjson (ORJSONResponse com response_model).
+    """
+    validated = OperadoraData.model_validate({"data": rows})
+    return orjson.dumps(validated.model_dump())
+
+
+def serialize_fast(rows):
+    """
+    Caminho atual da busca: orjson direto das linhas, sem validação.
+    """
+    return orjson.dumps({"data": [dict(row) for row in rows], "next_cursor": None})
+
+
+def serialize_db_json(body):
+    """
+    Caminho SEARCH_JSON_FROM_DB: o PostgreSQL devolve o JSON pronto, a API só repassa os bytes.
+    """
+    return body
+
+
+def measure(func, payload, iterations):
+    """
+    Retorna o tempo de CPU médio por chamada, em microssegundos.
+    """
+    start = time.process_time()
+    for _ in range(iterations):
+        func(payload)
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def benchmark(sizes, iterations):
+    results = []
+    for size in sizes:
+        rows = make_rows(size)
+        db_body = serialize_fast(rows)
+        runs = max(10, iterations // size)
+        results.append({
+            "rows": size,
+            "original_us": round(measure(serialize_original, rows, runs), 1),
+            "typed_orjson_us": round(measure(serialize_typed, rows, runs), 1),
+            "orjson_us": round(measure(serialize_fast, rows, runs), 1),
+            "json_agg_us": round(measure(serialize_db_json, db_body, runs), 3),
+        })
+        results[-1]["speedup"] = round(results[-1]["original_us"] / results[-1]["orjson_us"], 1)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de CPU por requisição na serialização da busca.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Tamanhos de payload.")
+    parser.add_argument("--iterations", type=int, default=200_000, help="Total de linhas serializadas por tamanho.")
+    parser.add_argument("--json", action="store_true", help="Imprime os resultados em JSON.")
+    args = parser.parse_args()
+
+    results = benchmark(args.sizes, args.iterations)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(tabulate(results, headers="keys"))
@@ -0,0 +1,183 @@
+import os
+import sys
+import shutil
+import tempfile
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Métodos de compressão suportados
+COMPRESSION_METHODS = {
+    "stored": zipfile.ZIP_STORED,
+    "deflated": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+
+# Configurações padrão de compressão dos arquivos ZIP gerados
+ZIP_COMPRESSION = os.getenv("ZIP_COMPRESSION", "deflated")
+ZIP_COMPRESSLEVEL = int(os.getenv("ZIP_COMPRESSLEVEL", "6"))
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB por bloco
+# Membros comprimidos em paralelo ficam em memória até este tamanho, depois em disco
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
+# A compressão paralela grava membros já comprimidos usando partes internas do zipfile
+# (_get_compressor, _writecheck, start_dir), que não fazem parte da API pública. Ela só é
+# usada nas versões do Python em que foi testada; nas demais, zip_files comprime em série.
+PARALLEL_ZIP_PYTHON_VERSIONS = {(3, 10), (3, 11)}
+PARALLEL_ZIP_SUPPORTED = (
+    sys.version_info[:2] in PARALLEL_ZIP_PYTHON_VERSIONS
+    and hasattr(zipfile, "_get_compressor")
+    and hasattr(zipfile.ZipFile, "_writecheck")
+    and hasattr(zipfile.ZipInfo, "FileHeader")
+)
+
+
+def open_zip(zip_path, method=ZIP_COMPRESSION, level=ZIP_COMPRESSLEVEL):
+    """
+    Abre um arquivo ZIP para escrita com o método e o nível de compressão informados.
+
+    :param zip_path: Caminho do arquivo ZIP de saída.
+    :param method: Método de compressão (chave de COMPRESSION_METHODS).
+    :param level: Nível de compressão (ignorado no método 'stored').
+    """
+    if method not in COMPRESSION_METHODS:
+        raise ValueError(f"Método de compressão desconhecido: {method}")
+    compression = COMPRESSION_METHODS[method]
+    return zipfile.ZipFile(
+        zip_path, "w", compression=compression,
+        compresslevel=None if compression == zipfile.ZIP_STORED else level
+    )
+
+
+def _compress_member(path, arcname, compression, level):
+    """
+    Comprime um arquivo em um buffer temporário, calculando o CRC e os tamanhos do membro.
+    Executada em threads: zlib, bz2 e lzma liberam o GIL durante a compressão.
+    """
+    zinfo = zipfile.ZipInfo.from_file(path, arcname)
+    zinfo.compress_type = compression
+    compressor = zipfile._get_compressor(compression, level)
+
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    crc = 0
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+            buffer.write(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        buffer.write(compressor.flush())
+
+    zinfo.CRC = crc
+    zinfo.compress_size = buffer.tell()
+    buffer.seek(0)
+    return zinfo, buffer
+
+
+def _write_compressed_member(zipf, zinfo, buffer):
+    """
+    Copia para o ZIP um membro já comprimido, sem comprimi-lo novamente.
+    O zipfile não expõe essa operação, então o cabeçalho local é escrito aqui e o
+    diretório central continua sendo gerado pelo próprio ZipFile ao fechar.
+    Usada apenas quando PARALLEL_ZIP_SUPPORTED.
+    """
+    zinfo.header_offset = zipf.fp.tell()
+    zipf._writecheck(zinfo)
+    zipf._didModify = True
+    zipf.fp.write(zinfo.FileHeader(zinfo.file_size > zipfile.ZIP64_LIMIT))
+    shutil.copyfileobj(buffer, zipf.fp, CHUNK_SIZE)
+    zipf.filelist.append(zinfo)
+    zipf.NameToInfo[zinfo.filename] = zinfo
+    zipf.start_dir = zipf.fp.tell()
+
+
+def zip_files(paths, zip_path, arcnames=None, method=ZIP_COMPRESSION, level=ZIP_COMPRESSLEVEL, workers=1):
+    """
+    Compacta arquivos em um ZIP. Com workers > 1, cada membro é comprimido em paralelo e
+    os membros são gravados no ZIP na ordem informada (apenas nas versões do Python em
+    PARALLEL_ZIP_PYTHON_VERSIONS; nas demais, os membros são comprimidos em série).
+
+    :param paths: Caminhos dos arquivos a compactar.
+    :param zip_path: Caminho do arquivo ZIP de saída.
+    :param arcnames: Nomes dos membros no ZIP (padrão: nome de cada arquivo).
+    :param method: Método de compressão (chave de COMPRESSION_METHODS).
+    :param level: Nível de compressão.
+    :param workers: Quantidade de membros comprimidos simultaneamente.
+    :return: Caminho do arquivo ZIP.
+    """
+    arcnames = arcnames or [os.path.basename(path) for path in paths]
+
+    with open_zip(zip_path, method, level) as zipf:
+        if workers > 1 and len(paths) > 1 and PARALLEL_ZIP_SUPPORTED:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # map preserva a ordem dos membros, mesmo que terminem fora de ordem
+                results = executor.map(
+                    _compress_member, paths, arcnames,
+                    [zipf.compression] * len(paths), [zipf.compresslevel] * len(paths)
+                )
+                for zinfo, buffer in results:
+                    with buffer:
+                        _write_compressed_member(zipf, zinfo, buffer)
+        else:
+            for path, arcname in zip(paths, arcnames):
+                zipf.write(path, arcname)
+
+    validate_zip(zip_path)
+    return zip_path
+
+
+def validate_zip(zip_path):
+    """
+    Verifica a integridade do ZIP lendo cada membro e conferindo o CRC, sem gravar nada em disco.
+
+    :param zip_path: Caminho do arquivo ZIP.
+    :raises ValueError: Se o ZIP estiver vazio, tiver um membro vazio ou um CRC inválido.
+    """
+    if not os.path.exists(zip_path) or os.path.getsize(zip_path) == 0:
+        raise ValueError(f"Falha ao criar o arquivo ZIP: {zip_path}")
+
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zipf:
+            for zinfo in zipf.infolist():
+                if not zinfo.is_dir() and zinfo.file_size == 0:
+                    raise ValueError(f"Arquivo vazio dentro do ZIP: {zinfo.filename}")
+            corrupted = zipf.testzip()
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Arquivo ZIP corrompido: {zip_path} ({e})")
+
+    if corrupted is not None:
+        raise ValueError(f"CRC inválido no arquivo {corrupted} dentro de {zip_path}")
+
+
+def extract_zip(zip_filename, extract_to) -> str:
+    """
+    Extrai os arquivos de um arquivo ZIP para o diretório especificado. O CRC de cada
+    membro é conferido durante a própria extração; depois, apenas os tamanhos gravados
+    são comparados com os do ZIP, sem reler os arquivos.
+
+    :param zip_filename: Caminho do arquivo ZIP a ser extraído.
+    :param extract_to: Diretório onde os arquivos serão extraídos.
+    :return: Caminho do diretório onde os arquivos foram extraídos.
+    """
+    if not os.path.exists(zip_filename):
+        raise FileNotFoundError(f"O arquivo ZIP não foi encontrado: {zip_filename}")
+
+    os.makedirs(extract_to, exist_ok=True)
+
+    with zipfile.ZipFile(zip_filename, "r") as zipf:
+        members = zipf.infolist()
+        try:
+            zipf.extractall(extract_to)
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"Arquivo ZIP corrompido: {zip_filename} ({e})")
+
+    for zinfo in members:
+        if zinfo.is_dir():
+            continue
+        file_path = os.path.join(extract_to, zinfo.filename)
+        if (not os.path.exists(file_path) or zinfo.file_size == 0
+                or os.path.getsize(file_path) != zinfo.file_size):
+            raise ValueError(f"Arquivo extraído está corrompido ou vazio: {file_path}")
+
+    return extract_to
@@ -0,0 +1,27 @@
+import json
+
+
+def load_metadata(path):
+    """
+    Lê os metadados HTTP (URL, ETag, Last-Modified, tamanho) salvos ao lado do arquivo baixado.
+
+    :param path: Caminho do arquivo baixado.
+    :return: Dicionário com os metadados, vazio se não houver metadados válidos.
+    """
+    try:
+        with open(path + ".meta.json", "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_metadata(path, metadata):
+    """
+    Grava os metadados HTTP ao lado do arquivo baixado (<arquivo>.meta.json), usados nas
+    requisições condicionais e na retomada dos próximos downloads.
+
+    :param path: Caminho do arquivo baixado.
+    :param metadata: Dicionário com os metadados.
+    """
+    with open(path + ".meta.json", "w", encoding="utf-8") as file:
+        json.dump(metadata, file)
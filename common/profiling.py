@@ -0,0 +1,402 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import argparse
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from tabulate import tabulate
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Ativa a medição das etapas sem alterar a linha de comando (equivale a --profile)
+PROFILE_ENABLED = os.getenv("PROFILE", "0") == "1"
+# Diretório dos relatórios de execução e dos dumps do cProfile
+PROFILE_DIR = os.getenv("PROFILE_DIR", "downloads/profiles")
+# Intervalo de amostragem da memória residente (RSS) das etapas em andamento
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.05"))
+
+# Etapa em andamento no contexto atual (thread ou tarefa assíncrona), usada como pai das etapas internas
+_current_stage = ContextVar("current_stage", default=None)
+
+
+def _rss_bytes():
+    """
+    Retorna a memória residente atual do processo, ou o pico do processo onde ela não está
+    disponível (fora do Linux).
+    """
+    try:
+        with open("/proc/self/statm", "r") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return _max_rss_bytes()
+
+
+def _max_rss_bytes(who=None):
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    # ru_maxrss é em KiB no Linux e em bytes no macOS
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _io_counters():
+    """
+    Retorna os bytes lidos e escritos pelo processo (chamadas read/write, incluindo sockets),
+    ou None fora do Linux.
+    """
+    try:
+        with open("/proc/self/io", "r") as file:
+            counters = dict(line.split(": ") for line in file.read().splitlines())
+        return int(counters["rchar"]), int(counters["wchar"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _mb(value):
+    return round(value / 1024 / 1024, 1) if value is not None else None
+
+
+def measure(func, *args, **kwargs):
+    """
+    Executa uma função e mede o tempo e a memória do processo atual. Usada nos processos de
+    um pool, onde o Profiler do processo principal não alcança; o resultado é registrado
+    depois com Profiler.add_record, que ignora as métricas com a medição desativada. O custo é
+    de alguns relógios por chamada, então os pools usam measure com ou sem a medição ativa.
+
+    :return: Tupla (retorno da função, métricas).
+    """
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+    result = func(*args, **kwargs)
+    return result, {
+        "wall_seconds": round(time.perf_counter() - start, 4),
+        "cpu_seconds": round(time.process_time() - start_cpu, 4),
+        "peak_rss_mb": _mb(max(_rss_bytes(), _max_rss_bytes())),
+        "pid": os.getpid(),
+    }
+
+
+class StageRecord:
+    """
+    Métricas de uma execução de etapa. Linhas e bytes processados são informados pela própria
+    etapa (atributos rows, bytes_read e bytes_written); tempos, memória e E/S do processo são
+    medidos pelo Profiler.
+    """
+
+    def __init__(self, name, parent=None, rows=None, bytes_read=None, bytes_written=None):
+        self.name = name
+        self.parent = parent
+        self.rows = rows
+        self.bytes_read = bytes_read
+        self.bytes_written = bytes_written
+        self.status = "ok"
+        self.error = None
+        self.peak_rss = 0
+        self.metrics = {}
+
+    def to_dict(self):
+        wall = self.metrics.get("wall_seconds")
+        return {
+            "stage": self.name,
+            "parent": self.parent,
+            "status": self.status,
+            **self.metrics,
+            "rows": self.rows,
+            "rows_per_sec": round(self.rows / wall) if self.rows and wall else None,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "error": self.error,
+        }
+
+
+class Profiler:
+    """
+    Mede as etapas de um script em lote (tempo real e de CPU, pico de memória residente, E/S
+    e linhas processadas) e grava um relatório JSON da execução. Desativado, stage() apenas
+    devolve um registro vazio, sem medir nada.
+
+    Os contadores de CPU e de E/S são do processo inteiro: em etapas simultâneas (threads ou
+    tarefas assíncronas) eles se sobrepõem. A CPU dos processos filhos só é contabilizada
+    quando eles terminam.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.run_name = None
+        self.dump_stage = None
+        self.records = []
+        self._lock = threading.Lock()
+        self._active = set()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._profile = None
+        self._profile_owner = None
+        self._profiled = False
+        self._started_at = None
+        self._start = None
+
+    def enable(self, run_name, dump_stage=None):
+        """
+        Ativa a medição das etapas.
+
+        :param run_name: Nome da execução, usado no nome do relatório (ex.: 'database').
+        :param dump_stage: Etapa executada sob o cProfile (nome completo ou o prefixo antes de
+            ':', como 'copy' para todas as etapas 'copy:<arquivo>'); o dump acumula todas as
+            execuções da etapa.
+        """
+        self.enabled = True
+        self.run_name = run_name
+        self.dump_stage = dump_stage
+        self.records = []
+        self._started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._profile = cProfile.Profile() if dump_stage else None
+        self._profiled = False
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, name="profiler-rss", daemon=True)
+        self._sampler.start()
+
+    def configure(self, run_name, args):
+        """
+        Ativa a medição conforme os argumentos de add_profiling_arguments ou a variável PROFILE.
+        """
+        if args.profile or args.profile_dump or PROFILE_ENABLED:
+            self.enable(run_name, dump_stage=args.profile_dump)
+
+    def _sample(self):
+        while not self._stop.wait(PROFILE_SAMPLE_INTERVAL):
+            rss = _rss_bytes()
+            with self._lock:
+                for record in self._active:
+                    record.peak_rss = max(record.peak_rss, rss)
+
+    def _matches_dump(self, name):
+        return self.dump_stage in (name, name.split(":", 1)[0])
+
+    @contextmanager
+    def stage(self, name, rows=None, bytes_read=None, bytes_written=None):
+        """
+        Mede uma etapa. O registro devolvido pode receber as linhas e os bytes processados:
+
+            with profiler.stage(f"copy:{arquivo}") as record:
+                ...
+                record.rows = cursor.rowcount
+
+        :param name: Nome da etapa ('tipo:detalhe' para etapas repetidas, como um COPY por arquivo).
+        """
+        record = StageRecord(name, rows=rows, bytes_read=bytes_read, bytes_written=bytes_written)
+        if not self.enabled:
+            yield record
+            return
+
+        record.parent = _current_stage.get()
+        token = _current_stage.set(name)
+        record.peak_rss = _rss_bytes()
+        io_start = _io_counters()
+        offset = time.perf_counter() - self._start
+        start = time.perf_counter()
+        start_cpu = time.process_time()
+        start_children = _children_cpu()
+        with self._lock:
+            self._active.add(record)
+            # O cProfile mede uma thread por vez: execuções simultâneas da etapa ficam de fora
+            profiling = self._profile is not None and self._profile_owner is None and self._matches_dump(name)
+            if profiling:
+                self._profile_owner = threading.get_ident()
+                self._profiled = True
+        if profiling:
+            self._profile.enable()
+
+        try:
+            yield record
+        except BaseException as e:
+            record.status = "erro"
+            record.error = str(e)
+            raise
+        finally:
+            if profiling:
+                self._profile.disable()
+            wall = time.perf_counter() - start
+            io_end = _io_counters()
+            record.metrics = {
+                "offset_seconds": round(offset, 4),
+                "wall_seconds": round(wall, 4),
+                "cpu_seconds": round(time.process_time() - start_cpu, 4),
+                "children_cpu_seconds": round(_children_cpu() - start_children, 4),
+                "peak_rss_mb": _mb(max(record.peak_rss, _rss_bytes())),
+                "io_read_mb": _mb(io_end[0] - io_start[0]) if io_start and io_end else None,
+                "io_write_mb": _mb(io_end[1] - io_start[1]) if io_start and io_end else None,
+                "thread": threading.current_thread().name,
+            }
+            with self._lock:
+                self._active.discard(record)
+                self.records.append(record)
+                if profiling:
+                    self._profile_owner = None
+            _current_stage.reset(token)
+
+    def add_record(self, name, metrics, rows=None, bytes_read=None, bytes_written=None):
+        """
+        Registra uma etapa medida em outro processo com measure().
+        """
+        if not self.enabled:
+            return
+        record = StageRecord(name, _current_stage.get(), rows, bytes_read, bytes_written)
+        record.metrics = {"offset_seconds": round(time.perf_counter() - self._start, 4), **metrics}
+        with self._lock:
+            self.records.append(record)
+
+    def summary(self):
+        """
+        Agrega as etapas pelo tipo (o nome antes de ':'), na ordem da primeira execução.
+        """
+        groups = {}
+        for record in self.records:
+            stage = record.to_dict()
+            group = groups.setdefault(record.name.split(":", 1)[0], {
+                "stage": record.name.split(":", 1)[0], "count": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0,
+                "peak_rss_mb": 0.0, "rows": 0, "leaf": True,
+            })
+            group["count"] += 1
+            group["wall_seconds"] = round(group["wall_seconds"] + (stage.get("wall_seconds") or 0), 4)
+            group["cpu_seconds"] = round(
+                group["cpu_seconds"] + (stage.get("cpu_seconds") or 0) + (stage.get("children_cpu_seconds") or 0), 4
+            )
+            group["peak_rss_mb"] = max(group["peak_rss_mb"], stage.get("peak_rss_mb") or 0)
+            group["rows"] += stage["rows"] or 0
+        for record in self.records:
+            if record.parent:
+                parent = groups.get(record.parent.split(":", 1)[0])
+                if parent:
+                    parent["leaf"] = False
+        return list(groups.values())
+
+    def save(self, report_dir=PROFILE_DIR):
+        """
+        Grava o relatório JSON da execução (e o dump do cProfile, se houver) e imprime o resumo.
+        A etapa mais lenta sem etapas internas é indicada como 'hot_stage', candidata a --profile-dump.
+
+        :return: Caminho do relatório, ou None se a medição estiver desativada.
+        """
+        if not self.enabled:
+            return None
+        self._stop.set()
+        self._sampler.join()
+
+        os.makedirs(report_dir, exist_ok=True)
+        base_path = os.path.join(report_dir, f"{self.run_name}-{self._started_at:%Y%m%d-%H%M%S}")
+        summary = self.summary()
+        leaves = [group for group in summary if group["leaf"]]
+        hot_stage = max(leaves, key=lambda group: group["wall_seconds"])["stage"] if leaves else None
+
+        dump_path = None
+        if self._profile is not None and not self._profiled:
+            # Etapas medidas em outros processos (add_record) não passam pelo cProfile deste processo
+            print(f"\nA etapa '{self.dump_stage}' não executou neste processo; nenhum perfil do cProfile foi gravado.")
+        elif self._profile is not None:
+            dump_path = f"{base_path}.{self.dump_stage.replace(':', '_')}.prof"
+            self._profile.dump_stats(dump_path)
+
+        report = {
+            "run": self.run_name,
+            "started_at": self._started_at.isoformat(timespec="seconds"),
+            "argv": sys.argv,
+            "pid": os.getpid(),
+            "total_seconds": round(time.perf_counter() - self._start, 3),
+            "peak_rss_mb": _mb(_max_rss_bytes()),
+            "children_peak_rss_mb": _mb(_max_rss_bytes(resource.RUSAGE_CHILDREN)) if resource else None,
+            "hot_stage": hot_stage,
+            "profile_dump": dump_path,
+            "summary": summary,
+            "stages": [record.to_dict() for record in self.records],
+        }
+        with open(f"{base_path}.json", "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+        columns = ["stage", "count", "wall_seconds", "cpu_seconds", "peak_rss_mb", "rows"]
+        print("\n" + tabulate([[group[column] for column in columns] for group in summary], headers=columns))
+        print(f"\nEtapa mais lenta: {hot_stage}. Relatório de execução salvo em: {base_path}.json")
+        if dump_path:
+            print(f"Perfil do cProfile ({self.dump_stage}) salvo em: {dump_path}")
+        self.enabled = False
+        return f"{base_path}.json"
+
+
+# Profiler compartilhado pelos módulos de um mesmo processo
+profiler = Profiler()
+
+
+def add_profiling_arguments(parser):
+    """
+    Adiciona as opções de medição das etapas à linha de comando de um script.
+    """
+    parser.add_argument(
+        "--profile", action="store_true",
+        help=f"Mede cada etapa e grava um relatório JSON em {PROFILE_DIR}."
+    )
+    parser.add_argument(
+        "--profile-dump", metavar="ETAPA",
+        help="Executa a etapa sob o cProfile e grava o dump (.prof) junto do relatório."
+    )
+
+
+def compare_reports(previous, current):
+    """
+    Compara o resumo de duas execuções, etapa a etapa.
+
+    :param previous: Relatório anterior (dicionário lido do JSON).
+    :param current: Relatório atual.
+    :return: Lista com a variação percentual de tempo, CPU e memória de cada etapa.
+    """
+    previous_groups = {group["stage"]: group for group in previous["summary"]}
+    comparison = []
+    for group in current["summary"]:
+        before = previous_groups.get(group["stage"])
+        if not before:
+            continue
+        row = {"stage": group["stage"]}
+        for metric in ("wall_seconds", "cpu_seconds", "peak_rss_mb"):
+            row[f"{metric}_before"] = before[metric]
+            row[f"{metric}_now"] = group[metric]
+            row[f"{metric}_change_pct"] = (
+                round((group[metric] - before[metric]) / before[metric] * 100, 1) if before[metric] else None
+            )
+        comparison.append(row)
+    return comparison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara dois relatórios de execução gerados com --profile.")
+    parser.add_argument("previous", help="Relatório anterior (ex.: da execução noturna de ontem).")
+    parser.add_argument("current", help="Relatório atual.")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0,
+        help="Variação de tempo (%%) a partir da qual uma etapa é apontada como regressão."
+    )
+    args = parser.parse_args()
+
+    with open(args.previous, "r", encoding="utf-8") as file:
+        previous = json.load(file)
+    with open(args.current, "r", encoding="utf-8") as file:
+        current = json.load(file)
+
+    comparison = compare_reports(previous, current)
+    print(tabulate(comparison, headers="keys"))
+    regressions = [row["stage"] for row in comparison if (row["wall_seconds_change_pct"] or 0) > args.threshold]
+    if regressions:
+        print(f"\nEtapas mais lentas que o limite de {args.threshold}%: {', '.join(regressions)}")
+        sys.exit(1)
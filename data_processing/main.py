@@ -1,51 +1,258 @@
+import io
 import os
+import sys
 import csv
-import zipfile
-import pandas as pd
+import argparse
+import itertools
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
 import pdfplumber
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.archive import (  # noqa: E402
+    COMPRESSION_METHODS, ZIP_COMPRESSION, ZIP_COMPRESSLEVEL, open_zip, validate_zip, zip_files
+)
+from data_processing.page_cache import PageCache  # noqa: E402
+from common.profiling import add_profiling_arguments, measure, profiler  # noqa: E402
 
-def extract_table_from_pdf(pdf_path, output_csv):
+# Legenda para substituição das abreviações das colunas OD e AMB
+ABBREVIATIONS = {
+    "OD": "Odontologia",
+    "AMB": "Ambulatorial"
+}
+
+
+def pdfplumber_page_tables(pdf_path, page_numbers=None):
     """
-    Extrai o conteúdo da tabela do PDF e salva em um arquivo CSV, ignorando cabeçalhos repetidos.
-    
+    Gera, página a página, as tabelas extraídas pelo pdfplumber.
+
     :param pdf_path: Caminho do PDF de entrada.
-    :param output_csv: Caminho do arquivo CSV de saída.
+    :param page_numbers: Números das páginas (começando em 1); todas se None.
+    :return: Gerador de tuplas (número da página, total de páginas do PDF, tabelas da página).
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        total_pages = len(pdf.pages)
+        for number in page_numbers or range(1, total_pages + 1):
+            page = pdf.pages[number - 1]
+            yield number, total_pages, page.extract_tables()
+            # Libera os objetos já analisados da página
+            page.close()
+
+
+def pymupdf_page_tables(pdf_path, page_numbers=None):
+    """
+    Gera, página a página, as tabelas extraídas pelo find_tables do PyMuPDF,
+    bem mais rápido que o pdfplumber em PDFs grandes com muitas tabelas.
+
+    :param pdf_path: Caminho do PDF de entrada.
+    :param page_numbers: Números das páginas (começando em 1); todas se None.
+    :return: Gerador de tuplas (número da página, total de páginas do PDF, tabelas da página).
+    """
+    import pymupdf
+
+    with pymupdf.open(pdf_path) as doc:
+        total_pages = doc.page_count
+        for number in page_numbers or range(1, total_pages + 1):
+            page = doc[number - 1]
+            yield number, total_pages, [table.extract() for table in page.find_tables().tables]
+
+
+# Backends de extração de tabelas disponíveis
+PDF_BACKENDS = {
+    "pdfplumber": pdfplumber_page_tables,
+    "pymupdf": pymupdf_page_tables,
+}
+
+
+def count_pages(pdf_path):
+    """
+    Retorna a quantidade de páginas do PDF.
+    """
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_page_tables(pdf_path, page_numbers, backend="pdfplumber"):
+    """
+    Extrai as tabelas de um lote de páginas do PDF. Executada em um processo separado
+    quando a extração é paralela.
+
+    :param pdf_path: Caminho do PDF de entrada.
+    :param page_numbers: Números das páginas (começando em 1) do lote.
+    :param backend: Backend de extração (chave de PDF_BACKENDS).
+    :return: Lista com as tabelas de cada página, na ordem das páginas.
+    """
+    return [page_tables for _, _, page_tables in PDF_BACKENDS[backend](pdf_path, page_numbers)]
+
+
+def _count_rows(pages):
+    return sum(len(table) for tables in pages for table in tables)
+
+
+def iter_extracted_pages(pdf_path, page_numbers, total_pages, workers=1, batch_size=20, backend="pdfplumber"):
+    """
+    Gera as tabelas de cada página informada, na ordem das páginas.
+
+    As páginas são extraídas em lotes de batch_size páginas, cada lote medido como uma etapa
+    'pdf_batch' (sem custo com a medição desativada). Com workers > 1, os lotes são extraídos em
+    paralelo por um pool de processos e gerados na ordem das páginas.
+
+    :param pdf_path: Caminho do PDF de entrada.
+    :param page_numbers: Números das páginas (começando em 1) a extrair.
+    :param total_pages: Total de páginas do PDF, usado no progresso.
+    :param workers: Quantidade de processos de extração.
+    :param batch_size: Quantidade de páginas por lote.
+    :param backend: Backend de extração (chave de PDF_BACKENDS).
+    :return: Gerador de tuplas (número da página, tabelas da página).
+    """
+    if not page_numbers:
+        return
+
+    if workers > 1:
+        batches = [page_numbers[start:start + batch_size] for start in range(0, len(page_numbers), batch_size)]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # map preserva a ordem dos lotes, mesmo que terminem fora de ordem; cada processo
+            # mede o próprio lote (ver common/profiling.measure)
+            arguments = [pdf_path] * len(batches), batches, [backend] * len(batches)
+            results = executor.map(measure, [extract_page_tables] * len(batches), *arguments)
+            for batch, (pages, metrics) in zip(batches, results):
+                profiler.add_record(f"pdf_batch:{batch[0]}-{batch[-1]}", metrics, rows=_count_rows(pages))
+                print(f"Extraindo dados da tabela (página {batch[-1]}/{total_pages})...")
+                yield from zip(batch, pages)
+        return
+
+    extracted = PDF_BACKENDS[backend](pdf_path, page_numbers)
+    for start in range(0, len(page_numbers), batch_size):
+        batch = page_numbers[start:start + batch_size]
+        with profiler.stage(f"pdf_batch:{batch[0]}-{batch[-1]}") as record:
+            pages = []
+            for number, _, tables in itertools.islice(extracted, len(batch)):
+                if (number % 10 == 0 or number == total_pages):
+                    print(f"Extraindo dados da tabela (página {number}/{total_pages})...")
+                pages.append((number, tables))
+            record.rows = _count_rows([tables for _, tables in pages])
+        yield from pages
+
+
+def iter_page_tables(pdf_path, workers=1, batch_size=20, backend="pdfplumber", cache=None):
+    """
+    Gera as tabelas do PDF na ordem das páginas, mantendo em memória apenas a página
+    (ou, em paralelo, os lotes de páginas) em processamento.
+
+    Com um cache, as páginas já extraídas são lidas do disco e apenas as páginas novas
+    ou alteradas são extraídas (e armazenadas).
+
+    :param pdf_path: Caminho do PDF de entrada.
+    :param workers: Quantidade de processos de extração.
+    :param batch_size: Quantidade de páginas por lote.
+    :param backend: Backend de extração (chave de PDF_BACKENDS).
+    :param cache: PageCache opcional com as tabelas já extraídas.
     """
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f"O arquivo PDF não foi encontrado: {pdf_path}")
-    
-    # Lê o PDF
-    data_tables = []
-    with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            if (page.page_number % 10 == 0 or page.page_number == len(pdf.pages)):
-                print(f"Extraindo dados da tabela (página {page.page_number}/{len(pdf.pages)})...")
-            tables = page.extract_tables()
-            for table in tables:
-                data_tables.append(table)
-
-    # Salva os dados em CSV
-    with open(output_csv, mode="w", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        header_written = False
-        for table in data_tables:
-            for row in table:
-                row = [cell.replace("\n", " ") for cell in row]
-                # Ignora cabeçalhos repetidos
-                if not header_written and "VIGÊNCIA" in row:
-                    writer.writerow(row)  # Escreve o cabeçalho
-                    header_written = True
-                    continue
-            
-                # Ignora cabeçalhos repetidos
-                if "VIGÊNCIA" in row:
+    if backend not in PDF_BACKENDS:
+        raise ValueError(f"Backend de extração desconhecido: {backend}")
+
+    if cache is None:
+        total_pages = count_pages(pdf_path)
+        pages = range(1, total_pages + 1)
+        for _, tables in iter_extracted_pages(pdf_path, pages, total_pages, workers, batch_size, backend):
+            yield from tables
+        return
+
+    keys = cache.page_keys(pdf_path, backend)
+    total_pages = len(keys)
+    missing = [number for number, key in enumerate(keys, start=1) if not cache.contains(key)]
+    missing_set = set(missing)
+    print(f"Cache de extração: {total_pages - len(missing)} de {total_pages} páginas reaproveitadas.")
+
+    extracted = iter_extracted_pages(pdf_path, missing, total_pages, workers, batch_size, backend)
+    for number, key in enumerate(keys, start=1):
+        tables = cache.get(key) if number not in missing_set else None
+        if tables is None:
+            # Entrada ausente ou removida durante a execução: extrai a página
+            if number in missing_set:
+                _, tables = next(extracted)
+            else:
+                _, _, tables = next(PDF_BACKENDS[backend](pdf_path, [number]))
+            cache.set(key, tables)
+        yield from tables
+
+    evicted = cache.evict()
+    if evicted:
+        print(f"Cache de extração: {evicted} páginas antigas removidas.")
+
+
+def iter_table_rows(tables, legend=None):
+    """
+    Gera as linhas das tabelas prontas para o CSV: quebras de linha removidas das células,
+    apenas o primeiro cabeçalho mantido e, opcionalmente, abreviações substituídas.
+
+    :param tables: Iterável de tabelas (listas de linhas).
+    :param legend: Dicionário de abreviações a substituir (células com o valor exato).
+    """
+    header_written = False
+    for table in tables:
+        for row in table:
+            row = [(cell or "").replace("\n", " ") for cell in row]
+            # Ignora cabeçalhos repetidos
+            if "VIGÊNCIA" in row:
+                if header_written:
                     continue
+                header_written = True
+
+            if legend:
+                row = [legend.get(cell, cell) for cell in row]
+            yield row
+
 
-                writer.writerow(row)  # Escreve cada linha da tabela no CSV
+def write_csv_rows(rows, output_csv=None, zip_path=None, compression=ZIP_COMPRESSION,
+                   compresslevel=ZIP_COMPRESSLEVEL):
+    """
+    Escreve as linhas em um único passo no CSV e/ou diretamente em um arquivo ZIP
+    (com o mesmo nome de arquivo do CSV), sem arquivos intermediários.
+
+    :param rows: Iterável de linhas.
+    :param output_csv: Caminho do CSV de saída (opcional se zip_path for informado).
+    :param zip_path: Caminho do arquivo ZIP de saída (opcional).
+    :param compression: Método de compressão do ZIP (chave de COMPRESSION_METHODS).
+    :param compresslevel: Nível de compressão do ZIP.
+    """
+    arcname = os.path.basename(output_csv) if output_csv else "rol_procedimentos.csv"
+    with ExitStack() as stack:
+        writers = []
+        if output_csv:
+            file = stack.enter_context(open(output_csv, mode="w", newline="", encoding="utf-8"))
+            writers.append(csv.writer(file))
+        if zip_path:
+            zipf = stack.enter_context(open_zip(zip_path, compression, compresslevel))
+            member = stack.enter_context(zipf.open(arcname, "w"))
+            text = stack.enter_context(io.TextIOWrapper(member, encoding="utf-8", newline=""))
+            writers.append(csv.writer(text))
+
+        for row in rows:
+            for writer in writers:
+                writer.writerow(row)
+
+    if output_csv and (not os.path.exists(output_csv) or os.path.getsize(output_csv) == 0):
+        raise ValueError(f"Falha ao gerar o arquivo: {output_csv}")
+    if zip_path:
+        validate_zip(zip_path)
+
+
+def extract_table_from_pdf(pdf_path, output_csv, workers=1, batch_size=20, backend="pdfplumber", cache=None):
+    """
+    Extrai o conteúdo da tabela do PDF e salva em um arquivo CSV, ignorando cabeçalhos repetidos.
     
-    if not os.path.exists(output_csv) or os.path.getsize(output_csv) == 0:
-        raise ValueError(f"Falha ao gerar o arquivo CSV: {output_csv}")
+    :param pdf_path: Caminho do PDF de entrada.
+    :param output_csv: Caminho do arquivo CSV de saída.
+    :param workers: Quantidade de processos de extração.
+    :param batch_size: Quantidade de páginas por lote.
+    :param backend: Backend de extração (chave de PDF_BACKENDS).
+    :param cache: PageCache opcional com as tabelas já extraídas.
+    """
+    write_csv_rows(iter_table_rows(iter_page_tables(pdf_path, workers, batch_size, backend, cache)), output_csv)
 
     print(f"\nTabela extraída com sucesso para:\n{output_csv}")
 
@@ -56,52 +263,96 @@ def replace_abbreviations(csv_path, output_csv):
     :param csv_path: Caminho do CSV de entrada.
     :param output_csv: Caminho do CSV de saída com as abreviações substituídas.
     """
-    # Legenda para substituição
-    legend = {
-        "OD": "Odontologia",
-        "AMB": "Ambulatorial"
-    }
+    # Lê e reescreve o CSV linha a linha, substituindo as abreviações
+    tmp_csv = output_csv + ".tmp"
+    with open(csv_path, newline="", encoding="utf-8") as file:
+        rows = ([ABBREVIATIONS.get(cell, cell) for cell in row] for row in csv.reader(file))
+        write_csv_rows(rows, tmp_csv)
+    os.replace(tmp_csv, output_csv)
+    print(f"\nAbreviações substituídas com sucesso e CSV atualizado em:\n{output_csv}")
 
-    # Lê o CSV em um DataFrame
-    df = pd.read_csv(csv_path, header=None)
+def extract_rol_procedimentos(pdf_path, output_csv=None, zip_path=None, workers=1, batch_size=20,
+                              backend="pdfplumber", cache=None, compression=ZIP_COMPRESSION,
+                              compresslevel=ZIP_COMPRESSLEVEL):
+    """
+    Extrai a tabela do PDF, substitui as abreviações e grava o CSV e/ou o ZIP em um único
+    fluxo: as páginas são lidas uma a uma e cada linha é escrita assim que processada.
 
-    # Substitui as abreviações
-    df.replace(legend, inplace=True)
+    :param pdf_path: Caminho do PDF de entrada.
+    :param output_csv: Caminho do CSV de saída (opcional se zip_path for informado).
+    :param zip_path: Caminho do arquivo ZIP de saída (opcional).
+    :param workers: Quantidade de processos de extração.
+    :param batch_size: Quantidade de páginas por lote.
+    :param backend: Backend de extração (chave de PDF_BACKENDS).
+    :param cache: PageCache opcional com as tabelas já extraídas.
+    :param compression: Método de compressão do ZIP (chave de COMPRESSION_METHODS).
+    :param compresslevel: Nível de compressão do ZIP.
+    """
+    tables = iter_page_tables(pdf_path, workers, batch_size, backend, cache)
+    rows = iter_table_rows(tables, legend=ABBREVIATIONS)
+    write_csv_rows(rows, output_csv, zip_path, compression, compresslevel)
 
-    # Salva o CSV atualizado
-    df.to_csv(output_csv, index=False, header=False, encoding="utf-8")
-    print(f"\nAbreviações substituídas com sucesso e CSV atualizado em:\n{output_csv}")
+    print(f"\nTabela extraída e abreviações substituídas com sucesso.")
+    for path in (output_csv, zip_path):
+        if path:
+            print(path)
 
-def compress_csv_to_zip(csv_path, zip_path):
+def compress_csv_to_zip(csv_path, zip_path, compression=ZIP_COMPRESSION, compresslevel=ZIP_COMPRESSLEVEL):
     """
     Compacta o arquivo CSV em um arquivo ZIP.
     
     :param csv_path: Caminho do CSV a ser compactado.
     :param zip_path: Caminho do arquivo ZIP de saída.
+    :param compression: Método de compressão (chave de COMPRESSION_METHODS).
+    :param compresslevel: Nível de compressão.
     """
-    with zipfile.ZipFile(zip_path, "w") as zipf:
-        zipf.write(csv_path, os.path.basename(csv_path))
-
-    if not os.path.exists(zip_path) or os.path.getsize(zip_path) == 0:
-        raise ValueError(f"Falha ao criar o arquivo ZIP: {zip_path}")
+    zip_files([csv_path], zip_path, method=compression, level=compresslevel)
     
     print(f"\nArquivo CSV compactado com sucesso em:\n{zip_path}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extração da tabela do Anexo I do Rol de Procedimentos.")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Processos de extração de páginas em paralelo (padrão: 1, extração serial)."
+    )
+    parser.add_argument("--batch-size", type=int, default=20, help="Páginas por lote de extração.")
+    parser.add_argument(
+        "--backend", choices=sorted(PDF_BACKENDS), default="pdfplumber",
+        help="Biblioteca usada para extrair as tabelas do PDF."
+    )
+    parser.add_argument(
+        "--compression", choices=sorted(COMPRESSION_METHODS), default=ZIP_COMPRESSION,
+        help="Método de compressão do ZIP."
+    )
+    parser.add_argument("--compresslevel", type=int, default=ZIP_COMPRESSLEVEL, help="Nível de compressão do ZIP.")
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Extrai todas as páginas novamente, sem usar o cache de extração."
+    )
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
     os.system('cls' if os.name == 'nt' else 'clear')
+    profiler.configure("data_processing", args)
 
     # Caminhos dos arquivos
     pdf_path = "downloads/Anexo_1.pdf"  # PDF do Anexo I
-    raw_csv = "data_processing/rol_procedimentos_raw.csv"
     processed_csv = "data_processing/rol_procedimentos.csv"
     zip_file = f"data_processing/Teste_Luis_Queiroz.zip"
 
-    # 2.1 e 2.2 Extrai a tabela do PDF e salva em CSV
-    extract_table_from_pdf(pdf_path, raw_csv)
+    # Páginas já extraídas de um PDF com o mesmo conteúdo são lidas do cache
+    cache = None if args.no_cache else PageCache()
 
-    # 2.4. Substitui abreviações nas colunas OD e AMB
-    replace_abbreviations(raw_csv, processed_csv)
+    # 2.1 a 2.4 Extrai a tabela do PDF, substitui as abreviações das colunas OD e AMB
+    # e grava o CSV e o ZIP em um único passo
+    with profiler.stage("extract_rol_procedimentos", bytes_read=os.path.getsize(pdf_path)) as record:
+        extract_rol_procedimentos(
+            pdf_path, processed_csv, zip_file,
+            workers=args.workers, batch_size=args.batch_size, backend=args.backend, cache=cache,
+            compression=args.compression, compresslevel=args.compresslevel
+        )
+        record.bytes_written = os.path.getsize(processed_csv) + os.path.getsize(zip_file)
 
-    # 2.3. Compacta o CSV em um arquivo ZIP
-    compress_csv_to_zip(processed_csv, zip_file)
\ No newline at end of file
+    profiler.save()
\ No newline at end of file
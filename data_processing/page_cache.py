@@ -0,0 +1,198 @@
+import os
+import json
+import hashlib
+import pdfplumber
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+
+# Versão da lógica de extração; incrementar invalida todas as entradas do cache
+EXTRACTOR_VERSION = "2"
+
+# Configurações do cache de extração
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "data_processing/.cache")
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_hash(path):
+    """
+    Calcula o SHA-256 do conteúdo do arquivo.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def backend_version(backend):
+    """
+    Retorna a versão da biblioteca do backend de extração, que também compõe as chaves do cache.
+    """
+    if backend == "pymupdf":
+        import pymupdf
+        return f"pymupdf-{pymupdf.VersionBind}"
+    return f"pdfplumber-{pdfplumber.__version__}"
+
+
+def _update_digest(digest, obj, memo):
+    """
+    Acrescenta ao hash o conteúdo de um objeto do PDF, resolvendo referências e fluxos
+    (fontes, Form XObjects, imagens). Cada objeto referenciado é resumido uma única vez por
+    documento (memo), e uma referência circular entra apenas como marcador.
+    """
+    if isinstance(obj, PDFObjRef):
+        if obj.objid not in memo:
+            memo[obj.objid] = "ciclo"
+            nested = hashlib.sha256()
+            _update_digest(nested, resolve1(obj), memo)
+            memo[obj.objid] = nested.hexdigest()
+        digest.update(f"ref:{memo[obj.objid]};".encode())
+    elif isinstance(obj, PDFStream):
+        _update_digest(digest, obj.attrs, memo)
+        digest.update(obj.get_data())
+    elif isinstance(obj, dict):
+        digest.update(b"<<")
+        for key in sorted(obj, key=str):
+            digest.update(f"{key}:".encode())
+            _update_digest(digest, obj[key], memo)
+        digest.update(b">>")
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b"[")
+        for item in obj:
+            _update_digest(digest, item, memo)
+        digest.update(b"]")
+    else:
+        digest.update(f"{obj!r};".encode())
+
+
+def page_fingerprints(pdf_path):
+    """
+    Calcula, para cada página, o hash dos fluxos de conteúdo, das dimensões e dos recursos da
+    página (/Resources: fontes, Form XObjects e imagens, com o conteúdo dos seus fluxos). Páginas
+    com o mesmo desenho têm o mesmo hash, mesmo que outras páginas do PDF mudem; páginas que
+    desenham XObjects diferentes com o mesmo fluxo de conteúdo (q /Fm0 Do Q) não.
+
+    :param pdf_path: Caminho do PDF.
+    :return: Lista de hashes, na ordem das páginas.
+    """
+    fingerprints = []
+    memo = {}
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            digest = hashlib.sha256(repr(page.page_obj.mediabox).encode())
+            for stream in page.page_obj.contents:
+                digest.update(resolve1(stream).get_data())
+            _update_digest(digest, page.page_obj.resources, memo)
+            fingerprints.append(digest.hexdigest())
+            page.close()
+    return fingerprints
+
+
+class PageCache:
+    """
+    Cache em disco das tabelas extraídas de cada página, endereçado pelo conteúdo.
+
+    Cada página é armazenada sob o hash do seu conteúdo, da versão do extrator e do backend;
+    um manifesto por PDF (indexado pelo hash do arquivo) guarda as chaves das páginas, de modo
+    que um PDF inalterado não precisa nem ser aberto. O tamanho total é limitado, removendo
+    as páginas usadas há mais tempo.
+    """
+
+    def __init__(self, cache_dir=PDF_CACHE_DIR, max_bytes=PDF_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.pages_dir = os.path.join(cache_dir, "pages")
+        self.documents_dir = os.path.join(cache_dir, "documents")
+        os.makedirs(self.pages_dir, exist_ok=True)
+        os.makedirs(self.documents_dir, exist_ok=True)
+
+    def _page_path(self, key):
+        return os.path.join(self.pages_dir, f"{key}.json")
+
+    def _write_json(self, path, data):
+        # Gravação atômica: leitores nunca veem um arquivo pela metade
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def page_keys(self, pdf_path, backend):
+        """
+        Retorna as chaves de cache de cada página do PDF, reaproveitando o manifesto do
+        documento quando o arquivo não mudou.
+
+        :param pdf_path: Caminho do PDF.
+        :param backend: Backend de extração.
+        """
+        version = f"{EXTRACTOR_VERSION}:{backend}:{backend_version(backend)}"
+        document_id = hashlib.sha256(f"{file_hash(pdf_path)}:{version}".encode()).hexdigest()
+        manifest_path = os.path.join(self.documents_dir, f"{document_id}.json")
+
+        try:
+            with open(manifest_path, encoding="utf-8") as file:
+                return json.load(file)["pages"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+        keys = [
+            hashlib.sha256(f"{fingerprint}:{version}".encode()).hexdigest()
+            for fingerprint in page_fingerprints(pdf_path)
+        ]
+        self._write_json(manifest_path, {"pdf": os.path.basename(pdf_path), "pages": keys})
+        return keys
+
+    def contains(self, key):
+        return os.path.exists(self._page_path(key))
+
+    def get(self, key):
+        """
+        Retorna as tabelas armazenadas para a página, ou None se ausente.
+        """
+        path = self._page_path(key)
+        try:
+            with open(path, encoding="utf-8") as file:
+                tables = json.load(file)["tables"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+        # Atualiza o horário de acesso usado na remoção das entradas mais antigas
+        os.utime(path)
+        return tables
+
+    def set(self, key, tables):
+        """
+        Armazena as tabelas extraídas de uma página.
+        """
+        self._write_json(self._page_path(key), {"tables": tables})
+
+    def evict(self):
+        """
+        Remove as páginas usadas há mais tempo até o cache caber em max_bytes.
+
+        :return: Quantidade de páginas removidas.
+        """
+        evicted = 0
+        entries = []
+        total = 0
+        for entry in os.scandir(self.pages_dir):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            evicted += 1
+
+        # Manifestos de documentos são pequenos; mantém apenas os mais recentes
+        manifests = sorted(
+            (entry.stat().st_mtime, entry.path) for entry in os.scandir(self.documents_dir) if entry.is_file()
+        )
+        for _, path in manifests[:-100]:
+            os.remove(path)
+
+        return evicted
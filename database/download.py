@@ -1,46 +1,175 @@
 import os
-from zipfile import ZipFile
+import sys
+import argparse
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 import requests
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.archive import extract_zip  # noqa: E402
+from common.http_metadata import load_metadata, save_metadata  # noqa: E402
+from common.profiling import add_profiling_arguments, profiler  # noqa: E402
 
-def download_zips(download_dir="downloads") -> list:
+
+# URLs dos arquivos ZIP
+ANS_ZIP_URLS = [
+    "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2024/1T2024.zip",
+    "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2024/2T2024.zip",
+    "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2024/3T2024.zip",
+    "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2024/4T2024.zip",
+    "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2023/1T2023.zip",
+    "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2023/2T2023.zip",
+    "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2023/3T2023.zip",
+    "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2023/4T2023.zip",
+]
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB por bloco
+REQUEST_TIMEOUT = 60
+
+
+def _is_current(response, metadata, local_size):
+    """
+    Verifica se a resposta do servidor corresponde ao arquivo local já baixado.
+    """
+    if response.status_code == 304:
+        return True
+    if response.status_code != 200 or not metadata:
+        return False
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    content_length = response.headers.get("Content-Length")
+    same_validator = (
+        (etag and etag == metadata.get("etag"))
+        or (last_modified and last_modified == metadata.get("last_modified"))
+    )
+    same_size = content_length is not None and int(content_length) == local_size
+    return bool(same_validator and same_size)
+
+
+def download_file(url, output_path, session=None, retries=3, backoff=1.0) -> bool:
     """
-    Baixa arquivos ZIP da ANS a partir de uma lista de URLs.
+    Baixa um arquivo via HTTP, retomando downloads parciais com Range e ignorando arquivos
+    que já estão atualizados (ETag/Last-Modified/tamanho).
+
+    :param url: URL do arquivo.
+    :param output_path: Caminho onde o arquivo será salvo.
+    :param session: Sessão HTTP reutilizada entre downloads (opcional).
+    :param retries: Quantidade de novas tentativas em caso de falha.
+    :param backoff: Espera base em segundos entre tentativas (dobra a cada tentativa).
+    :return: True se o arquivo foi baixado, False se o arquivo local já estava atualizado.
+    :raises requests.exceptions.RequestException: Se o download falhar após todas as tentativas.
+    """
+    session = session or requests.Session()
+    part_path = output_path + ".part"
+
+    for attempt in range(retries + 1):
+        try:
+            metadata = load_metadata(output_path)
+            part_metadata = load_metadata(part_path)
+            headers = {}
+            complete = os.path.exists(output_path) and bool(metadata)
+            local_size = os.path.getsize(output_path) if complete else 0
+            part_size = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+            if complete:
+                # Requisição condicional: o servidor responde 304 se nada mudou
+                if metadata.get("etag"):
+                    headers["If-None-Match"] = metadata["etag"]
+                if metadata.get("last_modified"):
+                    headers["If-Modified-Since"] = metadata["last_modified"]
+            elif part_size > 0:
+                # Retoma o download parcial a partir do último byte gravado
+                headers["Range"] = f"bytes={part_size}-"
+                validator = part_metadata.get("etag") or part_metadata.get("last_modified")
+                if validator:
+                    headers["If-Range"] = validator
+
+            with session.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as response:
+                if complete and _is_current(response, metadata, local_size):
+                    return False
+                if response.status_code == 416:
+                    # Parte local inválida para o arquivo remoto: recomeça do zero
+                    if os.path.exists(part_path):
+                        os.remove(part_path)
+                    if attempt == retries:
+                        # Tentativas esgotadas: a falha é propagada, não tratada como "já atualizado"
+                        response.raise_for_status()
+                    continue
+                response.raise_for_status()
+
+                new_metadata = {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+                if response.status_code == 206:
+                    mode = "ab"
+                    expected_size = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+                else:
+                    mode = "wb"
+                    content_length = response.headers.get("Content-Length")
+                    expected_size = int(content_length) if content_length else None
+                save_metadata(part_path, new_metadata)
+
+                with open(part_path, mode) as file:
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):  # Baixa em blocos
+                        file.write(chunk)
+
+            downloaded_size = os.path.getsize(part_path)
+            if expected_size is not None and downloaded_size != expected_size:
+                raise requests.exceptions.ContentDecodingError(
+                    f"Download incompleto: {downloaded_size}/{expected_size} bytes"
+                )
+
+            os.replace(part_path, output_path)
+            os.remove(part_path + ".meta.json")
+            new_metadata["size"] = downloaded_size
+            save_metadata(output_path, new_metadata)
+            return True
+
+        except requests.exceptions.RequestException as e:
+            if attempt == retries:
+                raise
+            wait = backoff * 2 ** attempt
+            print(f"Falha ao baixar {url} ({e}). Nova tentativa em {wait:.1f}s...")
+            time.sleep(wait)
+
+
+def download_zips(download_dir="downloads", urls=None, workers=4, retries=3) -> list:
+    """
+    Baixa arquivos ZIP da ANS a partir de uma lista de URLs, em paralelo.
 
     :param download_dir: Diretório onde os arquivos ZIP serão salvos.
+    :param urls: Lista de URLs (padrão: ANS_ZIP_URLS).
+    :param workers: Quantidade de downloads simultâneos.
+    :param retries: Quantidade de novas tentativas por arquivo em caso de falha.
     :return: Lista de caminhos dos arquivos ZIP baixados.
     """
-    # URLs dos arquivos ZIP
-    urls = [
-        "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2024/1T2024.zip",
-        "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2024/2T2024.zip",
-        "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2024/3T2024.zip",
-        "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2024/4T2024.zip",
-        "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2023/1T2023.zip",
-        "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2023/2T2023.zip",
-        "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2023/3T2023.zip",
-        "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2023/4T2023.zip",
-    ]
-    
-    zip_files = []
+    urls = urls or ANS_ZIP_URLS
+    zip_files = [os.path.join(download_dir, f"DemCon_{i + 1}.zip") for i in range(len(urls))]
 
     os.makedirs(download_dir, exist_ok=True)
 
-    for i, url in enumerate(urls):
-        print(f"Baixando arquivo {i + 1}/{len(urls)}: {url}")
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-
-        zip_filename = os.path.join(download_dir, f"DemCon_{i + 1}.zip")
-        
-        with open(zip_filename, "wb") as file:
-            for chunk in response.iter_content(chunk_size=8192):  # Baixa em blocos
-                file.write(chunk)
-        
+    def download(i):
+        url, zip_filename = urls[i], zip_files[i]
+        with profiler.stage(f"download:{os.path.basename(url)}") as record, requests.Session() as session:
+            downloaded = download_file(url, zip_filename, session=session, retries=retries)
+            record.bytes_written = os.path.getsize(zip_filename) if downloaded else 0
+
         if not os.path.exists(zip_filename) or os.path.getsize(zip_filename) == 0:
             raise ValueError(f"Falha ao baixar o arquivo ZIP: {zip_filename}")
-        
-        zip_files.append(zip_filename)
+
+        status = "baixado" if downloaded else "já atualizado, ignorado"
+        print(f"Arquivo {i + 1}/{len(urls)} {status}: {url}")
+
+    # Cada download executa em uma cópia do contexto atual, para que a medição das etapas
+    # os registre dentro da etapa que chamou download_zips
+    contexts = [contextvars.copy_context() for _ in urls]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        # list() propaga a primeira exceção ocorrida em qualquer download
+        list(executor.map(lambda context, i: context.run(download, i), contexts, range(len(urls))))
 
     print("\nArquivos baixados com sucesso:")
     for zip_file in zip_files:
@@ -48,30 +177,6 @@ def download_zips(download_dir="downloads") -> list:
     
     return zip_files
 
-def extract_zip(zip_filename, extract_to="downloads/DemCon") -> str:
-    """
-    Extrai os arquivos de um arquivo ZIP para o diretório especificado e verifica a integridade dos arquivos extraídos.
-
-    :param zip_filename: Caminho do arquivo ZIP a ser extraído.
-    :param extract_to: Diretório onde os arquivos serão extraídos.
-    :return: Caminho do diretório onde os arquivos foram extraídos.
-    """
-    if not os.path.exists(zip_filename):
-        raise FileNotFoundError(f"O arquivo ZIP não foi encontrado: {zip_filename}")
-    
-    os.makedirs(extract_to, exist_ok=True)
-    
-    with ZipFile(zip_filename, "r") as zipf:
-        zipf.extractall(extract_to)
-        extracted_files = zipf.namelist()
-    
-    for file in extracted_files:
-        file_path = os.path.join(extract_to, file)
-        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
-            raise ValueError(f"Arquivo extraído está corrompido ou vazio: {file_path}")
-    
-    return extract_to
-
 def download_csv(csv_url, output_path="downloads/DemCon/OPSA.csv"):
     """
     Baixa um arquivo CSV de uma URL e salva no caminho especificado.
@@ -82,12 +187,9 @@ def download_csv(csv_url, output_path="downloads/DemCon/OPSA.csv"):
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
     print(f"Baixando arquivo: {csv_url}")
-    response = requests.get(csv_url, stream=True)
-    response.raise_for_status()
-
-    with open(output_path, "wb") as file:
-        for chunk in response.iter_content(chunk_size=8192):
-            file.write(chunk)
+    with profiler.stage(f"download:{os.path.basename(output_path)}") as record:
+        downloaded = download_file(csv_url, output_path)
+        record.bytes_written = os.path.getsize(output_path) if downloaded else 0
 
     if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
         raise ValueError(f"Falha ao baixar o arquivo CSV: {output_path}")
@@ -96,16 +198,30 @@ def download_csv(csv_url, output_path="downloads/DemCon/OPSA.csv"):
     return output_path
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download dos dados abertos da ANS.")
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Não extrai os ZIPs (use com 'database/main.py --stream')."
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Quantidade de downloads simultâneos.")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
     os.system('cls' if os.name == 'nt' else 'clear')
+    profiler.configure("download", args)
 
     print('Baixando arquivos para popular o banco de dados...\n')
 
-    downloaded_files = download_zips()
-    for zip_file in downloaded_files:
-        extract_zip(zip_file)
-    print(f"\nArquivos extraídos com sucesso em: downloads/DemCon\n")
+    with profiler.stage("download_zips"):
+        downloaded_files = download_zips(workers=args.workers)
+    if not args.stream:
+        for zip_file in downloaded_files:
+            with profiler.stage(f"extract_zip:{os.path.basename(zip_file)}", bytes_read=os.path.getsize(zip_file)):
+                extract_zip(zip_file, "downloads/DemCon")
+        print(f"\nArquivos extraídos com sucesso em: downloads/DemCon\n")
     
     csv_url = 'https://dadosabertos.ans.gov.br/FTP/PDA/operadoras_de_plano_de_saude_ativas/Relatorio_cadop.csv'
     csv_path = "downloads/DemCon/OPSA.csv"
     download_csv(csv_url, output_path=csv_path)
- 
\ No newline at end of file
+
+    profiler.save()
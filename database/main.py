@@ -1,8 +1,21 @@
+import io
 import os
+import sys
+import csv
+import uuid
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from zipfile import ZipFile
 import psycopg2
 from tabulate import tabulate
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.snapshot import SNAPSHOT_DIR, export_snapshot, top_n_despesas  # noqa: E402
+from common.profiling import add_profiling_arguments, measure, profiler  # noqa: E402
+
 
 # Configurações do banco de dados
 DB_HOST = "localhost"
@@ -11,6 +24,58 @@ DB_NAME = "ans_database"
 DB_USER = "postgres"
 DB_PASSWORD = "password"
 
+# Colunas de destino do COPY para cada tabela
+TABLE_COLUMNS = {
+    "operadoras": """
+        registro_ans,
+        cnpj,
+        razao_social,
+        nome_fantasia,
+        modalidade,
+        logradouro,
+        numero,
+        complemento,
+        bairro,
+        cidade,
+        uf,
+        cep,
+        ddd,
+        telefone,
+        fax,
+        endereco_eletronico,
+        representante,
+        cargo_representante,
+        regiao_comercializacao,
+        data_registro_ans
+    """,
+    "demonstracoes_contabeis": """
+        data,
+        reg_ans,
+        cd_conta_contabil,
+        descricao,
+        vl_saldo_inicial,
+        vl_saldo_final
+    """,
+}
+
+# Colunas do cadastro de operadoras lidas como texto em todos os modos de preparação: CNPJ, CEP
+# e telefones podem começar com zero (lidos como número, perdiam o zero ou ganhavam ".0")
+TEXT_COLUMNS = ["Registro_ANS", "CNPJ", "CEP", "DDD", "Telefone", "Fax"]
+
+
+# Descrição da conta de eventos/sinistros usada nos relatórios, já normalizada
+# (sem espaços duplicados ou nas bordas, como em despesas_trimestrais.descricao)
+DESCRICAO_EVENTOS_SINISTROS = "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS DE ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR"
+
+
+def table_for_file(filename):
+    """
+    Retorna a tabela de destino de um arquivo CSV da ANS.
+
+    :param filename: Nome do arquivo CSV.
+    """
+    return "operadoras" if 'OPSA' in filename else "demonstracoes_contabeis"
+
 def create_tables():
     """
     Conecta ao banco de dados PostgreSQL e cria as tabelas demonstracoes_contabeis e operadoras.
@@ -28,7 +93,9 @@ def create_tables():
         )
         cursor = conn.cursor()
 
-        # Query para criar a tabela demonstracoes_contabeis
+        # Query para criar a tabela demonstracoes_contabeis, particionada por trimestre em 'data'.
+        # As partições trimestrais são criadas sob demanda (ensure_quarter_partitions); a partição
+        # default recebe temporariamente linhas de trimestres que ainda não têm partição.
         create_demonstracoes_contabeis = """
         CREATE TABLE IF NOT EXISTS demonstracoes_contabeis (
             data DATE,
@@ -37,7 +104,17 @@ def create_tables():
             descricao TEXT,
             vl_saldo_inicial NUMERIC(20, 2),
             vl_saldo_final NUMERIC(20, 2)
-        );
+        ) PARTITION BY RANGE (data);
+        CREATE TABLE IF NOT EXISTS demonstracoes_contabeis_default
+            PARTITION OF demonstracoes_contabeis DEFAULT;
+        """
+
+        # Índices usados pelos relatórios (filtro por conta e período, junção por operadora)
+        create_report_indexes = """
+        CREATE INDEX IF NOT EXISTS idx_demonstracoes_descricao_data_reg
+            ON demonstracoes_contabeis (descricao, data, reg_ans) INCLUDE (vl_saldo_final);
+        CREATE INDEX IF NOT EXISTS idx_operadoras_registro_ans
+            ON operadoras (registro_ans);
         """
 
         # Query para criar a tabela operadoras
@@ -67,9 +144,88 @@ def create_tables():
         );
         """
 
+        # Extensões e função imutável de normalização usadas pelo índice de busca
+        # (unaccent não é IMMUTABLE, por isso precisa do wrapper para ser indexável)
+        create_search_extensions = """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE EXTENSION IF NOT EXISTS unaccent;
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS $$
+            SELECT public.unaccent('public.unaccent', $1)
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+        """
+
+        # Coluna normalizada (minúscula e sem acentos) e índice trigram para a busca textual
+        create_operadoras_search_index = """
+        ALTER TABLE operadoras ADD COLUMN IF NOT EXISTS busca TEXT
+            GENERATED ALWAYS AS (
+                f_unaccent(lower(coalesce(razao_social, '') || ' ' || coalesce(nome_fantasia, '')))
+            ) STORED;
+        CREATE INDEX IF NOT EXISTS idx_operadoras_busca_trgm
+            ON operadoras USING gin (busca gin_trgm_ops);
+        """
+
+        # Query para criar a tabela de versões, incrementada a cada nova carga de dados
+        create_dados_versao = """
+        CREATE TABLE IF NOT EXISTS dados_versao (
+            tabela VARCHAR(255) PRIMARY KEY,
+            versao BIGINT NOT NULL DEFAULT 0,
+            atualizado_em TIMESTAMP NOT NULL DEFAULT now()
+        );
+        """
+
+        # Query para criar o manifesto de cargas: um registro por arquivo de origem importado
+        create_carga_manifesto = """
+        CREATE TABLE IF NOT EXISTS carga_manifesto (
+            arquivo VARCHAR(255) PRIMARY KEY,
+            tabela VARCHAR(255) NOT NULL,
+            checksum VARCHAR(128) NOT NULL,
+            linhas BIGINT NOT NULL,
+            data_inicio DATE,
+            data_fim DATE,
+            carregado_em TIMESTAMP NOT NULL DEFAULT now()
+        );
+        """
+
+        # Query para criar o agregado de saldos por (trimestre, operadora, conta contábil),
+        # mantido por refresh_expense_rollup ao fim de cada carga
+        create_despesas_trimestrais = """
+        CREATE TABLE IF NOT EXISTS despesas_trimestrais (
+            trimestre DATE NOT NULL,
+            reg_ans VARCHAR(255) NOT NULL,
+            cd_conta_contabil VARCHAR(255) NOT NULL,
+            descricao TEXT,
+            vl_saldo_inicial NUMERIC(20, 2),
+            vl_saldo_final NUMERIC(20, 2),
+            linhas BIGINT NOT NULL,
+            PRIMARY KEY (trimestre, reg_ans, cd_conta_contabil)
+        );
+        CREATE INDEX IF NOT EXISTS idx_despesas_trimestrais_descricao
+            ON despesas_trimestrais (descricao, trimestre) INCLUDE (reg_ans, vl_saldo_final);
+        CREATE INDEX IF NOT EXISTS idx_despesas_trimestrais_conta
+            ON despesas_trimestrais (cd_conta_contabil, trimestre) INCLUDE (reg_ans, vl_saldo_final);
+        """
+
         # Executa as queries para criar as tabelas
+        cursor.execute(create_search_extensions)
+        cursor.execute(create_dados_versao)
+        cursor.execute(create_carga_manifesto)
+        legacy_table = rename_unpartitioned_table(cursor)
         cursor.execute(create_demonstracoes_contabeis)
         cursor.execute(create_operadoras)
+        cursor.execute(create_operadoras_search_index)
+        cursor.execute(create_report_indexes)
+        cursor.execute(create_despesas_trimestrais)
+
+        # Migra os dados de uma tabela criada antes do particionamento
+        if legacy_table:
+            cursor.execute(f"INSERT INTO demonstracoes_contabeis SELECT * FROM {legacy_table};")
+            split_default_partition(cursor)
+            cursor.execute(f"DROP TABLE {legacy_table};")
+
+        # Popula o agregado se ele for novo e já houver dados carregados
+        cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM despesas_trimestrais);")
+        if cursor.fetchone()[0]:
+            refresh_expense_rollup(cursor)
 
         # Confirma as alterações no banco de dados
         conn.commit()
@@ -77,6 +233,7 @@ def create_tables():
 
     except Exception as e:
         print(f"Erro ao criar as tabelas: {e}")
+        raise
     finally:
         # Fecha a conexão com o banco de dados
         if cursor:
@@ -84,39 +241,514 @@ def create_tables():
         if conn:
             conn.close()
 
-def prepare_csv_files():
+def rename_unpartitioned_table(cursor):
+    """
+    Renomeia a tabela demonstracoes_contabeis se ela existir sem particionamento,
+    para que seus dados sejam migrados para a nova tabela particionada.
+
+    :param cursor: Cursor da transação de criação das tabelas.
+    :return: Nome da tabela renomeada, ou None se não havia migração a fazer.
+    """
+    cursor.execute("""
+        SELECT c.relkind FROM pg_class c
+        WHERE c.oid = to_regclass('demonstracoes_contabeis');
+    """)
+    row = cursor.fetchone()
+    if row is None or row[0] != 'r':
+        return None
+    cursor.execute("ALTER TABLE demonstracoes_contabeis RENAME TO demonstracoes_contabeis_legado;")
+    return "demonstracoes_contabeis_legado"
+
+
+def quarter_start(day):
+    """
+    Retorna o primeiro dia do trimestre que contém a data.
+    """
+    return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+
+
+def next_quarter(day):
+    """
+    Retorna o primeiro dia do trimestre seguinte ao que contém a data.
+    """
+    start = quarter_start(day)
+    return date(start.year + 1, 1, 1) if start.month == 10 else date(start.year, start.month + 3, 1)
+
+
+def quarter_partition_name(day):
+    """
+    Retorna o nome da partição trimestral que contém a data (ex.: demonstracoes_contabeis_2024_t1).
+    """
+    return f"demonstracoes_contabeis_{day.year}_t{(day.month - 1) // 3 + 1}"
+
+
+def ensure_quarter_partitions(cursor, data_inicio, data_fim):
+    """
+    Cria as partições trimestrais que cobrem o intervalo de datas, movendo para elas as
+    linhas que estiverem na partição default.
+
+    :param cursor: Cursor da transação de carga.
+    :param data_inicio: Primeira data do intervalo.
+    :param data_fim: Última data do intervalo.
+    """
+    quarter = quarter_start(data_inicio)
+    while quarter <= data_fim:
+        partition = quarter_partition_name(quarter)
+        upper = next_quarter(quarter)
+        cursor.execute("SELECT to_regclass(%s);", (partition,))
+        if cursor.fetchone()[0] is None:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM demonstracoes_contabeis_default WHERE data >= %s AND data < %s);",
+                (quarter, upper)
+            )
+            has_default_rows = cursor.fetchone()[0]
+            if has_default_rows:
+                # A nova partição não pode ser criada enquanto a default tiver linhas do seu intervalo
+                cursor.execute("ALTER TABLE demonstracoes_contabeis DETACH PARTITION demonstracoes_contabeis_default;")
+            cursor.execute(
+                f"CREATE TABLE {partition} PARTITION OF demonstracoes_contabeis FOR VALUES FROM (%s) TO (%s);",
+                (quarter, upper)
+            )
+            if has_default_rows:
+                cursor.execute(f"""
+                    WITH moved AS (
+                        DELETE FROM demonstracoes_contabeis_default
+                        WHERE data >= %s AND data < %s
+                        RETURNING *
+                    )
+                    INSERT INTO {partition} SELECT * FROM moved;
+                """, (quarter, upper))
+                cursor.execute(
+                    "ALTER TABLE demonstracoes_contabeis ATTACH PARTITION demonstracoes_contabeis_default DEFAULT;"
+                )
+        quarter = upper
+
+
+def split_default_partition(cursor):
+    """
+    Move as linhas carregadas diretamente na partição default para partições trimestrais.
+
+    :param cursor: Cursor da transação de carga.
+    """
+    with profiler.stage("split_default_partition"):
+        cursor.execute("SELECT min(data), max(data) FROM demonstracoes_contabeis_default;")
+        data_inicio, data_fim = cursor.fetchone()
+        if data_inicio is not None:
+            ensure_quarter_partitions(cursor, data_inicio, data_fim)
+
+
+def quarter_partitions(cursor, data_inicio, data_fim):
+    """
+    Retorna as partições trimestrais existentes que cobrem o intervalo de datas.
+    """
+    partitions = []
+    quarter = quarter_start(data_inicio)
+    while quarter <= data_fim:
+        cursor.execute("SELECT to_regclass(%s);", (quarter_partition_name(quarter),))
+        if cursor.fetchone()[0] is not None:
+            partitions.append(quarter_partition_name(quarter))
+        quarter = next_quarter(quarter)
+    return partitions
+
+
+def refresh_expense_rollup(cursor, ranges=None):
+    """
+    Recalcula o agregado despesas_trimestrais a partir de demonstracoes_contabeis, na mesma
+    transação da carga. Com 'ranges', apenas os trimestres que cobrem esses intervalos são
+    recalculados (lendo só as partições correspondentes); sem, o agregado é refeito inteiro.
+
+    :param cursor: Cursor da transação de carga.
+    :param ranges: Lista de tuplas (data_inicio, data_fim) alteradas pela carga.
+    """
+    aggregate = """
+        INSERT INTO despesas_trimestrais
+        SELECT
+            date_trunc('quarter', data)::date AS trimestre,
+            reg_ans,
+            cd_conta_contabil,
+            max(regexp_replace(btrim(descricao), '\\s+', ' ', 'g')) AS descricao,
+            SUM(vl_saldo_inicial),
+            SUM(vl_saldo_final),
+            count(*)
+        FROM demonstracoes_contabeis
+        WHERE reg_ans IS NOT NULL AND cd_conta_contabil IS NOT NULL {filter}
+        GROUP BY 1, 2, 3;
+    """
+    with profiler.stage("refresh_expense_rollup") as record:
+        if ranges is None:
+            cursor.execute("TRUNCATE despesas_trimestrais;")
+            cursor.execute(aggregate.format(filter=""))
+            record.rows = cursor.rowcount
+            return
+
+        record.rows = 0
+        for data_inicio, data_fim in ranges:
+            if data_inicio is None:
+                continue
+            inicio, fim = quarter_start(data_inicio), next_quarter(data_fim)
+            cursor.execute(
+                "DELETE FROM despesas_trimestrais WHERE trimestre >= %s AND trimestre < %s;", (inicio, fim)
+            )
+            cursor.execute(aggregate.format(filter="AND data >= %s AND data < %s"), (inicio, fim))
+            record.rows += cursor.rowcount
+
+
+def drop_quarter(day):
+    """
+    Remove do banco um trimestre inteiro (a partição que contém a data) e seus registros
+    no manifesto de cargas. É uma operação de metadados: nenhuma linha é varrida.
+
+    :param day: Qualquer data do trimestre a ser removido.
+    :raises Exception: Se a remoção falhar (nada é alterado no banco).
+    """
+    cursor = None
+    conn = None
+    try:
+        # Conecta ao banco de dados
+        conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        cursor = conn.cursor()
+        partition = quarter_partition_name(day)
+        cursor.execute(f"DROP TABLE IF EXISTS {partition};")
+        refresh_expense_rollup(cursor, [(day, day)])
+        cursor.execute(
+            "DELETE FROM carga_manifesto WHERE data_inicio >= %s AND data_fim < %s;",
+            (quarter_start(day), next_quarter(day))
+        )
+        bump_data_version(cursor, "demonstracoes_contabeis")
+        conn.commit()
+        print(f"Trimestre removido: {partition}")
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"Erro ao remover trimestre: {e}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def prepare_csv_files(csv_dir="downloads/DemCon", chunksize=None, csv_files=None):
     """
     Prepara os arquivos CSV para importação no banco de dados PostgreSQL.
+
+    :param csv_dir: Diretório com os arquivos CSV.
+    :param chunksize: Se informado, processa cada arquivo em blocos desse número de linhas,
+        com transformações vetorizadas e memória limitada ao tamanho do bloco.
+    :param csv_files: Nomes dos arquivos a preparar (padrão: todos os CSVs do diretório).
     """
-    csv_files = [f for f in os.listdir("downloads/DemCon") if f.endswith(".csv")]
+    if csv_files is None:
+        csv_files = [f for f in os.listdir(csv_dir) if f.endswith(".csv")]
     for csv_file in csv_files:
-        csv_path = os.path.join("downloads/DemCon", csv_file)
-        df = pd.read_csv(csv_path, delimiter=";", encoding="utf-8")
+        csv_path = os.path.join(csv_dir, csv_file)
+        with profiler.stage(f"prepare_csv:{csv_file}", bytes_read=os.path.getsize(csv_path)) as record:
+            record.rows = prepare_csv_file(csv_path, csv_file, chunksize)
+            record.bytes_written = os.path.getsize(csv_path)
+
+
+def prepare_csv_file(csv_path, csv_file, chunksize=None):
+    """
+    Prepara um arquivo CSV para importação (ver prepare_csv_files).
+
+    :param csv_path: Caminho do arquivo CSV.
+    :param csv_file: Nome do arquivo, exibido no progresso.
+    :param chunksize: Se informado, processa o arquivo em blocos desse número de linhas.
+    :return: Quantidade de linhas do arquivo.
+    """
+    if chunksize:
         print('\nPreparando arquivo:', csv_file)
-        
-        if "VL_SALDO_INICIAL" in df.columns or "VL_SALDO_FINAL" in df.columns:
-            df.fillna({"VL_SALDO_INICIAL": 0, "VL_SALDO_FINAL": 0}, inplace=True)
-            df["VL_SALDO_INICIAL"] = df["VL_SALDO_INICIAL"].astype(str).str.replace(",", ".").astype(float)
-            df["VL_SALDO_FINAL"] = df["VL_SALDO_FINAL"].astype(str).str.replace(",", ".").astype(float)
+        return prepare_csv_file_chunked(csv_path, chunksize)
+
+    df = pd.read_csv(csv_path, delimiter=";", encoding="utf-8", dtype={column: str for column in TEXT_COLUMNS})
+    print('\nPreparando arquivo:', csv_file)
+    
+    if "VL_SALDO_INICIAL" in df.columns or "VL_SALDO_FINAL" in df.columns:
+        df.fillna({"VL_SALDO_INICIAL": 0, "VL_SALDO_FINAL": 0}, inplace=True)
+        df["VL_SALDO_INICIAL"] = df["VL_SALDO_INICIAL"].astype(str).str.replace(",", ".").astype(float)
+        df["VL_SALDO_FINAL"] = df["VL_SALDO_FINAL"].astype(str).str.replace(",", ".").astype(float)
+
+    if ('DDD' in df.columns):
+        # Pegar somente os dois primeiros números do DDD e se NaN, transofmrar para 0
+        df['DDD'] = df['DDD'].apply(lambda x: str(x).replace('.', '')[:2] if str(x) != 'nan' else '0')
+
+    # Substitui os telefones com mais de 15 caracteres por 000000000
+    if "Telefone" in df.columns:
+        df["Telefone"] = df["Telefone"].apply(lambda x: x if len(str(x)) <= 15 else "000000000")
+
+    df.to_csv(csv_path, index=False, sep=";", encoding="utf-8")
+    return len(df)
+
+
+def prepare_csv_file_chunked(csv_path, chunksize=200_000):
+    """
+    Prepara um arquivo CSV em blocos, com transformações vetorizadas. Todas as colunas são lidas
+    como texto (os identificadores de TEXT_COLUMNS, como no modo de arquivo inteiro) e os saldos
+    convertidos com vírgula decimal. O resultado é gravado em um arquivo temporário que substitui
+    o original ao final.
+
+    :param csv_path: Caminho do arquivo CSV.
+    :param chunksize: Quantidade de linhas por bloco.
+    :return: Quantidade de linhas do arquivo.
+    """
+    columns = pd.read_csv(csv_path, delimiter=";", encoding="utf-8", nrows=0).columns
+    saldo_columns = [c for c in ("VL_SALDO_INICIAL", "VL_SALDO_FINAL") if c in columns]
+
+    tmp_path = csv_path + ".tmp"
+    rows = 0
+    reader = pd.read_csv(
+        csv_path, delimiter=";", encoding="utf-8",
+        dtype="string", keep_default_na=False, na_values=[""], chunksize=chunksize
+    )
+    with open(tmp_path, "w", encoding="utf-8", newline="") as output:
+        for i, chunk in enumerate(reader):
+            # Vírgula decimal convertida de forma vetorizada (idempotente se o arquivo já foi preparado)
+            for column in saldo_columns:
+                chunk[column] = chunk[column].str.replace(",", ".", regex=False).astype("float64").fillna(0)
+
+            if "DDD" in chunk.columns:
+                # Pegar somente os dois primeiros números do DDD e se vazio, transformar para 0
+                chunk["DDD"] = chunk["DDD"].str.replace(".", "", regex=False).str[:2].fillna("0")
+
+            # Substitui os telefones com mais de 15 caracteres por 000000000
+            if "Telefone" in chunk.columns:
+                too_long = chunk["Telefone"].str.len().fillna(0) > 15
+                chunk.loc[too_long, "Telefone"] = "000000000"
+
+            chunk.to_csv(output, index=False, header=(i == 0), sep=";")
+            rows += len(chunk)
+
+    os.replace(tmp_path, csv_path)
+    return rows
+
+
+def bump_data_version(cursor, table_name):
+    """
+    Incrementa a versão de uma tabela em dados_versao, na mesma transação da carga.
+
+    :param cursor: Cursor da conexão usada na importação.
+    :param table_name: Nome da tabela recarregada.
+    """
+    cursor.execute("""
+        INSERT INTO dados_versao (tabela, versao, atualizado_em)
+        VALUES (%s, 1, now())
+        ON CONFLICT (tabela) DO UPDATE
+        SET versao = dados_versao.versao + 1, atualizado_em = now();
+    """, (table_name,))
+
+
+def file_checksum(path):
+    """
+    Calcula o SHA-256 do conteúdo de um arquivo, lido em blocos.
+
+    :param path: Caminho do arquivo.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def zip_member_checksum(info):
+    """
+    Identifica o conteúdo de um membro de ZIP pelo CRC e pelo tamanho gravados no diretório
+    central, sem descompactá-lo.
+
+    :param info: ZipInfo do membro.
+    """
+    return f"crc32:{info.CRC:08x}:{info.file_size}"
+
+
+def source_checksums(csv_files, csv_dir="downloads/DemCon", zip_dir=None):
+    """
+    Calcula o checksum de origem de cada CSV, registrado no carga_manifesto. Os CSVs extraídos
+    dos ZIPs trimestrais (DemCon_*.zip) usam o CRC do membro no ZIP: o CSV não é lido, e o
+    checksum não muda quando o ZIP é extraído de novo nem quando o CSV é preparado. Os demais
+    (ex.: OPSA.csv) usam o SHA-256 do próprio arquivo.
+
+    :param csv_files: Nomes dos arquivos CSV.
+    :param csv_dir: Diretório dos arquivos CSV.
+    :param zip_dir: Diretório dos ZIPs trimestrais (padrão: diretório acima de csv_dir).
+    :return: Dicionário com o checksum de cada arquivo.
+    """
+    zip_dir = zip_dir or os.path.dirname(os.path.abspath(csv_dir))
+    members = {}
+    for zip_file in sorted(os.listdir(zip_dir)):
+        if zip_file.startswith("DemCon_") and zip_file.endswith(".zip"):
+            with ZipFile(os.path.join(zip_dir, zip_file), "r") as zipf:
+                for info in zipf.infolist():
+                    members[os.path.basename(info.filename)] = zip_member_checksum(info)
+    return {
+        csv_file: members.get(csv_file) or file_checksum(os.path.join(csv_dir, csv_file))
+        for csv_file in csv_files
+    }
+
+
+def load_manifest(cursor):
+    """
+    Retorna o checksum registrado em carga_manifesto para cada arquivo já importado.
+
+    :param cursor: Cursor de uma conexão aberta.
+    """
+    cursor.execute("SELECT arquivo, checksum FROM carga_manifesto;")
+    return dict(cursor.fetchall())
+
+
+def select_changed_files(csv_files, csv_dir="downloads/DemCon", zip_dir=None, manifest=None):
+    """
+    Retorna os arquivos CSV novos ou alterados desde a última carga, comparando o checksum de
+    origem de cada um (ver source_checksums) com o do carga_manifesto. Os arquivos inalterados
+    não são preparados.
+
+    :param csv_files: Nomes dos arquivos CSV.
+    :param csv_dir: Diretório dos arquivos CSV.
+    :param zip_dir: Diretório dos ZIPs trimestrais (padrão: diretório acima de csv_dir).
+    :param manifest: Checksums já carregados (padrão: lidos do carga_manifesto).
+    :return: Lista com os nomes dos arquivos a importar.
+    """
+    if manifest is None:
+        conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        try:
+            with conn.cursor() as cursor:
+                manifest = load_manifest(cursor)
+        finally:
+            conn.close()
+
+    checksums = source_checksums(csv_files, csv_dir, zip_dir)
+    changed = []
+    for csv_file in csv_files:
+        if manifest.get(csv_file) == checksums[csv_file]:
+            print(f"Arquivo sem alterações, ignorado: {csv_file}")
+        else:
+            changed.append(csv_file)
+    return changed
+
+
+def check_quarter_ownership(cursor, arquivos, ranges):
+    """
+    Verifica se os trimestres que serão esvaziados contêm apenas dados dos arquivos da carga.
+    A substituição esvazia a partição trimestral inteira, o que supõe um arquivo por trimestre,
+    como nos dados da ANS (1T2024.csv, 2T2024.csv, ...); outro arquivo já carregado no mesmo
+    trimestre perderia suas linhas.
+
+    :param cursor: Cursor da transação de carga.
+    :param arquivos: Arquivos de demonstracoes_contabeis recarregados.
+    :param ranges: Intervalos de datas (data_inicio, data_fim) que serão esvaziados.
+    :raises ValueError: Se outro arquivo do manifesto tiver dados em algum desses trimestres.
+    """
+    for inicio, fim in ranges:
+        if inicio is None:
+            continue
+        cursor.execute("""
+            SELECT arquivo FROM carga_manifesto
+            WHERE tabela = 'demonstracoes_contabeis' AND NOT (arquivo = ANY(%s))
+                AND data_inicio < %s AND data_fim >= %s
+            ORDER BY arquivo;
+        """, (list(arquivos), next_quarter(fim), quarter_start(inicio)))
+        others = [row[0] for row in cursor.fetchall()]
+        if others:
+            raise ValueError(
+                f"Os trimestres de {inicio} a {fim} também contêm dados de {', '.join(others)}. "
+                "A carga substitui trimestres inteiros: importe esses arquivos juntos ou use --full."
+            )
+
+
+def replace_from_staging(cursor, loads, full=False):
+    """
+    Substitui nas tabelas finais os dados de cada arquivo pelos da sua staging e atualiza o
+    manifesto. Deve ser executada em uma única transação: um trimestre alterado troca apenas
+    a(s) sua(s) partição(ões) trimestral(is), e o cadastro de operadoras (um retrato completo) é trocado inteiro.
+    Como a partição é esvaziada inteira, cada trimestre deve vir de um único arquivo (ou de
+    arquivos carregados juntos); ver check_quarter_ownership.
 
-        if ('DDD' in df.columns):
-            # Pegar somente os dois primeiros números do DDD e se NaN, transofmrar para 0
-            df['DDD'] = df['DDD'].apply(lambda x: str(x).replace('.', '')[:2] if str(x) != 'nan' else '0')
+    :param cursor: Cursor da transação de carga.
+    :param loads: Lista de tuplas (arquivo, tabela, staging, checksum).
+    :param full: Esvazia as tabelas carregadas e o manifesto delas antes de inserir: os arquivos
+        de 'loads' passam a ser todo o conteúdo das tabelas.
+    :return: Intervalos de datas de demonstracoes_contabeis substituídos (anteriores e novos),
+        ou None na recarga completa.
+    """
+    stats = []
+    replaced_ranges = None if full else []
+    if full:
+        tables = sorted({table_name for _, table_name, _, _ in loads})
+        for table_name in tables:
+            # TRUNCATE da tabela particionada esvazia todas as partições
+            cursor.execute(f"TRUNCATE {table_name};")
+        cursor.execute("DELETE FROM carga_manifesto WHERE tabela = ANY(%s);", (tables,))
+
+    # Primeiro levanta os trimestres substituídos, depois os esvazia e só então insere, para que
+    # arquivos do mesmo trimestre na mesma carga não apaguem dados uns dos outros
+    for arquivo, table_name, staging_table, checksum in loads:
+        if table_name == "demonstracoes_contabeis":
+            cursor.execute(f"SELECT count(*), min(data), max(data) FROM {staging_table};")
+            rows, data_inicio, data_fim = cursor.fetchone()
+            if data_inicio is not None:
+                ensure_quarter_partitions(cursor, data_inicio, data_fim)
+            if full:
+                stats.append((rows, data_inicio, data_fim))
+                continue
+            cursor.execute(
+                "SELECT data_inicio, data_fim FROM carga_manifesto WHERE arquivo = %s;", (arquivo,)
+            )
+            replaced_ranges.extend([(data_inicio, data_fim)] + cursor.fetchall())
+        else:
+            cursor.execute(f"SELECT count(*) FROM {staging_table};")
+            rows, data_inicio, data_fim = cursor.fetchone()[0], None, None
+            if not full:
+                cursor.execute(f"DELETE FROM {table_name};")
+        stats.append((rows, data_inicio, data_fim))
+
+    if replaced_ranges:
+        arquivos = [arquivo for arquivo, table_name, _, _ in loads if table_name == "demonstracoes_contabeis"]
+        check_quarter_ownership(cursor, arquivos, replaced_ranges)
+        partitions = set()
+        for inicio, fim in replaced_ranges:
+            if inicio is not None:
+                partitions.update(quarter_partitions(cursor, inicio, fim))
+        for partition in sorted(partitions):
+            # TRUNCATE da partição do trimestre: operação de metadados, sem varrer linhas
+            cursor.execute(f"TRUNCATE {partition};")
 
-        # Substitui os telefones com mais de 15 caracteres por 000000000
-        if "Telefone" in df.columns:
-            df["Telefone"] = df["Telefone"].apply(lambda x: x if len(str(x)) <= 15 else "000000000")
+    for (arquivo, table_name, staging_table, checksum), (rows, data_inicio, data_fim) in zip(loads, stats):
+        columns = TABLE_COLUMNS[table_name]
+        cursor.execute(f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {staging_table};")
+        cursor.execute("""
+            INSERT INTO carga_manifesto (arquivo, tabela, checksum, linhas, data_inicio, data_fim, carregado_em)
+            VALUES (%s, %s, %s, %s, %s, %s, now())
+            ON CONFLICT (arquivo) DO UPDATE
+            SET tabela = EXCLUDED.tabela, checksum = EXCLUDED.checksum, linhas = EXCLUDED.linhas,
+                data_inicio = EXCLUDED.data_inicio, data_fim = EXCLUDED.data_fim, carregado_em = now();
+        """, (arquivo, table_name, checksum, rows, data_inicio, data_fim))
 
-        df.to_csv(csv_path, index=False, sep=";", encoding="utf-8")
+    return replaced_ranges
 
 
 def import_csv_with_copy(csv_files):
     """
     Importa múltiplos arquivos CSV para uma tabela no banco de dados PostgreSQL usando o comando COPY.
+    Os dados são acrescentados direto nas tabelas finais, sem staging nem manifesto de cargas
+    (uso em tabelas vazias, como nos benchmarks; load_data usa import_csv_parallel).
 
     :param csv_files: Lista de caminhos dos arquivos CSV.
     """
     print('\n-----------------------------\n')
+    cursor = None
+    conn = None
     try:
         # Conecta ao banco de dados
         conn = psycopg2.connect(
@@ -127,53 +759,35 @@ def import_csv_with_copy(csv_files):
             password=DB_PASSWORD
         )
         cursor = conn.cursor()
+        loaded_tables = set()
 
         for csv_file in csv_files:
             csv_path = os.path.join("downloads/DemCon", csv_file)
             print(f"\nImportando arquivo: {csv_file}")
-            if 'OPSA' in csv_file:
-                table_name = "operadoras"
-                columns = """
-                    registro_ans,
-                    cnpj,
-                    razao_social,
-                    nome_fantasia,
-                    modalidade,
-                    logradouro,
-                    numero,
-                    complemento,
-                    bairro,
-                    cidade,
-                    uf,
-                    cep,
-                    ddd,
-                    telefone,
-                    fax,
-                    endereco_eletronico,
-                    representante,
-                    cargo_representante,
-                    regiao_comercializacao,
-                    data_registro_ans
-                """
-            else:
-                table_name = "demonstracoes_contabeis"
-                columns = """
-                    data,
-                    reg_ans,
-                    cd_conta_contabil,
-                    descricao,
-                    vl_saldo_inicial,
-                    vl_saldo_final
-                """
+            table_name = table_for_file(csv_file)
+            columns = TABLE_COLUMNS[table_name]
 
             # Usa o comando COPY para importar os dados
-            with open(csv_path, 'r', encoding='utf-8') as file:
+            with profiler.stage(f"copy:{csv_file}", bytes_read=os.path.getsize(csv_path)) as record, \
+                    open(csv_path, 'r', encoding='utf-8') as file:
                 cursor.copy_expert(f"""
                     COPY {table_name} ({columns}) 
                     FROM STDIN
                     DELIMITER ';'
                     CSV HEADER;
                 """, file)
+                record.rows = cursor.rowcount
+            loaded_tables.add(table_name)
+
+        # Move para partições trimestrais as linhas que caíram na partição default
+        # e atualiza o agregado de despesas
+        if "demonstracoes_contabeis" in loaded_tables:
+            split_default_partition(cursor)
+            refresh_expense_rollup(cursor)
+
+        # Incrementa a versão das tabelas carregadas para invalidar caches da API
+        for table_name in loaded_tables:
+            bump_data_version(cursor, table_name)
 
         # Confirma as alterações
         conn.commit()
@@ -181,6 +795,7 @@ def import_csv_with_copy(csv_files):
 
     except Exception as e:
         print(f"Erro ao importar arquivos CSV: {e}")
+        raise
     finally:
         if cursor:
             cursor.close()
@@ -188,6 +803,358 @@ def import_csv_with_copy(csv_files):
             conn.close()
 
 
+def normalize_csv_row(header, row):
+    """
+    Aplica a uma linha do CSV as mesmas normalizações de prepare_csv_files: vírgula decimal
+    nos saldos, DDD com dois dígitos e telefones com mais de 15 caracteres.
+
+    :param header: Lista com os nomes das colunas.
+    :param row: Lista com os valores da linha (modificada no lugar).
+    """
+    for i, column in enumerate(header):
+        if column in ("VL_SALDO_INICIAL", "VL_SALDO_FINAL"):
+            row[i] = row[i].replace(",", ".") if row[i] else "0"
+        elif column == "DDD":
+            row[i] = row[i].replace(".", "")[:2] if row[i] else "0"
+        elif column == "Telefone":
+            if len(row[i]) > 15:
+                row[i] = "000000000"
+    return row
+
+
+def iter_normalized_lines(text_file):
+    """
+    Lê um CSV da ANS (separado por ';') e gera suas linhas normalizadas, sem o cabeçalho,
+    já formatadas para o COPY.
+
+    :param text_file: Arquivo de texto aberto para leitura.
+    """
+    reader = csv.reader(text_file, delimiter=";")
+    header = next(reader, None)
+    if header is None:
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";", lineterminator="\n")
+    for row in reader:
+        writer.writerow(normalize_csv_row(header, row))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+class IteratorFile(io.TextIOBase):
+    """
+    Adapta um gerador de linhas de texto para a interface de arquivo lida pelo copy_expert,
+    mantendo em memória apenas o bloco solicitado.
+    """
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self._buffer = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._lines)
+            except StopIteration:
+                break
+        if size < 0:
+            chunk, self._buffer = self._buffer, ""
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def import_zips_with_copy(zip_files, csv_files=(), full=False):
+    """
+    Importa os CSVs contidos nos arquivos ZIP diretamente para o banco de dados, sem extraí-los
+    para o disco: cada membro é lido, normalizado linha a linha e enviado ao COPY em fluxo.
+    Apenas membros novos ou alterados (pelo CRC registrado no ZIP, sem descompactá-los) são
+    importados, substituindo os dados anteriores de cada um.
+
+    :param zip_files: Lista de caminhos dos arquivos ZIP trimestrais.
+    :param csv_files: Lista de caminhos de CSVs avulsos (ex.: OPSA.csv) importados da mesma forma.
+    :param full: Importa todos os membros e substitui todo o conteúdo das tabelas carregadas.
+    """
+    print('\n-----------------------------\n')
+    cursor = None
+    conn = None
+    try:
+        # Conecta ao banco de dados
+        conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        cursor = conn.cursor()
+        manifest = {} if full else load_manifest(cursor)
+        loaded_tables = set()
+        loads = []
+
+        def copy_stream(arquivo, checksum, text_file):
+            table_name = table_for_file(arquivo)
+            if manifest.get(arquivo) == checksum:
+                print(f"Arquivo sem alterações, ignorado: {arquivo}")
+                return
+
+            print(f"\nImportando arquivo: {arquivo}")
+            # Staging temporária, visível só nesta sessão e descartada ao fim da transação
+            target = f"stg_{table_name}_{len(loads)}"
+            cursor.execute(f"""
+                CREATE TEMP TABLE {target} ON COMMIT DROP AS
+                SELECT {TABLE_COLUMNS[table_name]} FROM {table_name} WITH NO DATA;
+            """)
+            loads.append((arquivo, table_name, target, checksum))
+
+            with profiler.stage(f"copy:{arquivo}") as record:
+                cursor.copy_expert(f"""
+                    COPY {target} ({TABLE_COLUMNS[table_name]})
+                    FROM STDIN
+                    DELIMITER ';'
+                    CSV;
+                """, IteratorFile(iter_normalized_lines(text_file)))
+                record.rows = cursor.rowcount
+            loaded_tables.add(table_name)
+
+        for zip_path in zip_files:
+            with ZipFile(zip_path, "r") as zipf:
+                for info in zipf.infolist():
+                    if not info.filename.lower().endswith(".csv"):
+                        continue
+                    with zipf.open(info) as raw:
+                        copy_stream(
+                            os.path.basename(info.filename),
+                            zip_member_checksum(info),
+                            io.TextIOWrapper(raw, encoding="utf-8", newline="")
+                        )
+
+        for csv_path in csv_files:
+            checksum = file_checksum(csv_path)
+            with open(csv_path, "r", encoding="utf-8", newline="") as file:
+                copy_stream(os.path.basename(csv_path), checksum, file)
+
+        if not loads:
+            print("\nNenhum arquivo novo ou alterado para importar.")
+            return
+        replaced_ranges = replace_from_staging(cursor, loads, full=full)
+
+        # Atualiza o agregado de despesas com os trimestres carregados
+        if "demonstracoes_contabeis" in loaded_tables:
+            refresh_expense_rollup(cursor, replaced_ranges)
+
+        # Incrementa a versão das tabelas carregadas para invalidar caches da API
+        for table_name in loaded_tables:
+            bump_data_version(cursor, table_name)
+
+        # Confirma as alterações
+        conn.commit()
+        print(f"\nTodos os arquivos foram importados com sucesso!")
+
+    except Exception as e:
+        print(f"Erro ao importar arquivos ZIP: {e}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def copy_csv_to_staging(csv_path, table_name, staging_table):
+    """
+    Importa um CSV para uma tabela de staging própria, em uma conexão dedicada.
+    Executado em um processo separado por import_csv_parallel.
+
+    :param csv_path: Caminho do arquivo CSV preparado.
+    :param table_name: Tabela de destino final (usada como modelo da staging).
+    :param staging_table: Nome da tabela de staging a ser criada.
+    :return: Quantidade de linhas importadas.
+    """
+    columns = TABLE_COLUMNS[table_name]
+    conn = psycopg2.connect(
+        host=DB_HOST,
+        port=DB_PORT,
+        database=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD
+    )
+    try:
+        with conn.cursor() as cursor:
+            # UNLOGGED evita o WAL na carga intermediária; a tabela só tem as colunas do COPY
+            cursor.execute(f"DROP TABLE IF EXISTS {staging_table};")
+            cursor.execute(f"""
+                CREATE UNLOGGED TABLE {staging_table} AS
+                SELECT {columns} FROM {table_name} WITH NO DATA;
+            """)
+            with open(csv_path, 'r', encoding='utf-8') as file:
+                cursor.copy_expert(f"""
+                    COPY {staging_table} ({columns})
+                    FROM STDIN
+                    DELIMITER ';'
+                    CSV HEADER;
+                """, file)
+            rows = cursor.rowcount
+        conn.commit()
+        return rows
+    finally:
+        conn.close()
+
+
+def import_csv_parallel(csv_files, workers=4, csv_dir="downloads/DemCon", full=False):
+    """
+    Importa os arquivos CSV em paralelo, com um processo e uma conexão por arquivo.
+    Cada arquivo é carregado em uma tabela de staging; só depois que todos terminam, os dados
+    anteriores de cada arquivo são substituídos pelos da staging e o carga_manifesto é atualizado,
+    em uma única transação. Se qualquer arquivo falhar, as tabelas finais permanecem intactas.
+
+    :param csv_files: Lista de nomes dos arquivos CSV (já preparados).
+    :param workers: Quantidade máxima de cargas simultâneas.
+    :param csv_dir: Diretório dos arquivos CSV.
+    :param full: Substitui todo o conteúdo das tabelas carregadas pelo dos arquivos.
+    """
+    print('\n-----------------------------\n')
+    # As stagings são preenchidas por outras conexões, então não podem ser temporárias: o sufixo
+    # da execução evita colisões com cargas simultâneas ou com tabelas de uma execução interrompida
+    run_id = uuid.uuid4().hex[:12]
+    jobs = [
+        (os.path.join(csv_dir, csv_file), table_for_file(csv_file), f"stg_{table_for_file(csv_file)}_{run_id}_{i}")
+        for i, csv_file in enumerate(csv_files)
+    ]
+
+    cursor = None
+    conn = None
+    try:
+        # Conecta ao banco de dados
+        conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        cursor = conn.cursor()
+
+        # Checksum de origem de cada arquivo (já preparado), registrado no manifesto
+        checksums = source_checksums(csv_files, csv_dir)
+
+        with profiler.stage("copy_staging") as record, ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+            # Cada processo mede a própria carga (ver common/profiling.measure)
+            futures = {executor.submit(measure, copy_csv_to_staging, *job): job for job in jobs}
+            record.rows = 0
+            for future in as_completed(futures):
+                csv_path, _, staging_table = futures[future]
+                rows, metrics = future.result()
+                profiler.add_record(
+                    f"copy:{os.path.basename(csv_path)}", metrics, rows=rows, bytes_read=os.path.getsize(csv_path)
+                )
+                record.rows += rows
+                print(f"\nArquivo importado para {staging_table}: {os.path.basename(csv_path)} "
+                      f"({rows} linhas)")
+
+        # Troca os dados de todas as stagings nas tabelas finais de forma atômica
+        replaced_ranges = replace_from_staging(cursor, [
+            (os.path.basename(csv_path), table_name, staging_table, checksums[os.path.basename(csv_path)])
+            for csv_path, table_name, staging_table in jobs
+        ], full=full)
+
+        # Atualiza o agregado de despesas com os trimestres carregados
+        if any(table_name == "demonstracoes_contabeis" for _, table_name, _ in jobs):
+            refresh_expense_rollup(cursor, replaced_ranges)
+
+        # Incrementa a versão das tabelas carregadas para invalidar caches da API
+        for table_name in {table_name for _, table_name, _ in jobs}:
+            bump_data_version(cursor, table_name)
+
+        conn.commit()
+        print(f"\nTodos os arquivos foram importados com sucesso!")
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"Erro ao importar arquivos CSV: {e}")
+        raise
+    finally:
+        drop_staging_tables([staging_table for _, _, staging_table in jobs])
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def drop_staging_tables(staging_tables):
+    """
+    Remove as tabelas de staging criadas por import_csv_parallel.
+
+    :param staging_tables: Lista de nomes das tabelas de staging.
+    """
+    if not staging_tables:
+        return
+    conn = None
+    try:
+        conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {', '.join(staging_tables)};")
+        conn.commit()
+    except Exception as e:
+        print(f"Erro ao remover tabelas de staging: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+def load_data(stream=False, chunksize=200_000, full=False, workers=1, snapshot=True):
+    """
+    Cria as tabelas e importa os dados baixados da ANS.
+
+    :param stream: Importa os CSVs direto dos ZIPs, sem extração nem reescrita em disco.
+    :param chunksize: Linhas por bloco na preparação dos CSVs (0 ou None processa o arquivo inteiro).
+    :param full: Reimporta todos os arquivos, substituindo todo o conteúdo das tabelas.
+    :param workers: Cargas COPY simultâneas.
+    :param snapshot: Atualiza o snapshot Parquet dos dados ao fim da carga.
+    :raises Exception: Se qualquer etapa da carga falhar (o erro já foi informado pela etapa),
+        para que quem chama (ex.: o pipeline) não a considere concluída.
+    """
+    with profiler.stage("create_tables"):
+        create_tables()
+
+    if stream:
+        zip_files = sorted(
+            os.path.join("downloads", f) for f in os.listdir("downloads")
+            if f.startswith("DemCon_") and f.endswith(".zip")
+        )
+        with profiler.stage("import"):
+            import_zips_with_copy(zip_files, csv_files=["downloads/DemCon/OPSA.csv"], full=full)
+    else:
+        csv_files = sorted(f for f in os.listdir("downloads/DemCon") if f.endswith(".csv"))
+        if not full:
+            # Consulta o manifesto antes de preparar qualquer arquivo: só os novos ou alterados são preparados
+            csv_files = select_changed_files(csv_files)
+
+        if not csv_files:
+            print("\nNenhum arquivo novo ou alterado para importar.")
+        else:
+            with profiler.stage("prepare_csv_files"):
+                prepare_csv_files(chunksize=chunksize, csv_files=csv_files)
+
+            with profiler.stage("import"):
+                import_csv_parallel(csv_files, workers=workers, full=full)
+
+    if snapshot:
+        with profiler.stage("export_snapshot"):
+            export_snapshot()
+
+
 def check_inserted_data(table_name):
     """
     Conecta ao banco de dados PostgreSQL e verifica a quantidade de tuplas na tabela especificada.
@@ -256,7 +1223,7 @@ def top_10_operadoras_trimestre():
         )
         cursor = conn.cursor()
 
-        # Query para retornar as 10 operadoras com maiores despesas
+        # Query para retornar as 10 operadoras com maiores despesas, a partir do agregado trimestral
         top_10_query = """
         SELECT 
             o.razao_social AS operadora,
@@ -265,15 +1232,15 @@ def top_10_operadoras_trimestre():
             d.reg_ans,
             SUM(d.vl_saldo_final) AS total_despesas
         FROM 
-            demonstracoes_contabeis d
+            despesas_trimestrais d
         JOIN 
             operadoras o
         ON 
             d.reg_ans = o.registro_ans
         WHERE 
-            d.descricao = 'EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS  DE ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR '
-            AND d.data >= (date_trunc('quarter', CURRENT_DATE) - INTERVAL '3 months')
-            AND d.data < date_trunc('quarter', CURRENT_DATE)
+            d.descricao = %s
+            AND d.trimestre >= (date_trunc('quarter', CURRENT_DATE) - INTERVAL '3 months')
+            AND d.trimestre < date_trunc('quarter', CURRENT_DATE)
         GROUP BY 
             o.razao_social, o.cnpj, o.uf, d.reg_ans
         ORDER BY 
@@ -284,7 +1251,7 @@ def top_10_operadoras_trimestre():
         print("\nConsultando: Top 10 Operadoras com maiores despesas no último trimestre:")
 
         # Executa a query
-        cursor.execute(top_10_query)
+        cursor.execute(top_10_query, (DESCRICAO_EVENTOS_SINISTROS,))
         results = cursor.fetchall()
 
         # Define os cabeçalhos da tabela
@@ -320,7 +1287,7 @@ def top_10_operadoras_ano():
         )
         cursor = conn.cursor()
 
-        # Query para retornar as 10 operadoras com maiores despesas
+        # Query para retornar as 10 operadoras com maiores despesas, a partir do agregado trimestral
         top_10_query = """
         SELECT 
             o.razao_social AS operadora,
@@ -329,15 +1296,15 @@ def top_10_operadoras_ano():
             d.reg_ans,
             SUM(d.vl_saldo_final) AS total_despesas
         FROM 
-            demonstracoes_contabeis d
+            despesas_trimestrais d
         JOIN 
             operadoras o
         ON 
             d.reg_ans = o.registro_ans
         WHERE 
-            d.descricao = 'EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS  DE ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR '
-            AND d.data >= '2024-01-01'
-            AND d.data <= '2024-12-31'
+            d.descricao = %s
+            AND d.trimestre >= '2024-01-01'
+            AND d.trimestre <= '2024-12-31'
         GROUP BY 
             o.razao_social, o.cnpj, o.uf, d.reg_ans
         ORDER BY 
@@ -348,7 +1315,7 @@ def top_10_operadoras_ano():
         print("\nConsultando: Top 10 Operadoras com maiores despesas no último ano:")
 
         # Executa a query
-        cursor.execute(top_10_query)
+        cursor.execute(top_10_query, (DESCRICAO_EVENTOS_SINISTROS,))
         results = cursor.fetchall()
 
         # Define os cabeçalhos da tabela
@@ -367,21 +1334,105 @@ def top_10_operadoras_ano():
             conn.close()
 
 
+def top_10_operadoras_local(snapshot_dir=SNAPSHOT_DIR):
+    """
+    Gera os relatórios de top 10 operadoras (último trimestre e último ano) a partir do snapshot
+    Parquet, sem acessar o banco de dados.
+
+    :param snapshot_dir: Diretório do snapshot.
+    """
+    try:
+        hoje = date.today()
+        fim_trimestre = quarter_start(hoje)
+        inicio_trimestre = quarter_start(date.fromordinal(fim_trimestre.toordinal() - 1))
+
+        print("\nConsultando (snapshot): Top 10 Operadoras com maiores despesas no último trimestre:")
+        results = top_n_despesas(inicio_trimestre, fim_trimestre, DESCRICAO_EVENTOS_SINISTROS, 10, snapshot_dir)
+        headers = ["Operadora", "CNPJ", "UF", "Registro_ANS", "Total_Despesas"]
+        save_to_csv(results, headers, "top_10_operadoras_trimestre.csv")
+
+        print("\nConsultando (snapshot): Top 10 Operadoras com maiores despesas no último ano:")
+        results = top_n_despesas(date(2024, 1, 1), date(2025, 1, 1), DESCRICAO_EVENTOS_SINISTROS, 10, snapshot_dir)
+        headers = ["Operadora", "CNPJ", "UF", "Registro ANS", "Total Despesas"]
+        save_to_csv(results, headers, "top_10_operadoras_ano.csv")
+
+    except Exception as e:
+        print(f"Erro ao realizar consulta no snapshot: {e}")
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga e consultas do banco de dados da ANS.")
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Importa os CSVs direto dos ZIPs em downloads/, sem extração nem reescrita em disco."
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=200_000,
+        help="Linhas por bloco na preparação dos CSVs (0 processa o arquivo inteiro de uma vez)."
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Reimporta todos os arquivos, substituindo todo o conteúdo das tabelas e do manifesto de cargas."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Cargas COPY simultâneas (uma conexão por arquivo, via tabelas de staging)."
+    )
+    parser.add_argument(
+        "--no-snapshot", action="store_true",
+        help="Não atualiza o snapshot Parquet ao fim da carga."
+    )
+    parser.add_argument(
+        "--local", action="store_true",
+        help="Apenas gera os relatórios a partir do snapshot Parquet, sem acessar o banco."
+    )
+    parser.add_argument(
+        "--drop-quarter", type=date.fromisoformat, metavar="AAAA-MM-DD",
+        help="Apenas remove do banco o trimestre que contém a data (partição e manifesto)."
+    )
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
     os.system('cls' if os.name == 'nt' else 'clear')
-    
-    create_tables()
+    profiler.configure("database", args)
 
-    prepare_csv_files()
+    if args.local:
+        with profiler.stage("top_10_operadoras_local"):
+            top_10_operadoras_local()
+        profiler.save()
+        sys.exit(0)
 
-    csv_files = [f for f in os.listdir("downloads/DemCon") if f.endswith(".csv")]
+    if args.drop_quarter:
+        try:
+            with profiler.stage("drop_quarter"):
+                drop_quarter(args.drop_quarter)
+            if not args.no_snapshot:
+                # Remove o trimestre também do snapshot Parquet
+                with profiler.stage("export_snapshot"):
+                    export_snapshot()
+        except Exception as e:
+            print(f"\nRemoção do trimestre interrompida: {e}")
+            profiler.save()
+            sys.exit(1)
+        profiler.save()
+        sys.exit(0)
 
-    import_csv_with_copy(csv_files)
-    
-    check_inserted_data("demonstracoes_contabeis")
-    check_inserted_data("operadoras")
+    try:
+        load_data(
+            stream=args.stream, chunksize=args.chunksize, full=args.full, workers=args.workers,
+            snapshot=not args.no_snapshot
+        )
+    except Exception as e:
+        print(f"\nCarga interrompida: {e}")
+        profiler.save()
+        sys.exit(1)
+
+    with profiler.stage("reports"):
+        check_inserted_data("demonstracoes_contabeis")
+        check_inserted_data("operadoras")
+
+        top_10_operadoras_trimestre()
 
-    top_10_operadoras_trimestre()
+        top_10_operadoras_ano()
 
-    top_10_operadoras_ano()
+    profiler.save()
@@ -0,0 +1,234 @@
+import os
+import json
+import shutil
+import tempfile
+from datetime import date
+import psycopg2
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+# Configurações do banco de dados
+DB_HOST = "localhost"
+DB_PORT = "5432"
+DB_NAME = "ans_database"
+DB_USER = "postgres"
+DB_PASSWORD = "password"
+
+# Configurações do snapshot colunar
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "database/snapshot")
+SNAPSHOT_COMPRESSION = os.getenv("SNAPSHOT_COMPRESSION", "zstd")
+
+# Esquema tipado das demonstrações contábeis no snapshot
+LEDGER_SCHEMA = pa.schema([
+    ("data", pa.date32()),
+    ("reg_ans", pa.string()),
+    ("cd_conta_contabil", pa.string()),
+    ("descricao", pa.string()),
+    ("vl_saldo_inicial", pa.decimal128(20, 2)),
+    ("vl_saldo_final", pa.decimal128(20, 2)),
+])
+
+# Colunas das operadoras usadas nos relatórios
+OPERADORAS_COLUMNS = ["registro_ans", "cnpj", "razao_social", "nome_fantasia", "modalidade", "cidade", "uf"]
+
+# Partições do snapshot: um diretório por trimestre (trimestre=AAAA-MM-DD)
+PARTITIONING = ds.partitioning(pa.schema([("trimestre", pa.date32())]), flavor="hive")
+
+
+def _ledger_dir(snapshot_dir):
+    return os.path.join(snapshot_dir, "demonstracoes_contabeis")
+
+
+def _quarter_dir(snapshot_dir, trimestre):
+    return os.path.join(_ledger_dir(snapshot_dir), f"trimestre={trimestre.isoformat()}")
+
+
+def _load_manifest(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, "manifest.json"), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_manifest(snapshot_dir, manifest):
+    with open(os.path.join(snapshot_dir, "manifest.json"), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2)
+
+
+def _copy_to_table(cursor, query, params, column_types):
+    """
+    Exporta o resultado de uma consulta com COPY e o lê como uma tabela Arrow tipada.
+    """
+    with tempfile.TemporaryFile() as buffer:
+        cursor.copy_expert(f"COPY ({cursor.mogrify(query, params).decode()}) TO STDOUT WITH CSV HEADER", buffer)
+        buffer.seek(0)
+        return pacsv.read_csv(
+            buffer,
+            convert_options=pacsv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+        )
+
+
+def export_snapshot(snapshot_dir=SNAPSHOT_DIR, force=False):
+    """
+    Gera um snapshot em Parquet das demonstrações contábeis (um arquivo por trimestre, com
+    colunas tipadas e descrições normalizadas) e das operadoras.
+
+    Apenas os trimestres cujo conteúdo mudou desde o último snapshot são reescritos: a assinatura
+    de cada trimestre combina as cargas registradas no carga_manifesto (qualquer recarga do
+    trimestre o reescreve) com as linhas e a soma dos saldos do agregado despesas_trimestrais.
+
+    :param snapshot_dir: Diretório do snapshot.
+    :param force: Reescreve todos os trimestres.
+    """
+    cursor = None
+    conn = None
+    try:
+        # Conecta ao banco de dados
+        conn = psycopg2.connect(
+            host=DB_HOST,
+            port=DB_PORT,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD
+        )
+        conn.set_session(readonly=True)
+        cursor = conn.cursor()
+
+        os.makedirs(_ledger_dir(snapshot_dir), exist_ok=True)
+        manifest = {} if force else _load_manifest(snapshot_dir)
+
+        # Assinatura de cada trimestre, sem varrer as demonstrações: as cargas do trimestre no
+        # carga_manifesto (arquivo, checksum e horário), que mudam a cada recarga mesmo que os
+        # totais não mudem, e os totais do agregado, para dados carregados sem o manifesto
+        cursor.execute("""
+            SELECT r.trimestre, r.linhas, r.total, m.cargas
+            FROM (
+                SELECT trimestre, SUM(linhas) AS linhas, SUM(vl_saldo_final)::text AS total
+                FROM despesas_trimestrais
+                GROUP BY trimestre
+            ) r
+            LEFT JOIN LATERAL (
+                SELECT md5(string_agg(arquivo || '=' || checksum || '@' || carregado_em::text, ',' ORDER BY arquivo)) AS cargas
+                FROM carga_manifesto
+                WHERE tabela = 'demonstracoes_contabeis'
+                  AND data_inicio < r.trimestre + INTERVAL '3 months' AND data_fim >= r.trimestre
+            ) m ON true
+            ORDER BY r.trimestre;
+        """)
+        signatures = {
+            trimestre.isoformat(): f"{linhas}:{total}:{cargas or '-'}"
+            for trimestre, linhas, total, cargas in cursor.fetchall()
+        }
+
+        ledger_query = """
+            SELECT
+                data,
+                reg_ans,
+                cd_conta_contabil,
+                regexp_replace(btrim(descricao), '\\s+', ' ', 'g') AS descricao,
+                vl_saldo_inicial,
+                vl_saldo_final
+            FROM demonstracoes_contabeis
+            WHERE data >= %s AND data < %s
+        """
+        column_types = {field.name: field.type for field in LEDGER_SCHEMA}
+        written = 0
+        for trimestre, signature in signatures.items():
+            quarter_dir = _quarter_dir(snapshot_dir, date.fromisoformat(trimestre))
+            if manifest.get(trimestre) == signature and os.path.isdir(quarter_dir):
+                continue
+
+            inicio = date.fromisoformat(trimestre)
+            fim = date(inicio.year + 1, 1, 1) if inicio.month == 10 else date(inicio.year, inicio.month + 3, 1)
+            table = _copy_to_table(cursor, ledger_query, (inicio, fim), column_types).cast(LEDGER_SCHEMA)
+
+            # Grava em um diretório temporário e troca de uma vez, para que leitores nunca vejam
+            # um trimestre pela metade
+            tmp_dir = quarter_dir + ".tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            pq.write_table(
+                table, os.path.join(tmp_dir, "part-0.parquet"),
+                compression=SNAPSHOT_COMPRESSION, use_dictionary=["reg_ans", "cd_conta_contabil", "descricao"]
+            )
+            shutil.rmtree(quarter_dir, ignore_errors=True)
+            os.replace(tmp_dir, quarter_dir)
+            manifest[trimestre] = signature
+            written += 1
+            print(f"Snapshot do trimestre {trimestre}: {table.num_rows} linhas.")
+
+        # Remove trimestres que não existem mais no banco
+        for trimestre in list(manifest):
+            if trimestre not in signatures:
+                shutil.rmtree(_quarter_dir(snapshot_dir, date.fromisoformat(trimestre)), ignore_errors=True)
+                del manifest[trimestre]
+
+        # As operadoras são poucas: o arquivo é sempre regerado
+        operadoras = _copy_to_table(
+            cursor, f"SELECT {', '.join(OPERADORAS_COLUMNS)} FROM operadoras", None,
+            {column: pa.string() for column in OPERADORAS_COLUMNS}
+        )
+        pq.write_table(operadoras, os.path.join(snapshot_dir, "operadoras.parquet"), compression=SNAPSHOT_COMPRESSION)
+
+        _save_manifest(snapshot_dir, manifest)
+        print(f"Snapshot Parquet atualizado em {snapshot_dir} ({written} de {len(signatures)} trimestres regravados).")
+
+    except Exception as e:
+        print(f"Erro ao gerar o snapshot Parquet: {e}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def top_n_despesas(inicio, fim, descricao, n=10, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Calcula as operadoras com maiores despesas em uma conta direto do snapshot Parquet,
+    sem acessar o banco. Apenas os trimestres do período são lidos (poda de partições),
+    com os arquivos mapeados em memória.
+
+    :param inicio: Data inicial (inclusiva).
+    :param fim: Data final (exclusiva).
+    :param descricao: Descrição normalizada da conta contábil.
+    :param n: Quantidade de operadoras.
+    :param snapshot_dir: Diretório do snapshot.
+    :return: Lista de tuplas (razão social, CNPJ, UF, registro ANS, total de despesas).
+    """
+    ledger_dir = _ledger_dir(snapshot_dir)
+    if not os.path.isdir(ledger_dir):
+        raise FileNotFoundError(f"Snapshot Parquet não encontrado: {snapshot_dir}")
+
+    filesystem = fs.LocalFileSystem(use_mmap=True)
+    # A descrição é lida como dicionário: o filtro compara cada valor distinto uma única vez
+    parquet_format = ds.ParquetFileFormat(read_options={"dictionary_columns": ["descricao"]})
+    dataset = ds.dataset(ledger_dir, format=parquet_format, partitioning=PARTITIONING, filesystem=filesystem)
+    # Trimestres que começam antes do fim e terminam depois do início do período
+    primeiro_trimestre = date(inicio.year, 3 * ((inicio.month - 1) // 3) + 1, 1)
+    expression = (
+        (ds.field("trimestre") >= primeiro_trimestre) & (ds.field("trimestre") < fim)
+        & (ds.field("data") >= inicio) & (ds.field("data") < fim)
+        & (ds.field("descricao") == descricao)
+    )
+    despesas = dataset.to_table(columns=["reg_ans", "vl_saldo_final"], filter=expression)
+    despesas = despesas.group_by("reg_ans").aggregate([("vl_saldo_final", "sum")])
+
+    operadoras = pq.read_table(
+        os.path.join(snapshot_dir, "operadoras.parquet"),
+        columns=["registro_ans", "razao_social", "cnpj", "uf"], filesystem=filesystem
+    )
+    ranking = despesas.join(operadoras, keys="reg_ans", right_keys="registro_ans", join_type="inner")
+    ranking = ranking.sort_by([("vl_saldo_final_sum", "descending")]).slice(0, n)
+
+    return list(zip(
+        ranking["razao_social"].to_pylist(),
+        ranking["cnpj"].to_pylist(),
+        ranking["uf"].to_pylist(),
+        ranking["reg_ans"].to_pylist(),
+        ranking["vl_saldo_final_sum"].to_pylist(),
+    ))
@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import glob
+import time
+import hashlib
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from zipfile import ZipFile
+from tabulate import tabulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.archive import extract_zip  # noqa: E402
+from common.profiling import add_profiling_arguments, profiler  # noqa: E402
+
+# Arquivos de estado e de relatório das execuções do pipeline
+PIPELINE_STATE_PATH = os.getenv("PIPELINE_STATE_PATH", "downloads/.pipeline_state.json")
+PIPELINE_REPORT_PATH = os.getenv("PIPELINE_REPORT_PATH", "downloads/pipeline_report.json")
+
+
+class Stage:
+    """
+    Etapa do pipeline: uma função, as etapas das quais depende e, opcionalmente,
+    os arquivos de entrada e saída usados para decidir se a etapa pode ser ignorada.
+
+    Etapas sem entradas declaradas sempre executam (por exemplo, downloads, que já
+    usam requisições condicionais).
+    """
+
+    def __init__(self, name, func, deps=(), inputs=None, outputs=None):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        # Entradas e saídas são funções, avaliadas na hora da execução
+        self.inputs = inputs
+        self.outputs = outputs
+
+
+def _paths_size(paths):
+    return sum(os.path.getsize(path) for path in paths if os.path.isfile(path))
+
+
+def fingerprint(paths):
+    """
+    Calcula uma impressão digital dos arquivos a partir do caminho, tamanho e data de modificação,
+    sem ler o conteúdo.
+
+    :param paths: Caminhos dos arquivos.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        stat = os.stat(path)
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def _load_state():
+    try:
+        with open(PIPELINE_STATE_PATH, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_state(state):
+    os.makedirs(os.path.dirname(PIPELINE_STATE_PATH) or ".", exist_ok=True)
+    with open(PIPELINE_STATE_PATH, "w", encoding="utf-8") as file:
+        json.dump(state, file, indent=2)
+
+
+def run_stage(stage, previous_fingerprint=None, force=False):
+    """
+    Executa uma etapa, ou a ignora se as entradas não mudaram desde a última execução
+    bem-sucedida e as saídas ainda existem. A etapa falha se a função lançar uma exceção: as
+    funções das etapas propagam os erros (após informá-los), em vez de apenas imprimi-los.
+
+    :param stage: Etapa a executar.
+    :param previous_fingerprint: Impressão digital das entradas na última execução da etapa.
+    :param force: Executa mesmo que as entradas não tenham mudado.
+    :return: Dicionário com o resultado e as métricas da etapa.
+    """
+    inputs = stage.inputs() if stage.inputs else None
+    if inputs is not None and not force:
+        outputs = stage.outputs() if stage.outputs else []
+        if (previous_fingerprint == fingerprint(inputs)
+                and all(os.path.exists(path) for path in outputs)):
+            return {"stage": stage.name, "status": "ignorada", "seconds": 0.0}
+
+    start = time.perf_counter()
+    with profiler.stage(stage.name) as record:
+        stage.func()
+    seconds = time.perf_counter() - start
+
+    # Entradas e saídas são reavaliadas: a etapa pode ter criado ou reescrito arquivos
+    inputs = stage.inputs() if stage.inputs else []
+    outputs = stage.outputs() if stage.outputs else []
+
+    bytes_in = _paths_size(inputs)
+    bytes_out = _paths_size(outputs)
+    return {
+        "stage": stage.name,
+        "status": "executada",
+        "seconds": round(seconds, 3),
+        "bytes_in": bytes_in,
+        "bytes_out": bytes_out,
+        "mb_in_per_s": round(bytes_in / seconds / 1024 / 1024, 2) if seconds else None,
+        # Preenchidos apenas com a medição das etapas ativa (--profile)
+        "cpu_seconds": record.metrics.get("cpu_seconds"),
+        "peak_rss_mb": record.metrics.get("peak_rss_mb"),
+        "fingerprint": fingerprint(inputs) if stage.inputs else None,
+    }
+
+
+def run_pipeline(stages, max_parallel=2, force=False):
+    """
+    Executa as etapas respeitando as dependências; etapas independentes (ramos do grafo)
+    executam simultaneamente. Se uma etapa falhar, as etapas que dependem dela não executam,
+    mas os demais ramos continuam.
+
+    :param stages: Lista de etapas.
+    :param max_parallel: Quantidade máxima de etapas simultâneas.
+    :param force: Executa todas as etapas, mesmo com entradas inalteradas.
+    :return: Lista com o resultado de cada etapa.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"A etapa '{stage.name}' depende de uma etapa inexistente: {dep}")
+
+    state = _load_state()
+    results = {}
+    pending = list(stages)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        while pending or running:
+            for stage in list(pending):
+                dep_status = [results[dep]["status"] for dep in stage.deps if dep in results]
+                if any(status in ("falhou", "cancelada") for status in dep_status):
+                    results[stage.name] = {"stage": stage.name, "status": "cancelada", "seconds": 0.0}
+                    pending.remove(stage)
+                elif len(dep_status) == len(stage.deps):
+                    print(f"\n[pipeline] Iniciando etapa: {stage.name}")
+                    future = executor.submit(run_stage, stage, state.get(stage.name), force)
+                    running[future] = stage
+                    pending.remove(stage)
+
+            if not running:
+                if pending:
+                    raise ValueError("Dependência circular entre as etapas do pipeline.")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name] = future.result()
+                except Exception as e:
+                    print(f"\n[pipeline] Erro na etapa {stage.name}: {e}")
+                    results[stage.name] = {"stage": stage.name, "status": "falhou", "seconds": 0.0, "error": str(e)}
+                else:
+                    print(f"\n[pipeline] Etapa {stage.name} {results[stage.name]['status']} "
+                          f"({results[stage.name]['seconds']:.1f}s)")
+                    new_fingerprint = results[stage.name].pop("fingerprint", None)
+                    if new_fingerprint:
+                        state[stage.name] = new_fingerprint
+                        # Salva o estado a cada etapa concluída, para que uma falha não perca o progresso
+                        _save_state(state)
+
+    return [results[stage.name] for stage in stages]
+
+
+def save_report(results, total_seconds):
+    """
+    Grava o relatório da execução em JSON e imprime o resumo por etapa.
+    """
+    report = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "total_seconds": round(total_seconds, 3),
+        "stages": results,
+    }
+    os.makedirs(os.path.dirname(PIPELINE_REPORT_PATH) or ".", exist_ok=True)
+    with open(PIPELINE_REPORT_PATH, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+    columns = ["stage", "status", "seconds", "bytes_in", "bytes_out", "mb_in_per_s"]
+    if any(result.get("cpu_seconds") is not None for result in results):
+        columns += ["cpu_seconds", "peak_rss_mb"]
+    print("\n" + tabulate([[result.get(column) for column in columns] for result in results], headers=columns))
+    print(f"\nTempo total: {total_seconds:.1f}s. Relatório salvo em: {PIPELINE_REPORT_PATH}")
+
+
+def _ledger_zips():
+    return sorted(glob.glob("downloads/DemCon_*.zip"))
+
+
+def _ledger_csvs():
+    return sorted(glob.glob("downloads/DemCon/*.csv"))
+
+
+def _extracted_members():
+    members = []
+    for zip_path in _ledger_zips():
+        with ZipFile(zip_path, "r") as zipf:
+            members.extend(os.path.join("downloads/DemCon", name) for name in zipf.namelist())
+    return members
+
+
+def build_stages(args):
+    """
+    Monta o grafo de etapas: o ramo dos anexos (scraping e extração do PDF) e o ramo das
+    demonstrações contábeis (download, extração e carga) são independentes.
+
+    :param args: Argumentos da linha de comando.
+    """
+    # Importados aqui para que cada módulo só seja carregado quando o pipeline for montado
+    from scraping.main import download_pdfs, zip_pdfs
+    from data_processing.main import extract_rol_procedimentos
+    from data_processing.page_cache import PageCache
+    from database.download import download_zips, download_csv
+    from database.main import load_data, check_inserted_data, top_10_operadoras_trimestre, top_10_operadoras_ano
+
+    pdf_path = "downloads/Anexo_1.pdf"
+    processed_csv = "data_processing/rol_procedimentos.csv"
+    zip_file = "data_processing/Teste_Luis_Queiroz.zip"
+    opsa_csv = "downloads/DemCon/OPSA.csv"
+    opsa_url = "https://dadosabertos.ans.gov.br/FTP/PDA/operadoras_de_plano_de_saude_ativas/Relatorio_cadop.csv"
+
+    def scrape_annexes():
+        zip_pdfs(download_pdfs())
+
+    def process_annex():
+        extract_rol_procedimentos(
+            pdf_path, processed_csv, zip_file,
+            workers=args.pdf_workers, backend=args.backend, cache=PageCache()
+        )
+
+    def download_ledgers():
+        download_zips(workers=args.download_workers)
+        download_csv(opsa_url, output_path=opsa_csv)
+
+    def extract_ledgers():
+        for zip_path in _ledger_zips():
+            extract_zip(zip_path, "downloads/DemCon")
+
+    def load_database():
+        load_data(stream=args.stream, chunksize=args.chunksize, full=args.full, workers=args.db_workers)
+
+    def reports():
+        check_inserted_data("demonstracoes_contabeis")
+        check_inserted_data("operadoras")
+        top_10_operadoras_trimestre()
+        top_10_operadoras_ano()
+
+    if args.stream:
+        load_inputs = lambda: _ledger_zips() + [opsa_csv]  # noqa: E731
+        load_deps = ["download_ledgers"]
+    else:
+        load_inputs = _ledger_csvs
+        load_deps = ["extract_ledgers"]
+
+    stages = [
+        Stage("scrape_annexes", scrape_annexes),
+        Stage("process_annex", process_annex, deps=["scrape_annexes"],
+              inputs=lambda: [pdf_path], outputs=lambda: [processed_csv, zip_file]),
+        Stage("download_ledgers", download_ledgers),
+        Stage("load_database", load_database, deps=load_deps, inputs=load_inputs),
+        Stage("reports", reports, deps=["load_database"]),
+    ]
+    if not args.stream:
+        stages.insert(3, Stage("extract_ledgers", extract_ledgers, deps=["download_ledgers"],
+                               inputs=_ledger_zips, outputs=_extracted_members))
+    return stages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline completo: scraping, processamento do PDF e carga do banco.")
+    parser.add_argument("--force", action="store_true", help="Executa todas as etapas, mesmo com entradas inalteradas.")
+    parser.add_argument("--only", nargs="+", help="Executa apenas as etapas informadas (e ignora as dependências).")
+    parser.add_argument("--max-parallel", type=int, default=2, help="Etapas executadas simultaneamente.")
+    parser.add_argument("--stream", action="store_true", help="Importa os CSVs direto dos ZIPs, sem extraí-los.")
+    parser.add_argument("--full", action="store_true", help="Reimporta todos os arquivos no banco.")
+    parser.add_argument("--chunksize", type=int, default=200_000, help="Linhas por bloco na preparação dos CSVs.")
+    parser.add_argument("--backend", default="pdfplumber", help="Backend de extração do PDF.")
+    parser.add_argument("--pdf-workers", type=int, default=1, help="Processos de extração do PDF (padrão: serial).")
+    parser.add_argument("--download-workers", type=int, default=4, help="Downloads simultâneos.")
+    parser.add_argument("--db-workers", type=int, default=1, help="Cargas COPY simultâneas.")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+    profiler.configure("pipeline", args)
+
+    stages = build_stages(args)
+    if args.only:
+        stages = [
+            Stage(stage.name, stage.func, inputs=stage.inputs, outputs=stage.outputs)
+            for stage in stages if stage.name in args.only
+        ]
+
+    start = time.perf_counter()
+    results = run_pipeline(stages, max_parallel=args.max_parallel, force=args.force)
+    save_report(results, time.perf_counter() - start)
+    profiler.save()
+
+    if any(result["status"] == "falhou" for result in results):
+        sys.exit(1)
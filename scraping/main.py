@@ -1,105 +1,189 @@
 import os
-from zipfile import ZipFile
-import requests
+import sys
+import asyncio
+import argparse
+from urllib.parse import urljoin
+import httpx
 from bs4 import BeautifulSoup
-import os
 
-def download_pdfs() -> list:
-    """
-    Baixa arquivos PDF da ANS.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.archive import COMPRESSION_METHODS, ZIP_COMPRESSION, ZIP_COMPRESSLEVEL, extract_zip, zip_files  # noqa: E402
+from common.http_metadata import load_metadata, save_metadata  # noqa: E402
+from common.profiling import add_profiling_arguments, profiler  # noqa: E402
+
+# Página da ANS com os anexos do Rol de Procedimentos
+ANS_ROL_URL = "https://www.gov.br/ans/pt-br/acesso-a-informacao/participacao-da-sociedade/atualizacao-do-rol-de-procedimentos"
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB por bloco
+REQUEST_TIMEOUT = 60
+MAX_CONCURRENT_DOWNLOADS = 4
+
+
+async def fetch_pdf_links(client, url=ANS_ROL_URL) -> list:
     """
+    Busca na página da ANS os links dos PDFs dos anexos.
 
-    # 1.1
-    url = "https://www.gov.br/ans/pt-br/acesso-a-informacao/participacao-da-sociedade/atualizacao-do-rol-de-procedimentos"
-    response = requests.get(url)
+    :param client: Cliente HTTP assíncrono.
+    :param url: URL da página com os anexos.
+    """
+    response = await client.get(url)
     response.raise_for_status()
-    
+
     soup = BeautifulSoup(response.text, "html.parser")
     pdf_links = []
     for link in soup.find_all("a", href=True):
         href = link["href"]
         if "Anexo" in href and href.endswith(".pdf"):
-            pdf_links.append(href)
-    
-    if len(pdf_links) < 2:
-        raise ValueError("Não foi possível encontrar os PDFs necessários.")
-    
-    # 1.2
-    pdf_files = []
-    os.makedirs("downloads", exist_ok=True)
-    
-    for i, pdf_url in enumerate(pdf_links[:2]):
-        pdf_response = requests.get(pdf_url)
-        pdf_response.raise_for_status()
-        
-        pdf_filename = f"downloads/Anexo_{i+1}.pdf"
-        with open(pdf_filename, "wb") as file:
-            file.write(pdf_response.content)
-        
-        if not os.path.exists(pdf_filename) or os.path.getsize(pdf_filename) == 0:
-            raise ValueError(f"Falha ao baixar o arquivo PDF: {pdf_filename}")
-            
-        pdf_files.append(pdf_filename)
-
-    print("Arquivos baixados com sucesso:")
-    for pdf_file in pdf_files:
-        print(pdf_file)
-    
+            # Links relativos são resolvidos a partir da URL da página
+            pdf_links.append(urljoin(str(response.url), href))
+    return pdf_links
+
+
+async def download_pdf(client, url, output_path) -> bool:
+    """
+    Baixa um PDF gravando-o em disco bloco a bloco. Envia If-None-Match/If-Modified-Since
+    com os validadores do download anterior, de modo que um anexo inalterado não é baixado.
+
+    :param client: Cliente HTTP assíncrono.
+    :param url: URL do PDF.
+    :param output_path: Caminho onde o PDF será salvo.
+    :return: True se o arquivo foi baixado, False se o arquivo local já estava atualizado.
+    """
+    metadata = load_metadata(output_path)
+    headers = {}
+    if os.path.exists(output_path) and metadata.get("url") == url:
+        if metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+
+    part_path = output_path + ".part"
+    async with client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 304:
+            return False
+        response.raise_for_status()
+
+        try:
+            with open(part_path, "wb") as file:
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):  # Baixa em blocos
+                    file.write(chunk)
+        except BaseException:
+            # Uma falha (ou cancelamento) no meio do download não deixa um .part incompleto
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+        new_metadata = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+    if os.path.getsize(part_path) == 0:
+        os.remove(part_path)
+        raise ValueError(f"Falha ao baixar o arquivo PDF: {output_path}")
+
+    os.replace(part_path, output_path)
+    save_metadata(output_path, new_metadata)
+    return True
+
+
+async def download_pdfs_async(url=ANS_ROL_URL, download_dir="downloads",
+                              max_concurrent=MAX_CONCURRENT_DOWNLOADS) -> list:
+    """
+    Baixa os PDFs dos anexos concorrentemente, com uma única sessão HTTP.
+
+    :param url: URL da página com os anexos.
+    :param download_dir: Diretório onde os PDFs serão salvos.
+    :param max_concurrent: Quantidade máxima de downloads simultâneos.
+    """
+    os.makedirs(download_dir, exist_ok=True)
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT, follow_redirects=True) as client:
+        # 1.1
+        with profiler.stage("fetch_pdf_links"):
+            pdf_links = await fetch_pdf_links(client, url)
+        if len(pdf_links) < 2:
+            raise ValueError("Não foi possível encontrar os PDFs necessários.")
+
+        # 1.2
+        pdf_files = [os.path.join(download_dir, f"Anexo_{i+1}.pdf") for i in range(2)]
+
+        async def limited_download(pdf_url, pdf_filename):
+            async with semaphore:
+                with profiler.stage(f"download:{os.path.basename(pdf_filename)}") as record:
+                    downloaded = await download_pdf(client, pdf_url, pdf_filename)
+                    record.bytes_written = os.path.getsize(pdf_filename) if downloaded else 0
+                return downloaded
+
+        downloaded = await asyncio.gather(
+            *(limited_download(pdf_url, pdf_filename) for pdf_url, pdf_filename in zip(pdf_links, pdf_files))
+        )
+
+    for pdf_file, was_downloaded in zip(pdf_files, downloaded):
+        print(f"{pdf_file} {'baixado' if was_downloaded else 'já está atualizado'}")
+
     return pdf_files
 
+
+def download_pdfs(url=ANS_ROL_URL, download_dir="downloads") -> list:
+    """
+    Baixa arquivos PDF da ANS.
+
+    :param url: URL da página com os anexos.
+    :param download_dir: Diretório onde os PDFs serão salvos.
+    """
+    return asyncio.run(download_pdfs_async(url, download_dir))
+
 # 1.3
-def zip_pdfs(pdf_files, zip_filename="downloads/Anexos.zip") -> str:
+def zip_pdfs(pdf_files, zip_filename="downloads/Anexos.zip", method=ZIP_COMPRESSION,
+             level=ZIP_COMPRESSLEVEL) -> str:
     """
-    Compacta arquivos PDF para um arquivo ZIP.
+    Compacta arquivos PDF para um arquivo ZIP, comprimindo os PDFs em paralelo.
 
     :param pdf_files: Arquivos PDFs a serem compactados.
     :param zip_filename: Arquivo ZIP resultante.
+    :param method: Método de compressão (chave de COMPRESSION_METHODS).
+    :param level: Nível de compressão.
     """
-    with ZipFile(zip_filename, "w") as zipf:
-        for pdf in pdf_files:
-            zipf.write(pdf, os.path.basename(pdf))
-
-    if not os.path.exists(zip_filename) or os.path.getsize(zip_filename) == 0:
-        raise ValueError(f"Falha ao criar o arquivo ZIP: {zip_filename}")
+    zip_files(pdf_files, zip_filename, method=method, level=level, workers=len(pdf_files))
 
     print(f"Arquivos compactados com sucesso em:\n{zip_filename}")
     return zip_filename
 
-def extract_zip(zip_filename, extract_to="downloads/extracted") -> str:
-    """
-    Extrai os arquivos de um arquivo ZIP para o diretório especificado e verifica a integridade dos arquivos extraídos.
-
-    :param zip_filename: Caminho do arquivo ZIP a ser extraído.
-    :param extract_to: Diretório onde os arquivos serão extraídos.
-    """
-    if not os.path.exists(zip_filename):
-        raise FileNotFoundError(f"O arquivo ZIP não foi encontrado: {zip_filename}")
-    
-    os.makedirs(extract_to, exist_ok=True)
-    
-    with ZipFile(zip_filename, "r") as zipf:
-        zipf.extractall(extract_to)
-        extracted_files = zipf.namelist()
-    
-    for file in extracted_files:
-        file_path = os.path.join(extract_to, file)
-        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
-            raise ValueError(f"Arquivo extraído está corrompido ou vazio: {file_path}")
-    
-    print(f"Arquivos extraídos com sucesso para:\n{extract_to}")
-    return extract_to
-
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Web scraping dos anexos do Rol de Procedimentos da ANS.")
+    parser.add_argument("--url", default=ANS_ROL_URL, help="Página com os links dos anexos.")
+    parser.add_argument("--download-dir", default="downloads", help="Diretório dos PDFs baixados.")
+    parser.add_argument(
+        "--compression", choices=sorted(COMPRESSION_METHODS), default=ZIP_COMPRESSION,
+        help="Método de compressão do ZIP."
+    )
+    parser.add_argument("--compresslevel", type=int, default=ZIP_COMPRESSLEVEL, help="Nível de compressão do ZIP.")
+    add_profiling_arguments(parser)
+    args = parser.parse_args()
+
     os.system('cls' if os.name == 'nt' else 'clear')
+    profiler.configure("scraping", args)
 
     print('Web Scraping - ANS')
     print('--------------------')
     print('Baixando arquivos PDFs...\n')
-    pdf_files = download_pdfs()
+    with profiler.stage("download_pdfs"):
+        pdf_files = download_pdfs(args.url, args.download_dir)
 
     print('\nCompactando arquivos PDFs...\n')
-    zip_file = zip_pdfs(pdf_files)
+    with profiler.stage("zip_pdfs", bytes_read=sum(os.path.getsize(path) for path in pdf_files)) as record:
+        zip_file = zip_pdfs(
+            pdf_files, os.path.join(args.download_dir, "Anexos.zip"), args.compression, args.compresslevel
+        )
+        record.bytes_written = os.path.getsize(zip_file)
 
     print('\nExtraindo arquivos do ZIP...\n')
-    extract_zip(zip_file)
\ No newline at end of file
+    with profiler.stage("extract_zip", bytes_read=os.path.getsize(zip_file)):
+        extract_to = extract_zip(zip_file, os.path.join(args.download_dir, "extracted"))
+    print(f"Arquivos extraídos com sucesso para:\n{extract_to}")
+
+    profiler.save()
\ No newline at end of file
@@ -0,0 +1,107 @@
+import os
+import sys
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+# Os módulos do projeto são importados a partir da raiz do repositório (ex.: database.download)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+class FileServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP local que serve conteúdos em memória, com ETag, Last-Modified, requisições
+    condicionais (If-None-Match) e parciais (Range/If-Range), para testar os downloads sem rede.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FileHandler)
+        # Caminho -> (conteúdo, tipo de mídia)
+        self.files = {}
+        # Requisições recebidas: (caminho, cabeçalhos)
+        self.requests = []
+        # Responde 416 a qualquer requisição com Range
+        self.reject_ranges = False
+        # Caminhos cuja resposta é interrompida na metade do corpo
+        self.truncated = set()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def url(self, path):
+        return self.base_url + path
+
+    def add(self, path, content, content_type="application/octet-stream"):
+        self.files[path] = (content, content_type)
+        return self.url(path)
+
+    def requests_to(self, path):
+        return [headers for request_path, headers in self.requests if request_path == path]
+
+
+class FileHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, dict(self.headers)))
+        if self.path not in server.files:
+            self.send_error(404)
+            return
+
+        content, content_type = server.files[self.path]
+        etag = f'"{hashlib.sha1(content).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        status, start = 200, 0
+        range_header = self.headers.get("Range")
+        if range_header:
+            if server.reject_ranges:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(content)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if self.headers.get("If-Range") in (None, etag, LAST_MODIFIED):
+                status, start = 206, int(range_header.split("=")[1].split("-")[0])
+
+        body = content[start:]
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", LAST_MODIFIED)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(content) - 1}/{len(content)}")
+        self.end_headers()
+        if self.path in server.truncated:
+            # Content-Length completo, mas a conexão é fechada na metade do corpo
+            body = body[:len(body) // 2]
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def file_server():
+    """
+    Servidor HTTP local em uma thread, encerrado ao fim do teste.
+    """
+    server = FileServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
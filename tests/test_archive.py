@@ -0,0 +1,47 @@
+import os
+import zipfile
+import pytest
+
+from common import archive
+from common.archive import COMPRESSION_METHODS, extract_zip, zip_files
+
+
+@pytest.fixture
+def sources(tmp_path):
+    paths = []
+    for i, size in enumerate([0x30000, 0x1000, 0x50000]):
+        path = tmp_path / f"Anexo_{i + 1}.pdf"
+        # Conteúdo parcialmente compressível, como um PDF
+        path.write_bytes((os.urandom(256) + b"%PDF " * 200) * (size // 1256 + 1))
+        paths.append(str(path))
+    return paths
+
+
+def _members(zip_path):
+    with zipfile.ZipFile(zip_path) as zipf:
+        assert zipf.testzip() is None
+        return {zinfo.filename: (zinfo.compress_type, zipf.read(zinfo)) for zinfo in zipf.infolist()}
+
+
+@pytest.mark.parametrize("method", sorted(COMPRESSION_METHODS))
+def test_parallel_zip_matches_serial(tmp_path, sources, method):
+    serial = zip_files(sources, str(tmp_path / "serial.zip"), method=method)
+    parallel = zip_files(sources, str(tmp_path / "parallel.zip"), method=method, workers=3)
+
+    assert _members(parallel) == _members(serial)
+    with zipfile.ZipFile(parallel) as zipf:
+        assert zipf.namelist() == [os.path.basename(path) for path in sources]
+
+    extract_zip(parallel, str(tmp_path / "extracted"))
+    for path in sources:
+        with open(path, "rb") as original, open(tmp_path / "extracted" / os.path.basename(path), "rb") as extracted:
+            assert extracted.read() == original.read()
+
+
+def test_unsupported_python_falls_back_to_serial(tmp_path, sources, monkeypatch):
+    monkeypatch.setattr(archive, "PARALLEL_ZIP_SUPPORTED", False)
+    monkeypatch.setattr(archive, "_write_compressed_member", None)
+
+    zip_path = zip_files(sources, str(tmp_path / "fallback.zip"), workers=3)
+
+    assert _members(zip_path) == _members(zip_files(sources, str(tmp_path / "serial.zip")))
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+
+from api import db
+
+
+class FakePool:
+    """
+    Pool com uma única conexão, para simular a espera pelo pool sem um PostgreSQL.
+    """
+
+    def __init__(self):
+        self.available = asyncio.Semaphore(1)
+
+    async def acquire(self, timeout=None):
+        await asyncio.wait_for(self.available.acquire(), timeout)
+        return object()
+
+    async def release(self, conn):
+        self.available.release()
+
+    def get_size(self):
+        return 1
+
+    def get_idle_size(self):
+        return self.available._value
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    monkeypatch.setattr(db, "pool_metrics", db.PoolMetrics())
+    monkeypatch.setattr(db, "pool", None)
+
+    async def install():
+        monkeypatch.setattr(db, "pool", FakePool())
+    return install
+
+
+def test_pool_wait_timeout_is_pool_exhaustion(fake_pool):
+    async def scenario():
+        await fake_pool()
+        async with db.acquire_connection():
+            with pytest.raises(db.PoolExhaustedError):
+                async with db.acquire_connection(timeout=0.01):
+                    pass
+
+    asyncio.run(scenario())
+    assert db.pool_metrics.timeouts == 1
+    assert db.pool_metrics.query_timeouts == 0
+
+
+def test_query_timeout_is_not_pool_exhaustion(fake_pool):
+    async def scenario():
+        await fake_pool()
+        with pytest.raises(db.QueryTimeoutError):
+            async with db.acquire_connection():
+                # Mesmo erro que o asyncpg lança quando uma consulta excede o command_timeout
+                raise asyncio.TimeoutError()
+        # A conexão volta ao pool
+        async with db.acquire_connection(timeout=0.01):
+            pass
+
+    asyncio.run(scenario())
+    assert db.pool_metrics.timeouts == 0
+    assert db.pool_metrics.query_timeouts == 1
@@ -0,0 +1,68 @@
+import os
+import json
+import pytest
+import requests
+
+from database.download import download_file, download_zips
+
+
+def test_download_zips_skips_unchanged_files(file_server, tmp_path):
+    contents = [os.urandom(300_000), os.urandom(10_000)]
+    urls = [file_server.add(f"/{i + 1}T2024.zip", content) for i, content in enumerate(contents)]
+
+    zip_files = download_zips(str(tmp_path), urls=urls, workers=2, retries=0)
+
+    assert [open(path, "rb").read() for path in zip_files] == contents
+    assert not any(name.endswith(".part") for name in os.listdir(tmp_path))
+
+    # Segunda execução: requisição condicional respondida com 304, sem novo download
+    assert download_file(urls[0], zip_files[0], retries=0) is False
+    assert file_server.requests_to("/1T2024.zip")[-1]["If-None-Match"]
+
+
+def test_download_file_resumes_partial_download(file_server, tmp_path):
+    content = os.urandom(200_000)
+    url = file_server.add("/1T2024.zip", content)
+    output_path = str(tmp_path / "DemCon_1.zip")
+
+    # Download interrompido: parte já gravada e seus metadados
+    download_file(url, output_path, retries=0)
+    etag = json.load(open(output_path + ".meta.json"))["etag"]
+    os.remove(output_path)
+    os.remove(output_path + ".meta.json")
+    with open(output_path + ".part", "wb") as file:
+        file.write(content[:50_000])
+    with open(output_path + ".part.meta.json", "w") as file:
+        json.dump({"url": url, "etag": etag}, file)
+
+    assert download_file(url, output_path, retries=0) is True
+
+    headers = file_server.requests_to("/1T2024.zip")[-1]
+    assert headers["Range"] == "bytes=50000-"
+    assert open(output_path, "rb").read() == content
+    assert not os.path.exists(output_path + ".part")
+
+
+def test_download_file_restarts_after_416(file_server, tmp_path):
+    content = os.urandom(50_000)
+    url = file_server.add("/1T2024.zip", content)
+    output_path = str(tmp_path / "DemCon_1.zip")
+    with open(output_path + ".part", "wb") as file:
+        file.write(b"parte de outra versao do arquivo")
+    file_server.reject_ranges = True
+
+    # A parte inválida é descartada e a nova tentativa baixa o arquivo inteiro
+    assert download_file(url, output_path, retries=1, backoff=0) is True
+    assert open(output_path, "rb").read() == content
+
+
+def test_download_file_raises_when_416_exhausts_retries(file_server, tmp_path):
+    url = file_server.add("/1T2024.zip", os.urandom(50_000))
+    output_path = str(tmp_path / "DemCon_1.zip")
+    with open(output_path + ".part", "wb") as file:
+        file.write(b"parte de outra versao do arquivo")
+    file_server.reject_ranges = True
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        download_file(url, output_path, retries=0, backoff=0)
+    assert not os.path.exists(output_path)
@@ -0,0 +1,52 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date
+from decimal import Decimal
+import orjson
+
+import api.export as export
+from api.encoding import json_default
+
+ROWS = [
+    {"data": date(2023, 1, 1), "reg_ans": "012", "descricao": "Saúde", "vl_saldo_final": Decimal("1234567890.10")},
+    {"data": date(2023, 2, 1), "reg_ans": "034", "descricao": None, "vl_saldo_final": Decimal("-0.50")},
+]
+
+
+class FakeConnection:
+
+    @asynccontextmanager
+    async def transaction(self, readonly=False):
+        yield
+
+    async def cursor(self, query, *params, prefetch=None):
+        for row in ROWS:
+            yield row
+
+
+def _export(monkeypatch, formato):
+    @asynccontextmanager
+    async def acquire_connection():
+        yield FakeConnection()
+
+    monkeypatch.setattr(export, "acquire_connection", acquire_connection)
+
+    async def collect():
+        return "".join([chunk async for chunk in export.stream_query("SELECT", [], formato)])
+    return asyncio.run(collect())
+
+
+def test_ndjson_uses_the_api_encoder(monkeypatch):
+    lines = _export(monkeypatch, "ndjson").splitlines()
+
+    # Mesmas linhas que as rotas JSON produziriam (NUMERIC como texto, sem perda de precisão)
+    assert lines == [orjson.dumps(row, default=json_default).decode() for row in ROWS]
+    assert orjson.loads(lines[0])["vl_saldo_final"] == "1234567890.10"
+
+
+def test_csv_export(monkeypatch):
+    assert _export(monkeypatch, "csv").splitlines() == [
+        "data,reg_ans,descricao,vl_saldo_final",
+        "2023-01-01,012,Saúde,1234567890.10",
+        "2023-02-01,034,,-0.50",
+    ]
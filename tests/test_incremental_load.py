@@ -0,0 +1,54 @@
+import os
+
+from benchmarks.generators import DEFAULT_QUARTERS, generate_ledger_csv, generate_registry_csv
+from common.archive import extract_zip, zip_files
+from database.main import prepare_csv_files, select_changed_files, source_checksums
+
+
+def _add_quarter(tmp_path, number):
+    source = tmp_path / "fontes" / f"{number}T2023.csv"
+    source.parent.mkdir(exist_ok=True)
+    generate_ledger_csv(str(source), 500, quarter=DEFAULT_QUARTERS[number - 1])
+    zip_files([str(source)], str(tmp_path / "downloads" / f"DemCon_{number}.zip"))
+
+
+def _extract_all(tmp_path, csv_dir):
+    # Como database/download.py e a etapa extract_ledgers: todos os ZIPs são extraídos de novo
+    for name in sorted(os.listdir(tmp_path / "downloads")):
+        if name.endswith(".zip"):
+            extract_zip(str(tmp_path / "downloads" / name), csv_dir)
+    return sorted(f for f in os.listdir(csv_dir) if f.endswith(".csv"))
+
+
+def _load(csv_dir, csv_files, manifest):
+    # Mesmo fluxo de load_data: seleciona, prepara e registra os checksums no manifesto
+    selected = select_changed_files(csv_files, csv_dir, manifest=manifest)
+    prepare_csv_files(csv_dir, csv_files=selected)
+    manifest.update(source_checksums(selected, csv_dir))
+    return selected
+
+
+def test_only_the_new_quarter_is_selected(tmp_path):
+    csv_dir = str(tmp_path / "downloads" / "DemCon")
+    os.makedirs(csv_dir)
+    generate_registry_csv(os.path.join(csv_dir, "OPSA.csv"), 50)
+    _add_quarter(tmp_path, 1)
+    _add_quarter(tmp_path, 2)
+    manifest = {}
+
+    assert _load(csv_dir, _extract_all(tmp_path, csv_dir), manifest) == ["1T2023.csv", "2T2023.csv", "OPSA.csv"]
+    assert _load(csv_dir, _extract_all(tmp_path, csv_dir), manifest) == []
+
+    _add_quarter(tmp_path, 3)
+    assert _load(csv_dir, _extract_all(tmp_path, csv_dir), manifest) == ["3T2023.csv"]
+
+
+def test_changed_registry_is_selected(tmp_path):
+    csv_dir = str(tmp_path / "downloads" / "DemCon")
+    os.makedirs(csv_dir)
+    generate_registry_csv(os.path.join(csv_dir, "OPSA.csv"), 50)
+    manifest = {}
+    _load(csv_dir, ["OPSA.csv"], manifest)
+
+    generate_registry_csv(os.path.join(csv_dir, "OPSA.csv"), 60)
+    assert _load(csv_dir, ["OPSA.csv"], manifest) == ["OPSA.csv"]
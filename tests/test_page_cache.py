@@ -0,0 +1,59 @@
+import pdfplumber
+
+from data_processing.page_cache import page_fingerprints
+
+
+def _write_form_pdf(path, texts):
+    """
+    Gera um PDF em que todas as páginas têm o mesmo fluxo de conteúdo (q /Fm0 Do Q) e o texto
+    de cada página fica em um Form XObject próprio.
+    """
+    objects = {3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"}
+    kids = []
+    for i, text in enumerate(texts):
+        page, content, form = 4 + 3 * i, 5 + 3 * i, 6 + 3 * i
+        kids.append(f"{page} 0 R")
+        objects[page] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 200] "
+            f"/Resources << /XObject << /Fm0 {form} 0 R >> >> /Contents {content} 0 R >>"
+        ).encode()
+        for number, data, attrs in (
+            (content, b"q /Fm0 Do Q", ""),
+            (form, f"BT /F1 12 Tf 20 100 Td ({text}) Tj ET".encode(),
+             "/Type /XObject /Subtype /Form /BBox [0 0 200 200] /Resources << /Font << /F1 3 0 R >> >> "),
+        ):
+            objects[number] = f"<< {attrs}/Length {len(data)} >>\nstream\n".encode() + data + b"\nendstream"
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(texts)} >>".encode()
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(output)
+        output += f"{number} 0 obj\n".encode() + objects[number] + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    output += b"".join(f"{offsets[number]:010d} 00000 n \n".encode() for number in sorted(objects))
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(output))
+    return str(path)
+
+
+def test_pages_drawing_different_forms_have_different_keys(tmp_path):
+    pdf_path = _write_form_pdf(tmp_path / "anexo.pdf", ["Pagina um", "Pagina dois", "Pagina um"])
+    with pdfplumber.open(pdf_path) as pdf:
+        assert [page.extract_text() for page in pdf.pages] == ["Pagina um", "Pagina dois", "Pagina um"]
+
+    first, second, third = page_fingerprints(pdf_path)
+
+    assert first != second
+    # Mesmo desenho em outro objeto: mesma chave
+    assert first == third
+
+
+def test_edited_form_invalidates_only_its_page(tmp_path):
+    before = page_fingerprints(_write_form_pdf(tmp_path / "antes.pdf", ["Pagina um", "Pagina dois"]))
+    after = page_fingerprints(_write_form_pdf(tmp_path / "depois.pdf", ["Pagina um", "Pagina 2"]))
+
+    assert after[0] == before[0]
+    assert after[1] != before[1]
@@ -0,0 +1,60 @@
+import pytest
+
+import data_processing.main as data_processing_main
+from benchmarks.pdf_backends import FIXTURE_COLUMNS, generate_fixture_pdf
+from common.profiling import Profiler
+from data_processing.main import PDF_BACKENDS, iter_page_tables, iter_table_rows
+
+PAGES = 6
+ROWS_PER_PAGE = 10
+
+
+@pytest.fixture(scope="module")
+def fixture_pdf(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pdf") / "anexo_fixture.pdf"
+    generate_fixture_pdf(str(path), pages=PAGES, rows_per_page=ROWS_PER_PAGE)
+    return str(path)
+
+
+def _rows(pdf_path, **kwargs):
+    return list(iter_table_rows(iter_page_tables(pdf_path, **kwargs)))
+
+
+def test_pdfplumber_rows(fixture_pdf):
+    rows = _rows(fixture_pdf, backend="pdfplumber")
+
+    # Cabeçalho mantido apenas uma vez, seguido das linhas de todas as páginas
+    assert rows[0] == FIXTURE_COLUMNS
+    assert len(rows) == 1 + PAGES * ROWS_PER_PAGE
+    assert all("VIGÊNCIA" not in row for row in rows[1:])
+
+
+@pytest.mark.parametrize("backend", sorted(set(PDF_BACKENDS) - {"pdfplumber"}))
+def test_backend_matches_pdfplumber(fixture_pdf, backend):
+    assert _rows(fixture_pdf, backend=backend) == _rows(fixture_pdf, backend="pdfplumber")
+
+
+def test_parallel_batches_match_serial(fixture_pdf):
+    assert _rows(fixture_pdf, workers=2, batch_size=4) == _rows(fixture_pdf)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_profiling_does_not_change_extraction(fixture_pdf, capsys, monkeypatch, workers):
+    plain = _rows(fixture_pdf, workers=workers, batch_size=4)
+    plain_output = capsys.readouterr().out
+
+    profiler = Profiler()
+    profiler.enable("test")
+    monkeypatch.setattr(data_processing_main, "profiler", profiler)
+    try:
+        profiled = _rows(fixture_pdf, workers=workers, batch_size=4)
+    finally:
+        profiler._stop.set()
+        profiler._sampler.join()
+
+    # Mesmos lotes, mesmas linhas e o mesmo progresso, apenas com um registro por lote
+    assert profiled == plain
+    assert capsys.readouterr().out == plain_output
+    assert [record.name for record in profiler.records] == ["pdf_batch:1-4", "pdf_batch:5-6"]
+    # Linhas de cada página, com o cabeçalho que se repete em todas elas
+    assert sum(record.rows for record in profiler.records) == PAGES * ROWS_PER_PAGE + PAGES
@@ -0,0 +1,47 @@
+import json
+import pytest
+
+import database.main as database_main
+from benchmarks.generators import generate_registry_csv
+from pipeline import main as pipeline
+
+
+@pytest.fixture
+def state_path(tmp_path, monkeypatch):
+    path = tmp_path / "state.json"
+    monkeypatch.setattr(pipeline, "PIPELINE_STATE_PATH", str(path))
+    return path
+
+
+def _saved_state(path):
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def test_failed_stage_is_not_fingerprinted(tmp_path, state_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "downloads" / "DemCon").mkdir(parents=True)
+    source = tmp_path / "downloads" / "DemCon" / "OPSA.csv"
+    generate_registry_csv(str(source), 10)
+    # Banco inacessível: a carga deve falhar, e não apenas imprimir o erro
+    monkeypatch.setattr(database_main, "DB_HOST", "127.0.0.1")
+    monkeypatch.setattr(database_main, "DB_PORT", "1")
+
+    def load_database():
+        database_main.load_data(full=True, snapshot=False)
+
+    stages = [
+        pipeline.Stage("extract", lambda: None, inputs=lambda: [str(source)]),
+        pipeline.Stage("load_database", load_database, deps=["extract"], inputs=lambda: [str(source)]),
+        pipeline.Stage("reports", lambda: None, deps=["load_database"]),
+    ]
+    results = {result["stage"]: result for result in pipeline.run_pipeline(stages)}
+
+    assert results["extract"]["status"] == "executada"
+    assert results["load_database"]["status"] == "falhou"
+    assert results["reports"]["status"] == "cancelada"
+    assert set(_saved_state(state_path)) == {"extract"}
+
+    # Na próxima execução, a etapa que falhou é executada de novo
+    results = {result["stage"]: result for result in pipeline.run_pipeline(stages)}
+    assert results["extract"]["status"] == "ignorada"
+    assert results["load_database"]["status"] == "falhou"
@@ -0,0 +1,52 @@
+import csv
+import shutil
+import pytest
+
+from benchmarks.generators import generate_ledger_csv, generate_registry_csv
+from database.main import iter_normalized_lines, prepare_csv_file, prepare_csv_file_chunked
+
+
+def _rows(path):
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        return list(csv.reader(file, delimiter=";"))[1:]
+
+
+def _as_loaded(rows, header):
+    # Saldos comparados como número, como ficam na coluna NUMERIC ("10.5" e "10.50" são iguais)
+    saldos = [i for i, column in enumerate(header) if column.startswith("VL_SALDO")]
+    return [[float(value) if i in saldos else value for i, value in enumerate(row)] for row in rows]
+
+
+@pytest.mark.parametrize("generate", [
+    lambda path: generate_registry_csv(path, 300),
+    lambda path: generate_ledger_csv(path, 3000),
+], ids=["cadastro", "demonstracoes"])
+def test_preparation_modes_load_the_same_values(tmp_path, generate):
+    source = tmp_path / "source.csv"
+    generate(str(source))
+    with open(source, "r", encoding="utf-8", newline="") as file:
+        header = next(csv.reader(file, delimiter=";"))
+    with open(source, "r", encoding="utf-8", newline="") as file:
+        streamed = [next(csv.reader([line], delimiter=";")) for line in iter_normalized_lines(file)]
+
+    whole, chunked = tmp_path / "whole.csv", tmp_path / "chunked.csv"
+    shutil.copy(source, whole)
+    shutil.copy(source, chunked)
+    prepare_csv_file(str(whole), "whole.csv")
+    rows = prepare_csv_file_chunked(str(chunked), chunksize=1000)
+
+    expected = _as_loaded(_rows(whole), header)
+    assert rows == len(expected)
+    assert _as_loaded(_rows(chunked), header) == expected
+    assert _as_loaded(streamed, header) == expected
+
+
+def test_registry_identifiers_keep_leading_zeros(tmp_path):
+    path = tmp_path / "OPSA.csv"
+    generate_registry_csv(str(path), 300)
+    cnpjs = [row[1] for row in _rows(path)]
+
+    prepare_csv_file(str(path), "OPSA.csv")
+
+    assert any(cnpj.startswith("0") for cnpj in cnpjs)
+    assert [row[1] for row in _rows(path)] == cnpjs
@@ -0,0 +1,61 @@
+from contextlib import asynccontextmanager
+from datetime import date
+from decimal import Decimal
+import pytest
+from fastapi.testclient import TestClient
+
+import api.main as api_main
+
+
+class FakeConnection:
+    """
+    Conexão que registra os parâmetros da consulta e devolve linhas fixas.
+    """
+
+    def __init__(self):
+        self.params = []
+
+    async def fetch(self, query, *params):
+        self.params.append(params)
+        return [{"operadora": "X", "cnpj": "1", "uf": "SP", "reg_ans": "1", "total_despesas": Decimal("10.50")}]
+
+
+@pytest.fixture
+def ranking(monkeypatch):
+    conn = FakeConnection()
+
+    @asynccontextmanager
+    async def acquire_connection():
+        yield conn
+
+    async def ensure_fresh():
+        pass
+
+    monkeypatch.setattr(api_main, "acquire_connection", acquire_connection)
+    monkeypatch.setattr(api_main.ranking_cache, "ensure_fresh", ensure_fresh)
+    api_main.ranking_cache.clear()
+    # Sem o contexto do TestClient, o lifespan (pool e índice de busca) não é executado
+    client = TestClient(api_main.app)
+    yield client, conn
+    api_main.ranking_cache.clear()
+
+
+def test_mid_quarter_inicio_includes_its_whole_quarter(ranking):
+    client, conn = ranking
+
+    response = client.get("/despesas/ranking", params={"inicio": "2023-02-15", "fim": "2023-08-20", "conta": "411"})
+
+    assert response.status_code == 200
+    assert response.json()["data"][0]["total_despesas"] == "10.50"
+    inicio, fim = conn.params[0][:2]
+    # trimestre >= 2023-01-01 e trimestre <= 2023-08-20: 1T, 2T e 3T de 2023
+    assert (inicio, fim) == (date(2023, 1, 1), date(2023, 8, 20))
+
+
+def test_inicio_in_the_same_quarter_shares_the_cached_ranking(ranking):
+    client, conn = ranking
+
+    for inicio in ("2023-01-01", "2023-03-31"):
+        assert client.get("/despesas/ranking", params={"inicio": inicio, "fim": "2023-12-31", "conta": "411"}).status_code == 200
+
+    assert len(conn.params) == 1
@@ -0,0 +1,85 @@
+import os
+import asyncio
+import httpx
+import pytest
+
+from common.http_metadata import load_metadata
+from scraping.main import download_pdfs_async
+
+ANEXO_1 = b"%PDF-1.4 anexo I " + b"1" * 4096
+ANEXO_2 = b"%PDF-1.4 anexo II " + b"2" * 4096
+
+
+@pytest.fixture
+def rol_page(file_server):
+    file_server.add("/anexos/Anexo_I_Rol.pdf", ANEXO_1, "application/pdf")
+    file_server.add("/anexos/Anexo_II_DUT.pdf", ANEXO_2, "application/pdf")
+    # Links relativos, como na página da ANS
+    html = (
+        '<html><body>'
+        '<a href="anexos/Anexo_I_Rol.pdf">Anexo I</a>'
+        '<a href="anexos/Anexo_II_DUT.pdf">Anexo II</a>'
+        '<a href="outro.pdf">Outro</a>'
+        '</body></html>'
+    )
+    return file_server.add("/rol", html.encode(), "text/html")
+
+
+def _read(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def test_downloads_the_annexes(tmp_path, rol_page):
+    pdf_files = asyncio.run(download_pdfs_async(rol_page, str(tmp_path)))
+
+    assert [_read(path) for path in pdf_files] == [ANEXO_1, ANEXO_2]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+
+def test_unchanged_annexes_are_not_downloaded_again(tmp_path, file_server, rol_page, capsys):
+    pdf_files = asyncio.run(download_pdfs_async(rol_page, str(tmp_path)))
+    mtimes = [os.stat(path).st_mtime_ns for path in pdf_files]
+
+    asyncio.run(download_pdfs_async(rol_page, str(tmp_path)))
+
+    # A segunda execução envia o ETag salvo e recebe 304, sem regravar os arquivos
+    first, second = file_server.requests_to("/anexos/Anexo_I_Rol.pdf")
+    assert "If-None-Match" not in first
+    assert second["If-None-Match"] == load_metadata(pdf_files[0])["etag"]
+    assert [os.stat(path).st_mtime_ns for path in pdf_files] == mtimes
+    assert capsys.readouterr().out.count("já está atualizado") == 2
+
+
+def test_changed_annex_replaces_the_previous_file(tmp_path, file_server, rol_page):
+    pdf_files = asyncio.run(download_pdfs_async(rol_page, str(tmp_path)))
+
+    file_server.add("/anexos/Anexo_I_Rol.pdf", ANEXO_1 + b" revisado", "application/pdf")
+    asyncio.run(download_pdfs_async(rol_page, str(tmp_path)))
+
+    assert _read(pdf_files[0]) == ANEXO_1 + b" revisado"
+    assert not os.path.exists(pdf_files[0] + ".part")
+
+
+def test_failed_download_keeps_the_previous_file(tmp_path, file_server, rol_page):
+    pdf_files = asyncio.run(download_pdfs_async(rol_page, str(tmp_path)))
+
+    # Resposta vazia: o .part é descartado e o anexo anterior continua no lugar
+    file_server.add("/anexos/Anexo_I_Rol.pdf", b"", "application/pdf")
+    with pytest.raises(ValueError):
+        asyncio.run(download_pdfs_async(rol_page, str(tmp_path)))
+
+    assert _read(pdf_files[0]) == ANEXO_1
+    assert not os.path.exists(pdf_files[0] + ".part")
+
+
+def test_interrupted_download_leaves_no_part_file(tmp_path, file_server, rol_page):
+    pdf_files = asyncio.run(download_pdfs_async(rol_page, str(tmp_path)))
+
+    file_server.add("/anexos/Anexo_I_Rol.pdf", ANEXO_1 + b" revisado", "application/pdf")
+    file_server.truncated.add("/anexos/Anexo_I_Rol.pdf")
+    with pytest.raises(httpx.TransportError):
+        asyncio.run(download_pdfs_async(rol_page, str(tmp_path)))
+
+    assert _read(pdf_files[0]) == ANEXO_1
+    assert not os.path.exists(pdf_files[0] + ".part")